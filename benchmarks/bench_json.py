@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark del backend JSON con cuerpos de pistas: json con JSONEncoder (el
+camino de siempre) frente a json_backend con orjson.
+
+Uso:
+    python benchmarks/bench_json.py [--sizes 100K,1M,10M,100M] [--repeat 5]
+
+Para cada tamaño de audio mide:
+- loads: leer el cuerpo de add_track, {"track": "<base64>"}.
+- dumps: escribir la respuesta de add_track, un Track con el base64, con
+  indent=2 como el jsonifier de Connexion.
+Comprueba que las dos salidas son idénticas y muestra el mejor tiempo.
+No necesita base de datos.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from swagger_server import json_backend  # noqa: E402
+from swagger_server.encoder import JSONEncoder  # noqa: E402
+from swagger_server.models import Track  # noqa: E402
+
+UNIDADES = {'K': 1024, 'M': 1024 ** 2}
+
+
+def _tamano(texto):
+    texto = texto.strip().upper()
+    if texto[-1] in UNIDADES:
+        return int(float(texto[:-1]) * UNIDADES[texto[-1]])
+    return int(texto)
+
+
+def _mejor(funcion, repeat):
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="json + JSONEncoder frente a json_backend")
+    parser.add_argument('--sizes', default='100K,1M,10M,100M')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    # FlaskJSONEncoder avisa de su retirada en cada instancia
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+    if not json_backend._orjson:
+        print("orjson no está disponible o JSON_BACKEND=stdlib: los dos caminos son el mismo")
+
+    print(f"{'size':>10} {'op':<6} {'stdlib ms':>10} {'backend ms':>11} {'mejora':>8}")
+    for size in (_tamano(s) for s in args.sizes.split(',')):
+        b64 = base64.b64encode(os.urandom(size)).decode('ascii')
+        cuerpo = ('{"track": "%s"}' % b64).encode('ascii')
+        track = Track(idtrack=size, track=b64)
+
+        antes = json.dumps(track, cls=JSONEncoder, indent=2, sort_keys=True)
+        if json_backend.dumps(track, indent=2) != antes:
+            raise AssertionError(f"Different output for {size} bytes")
+        del antes
+
+        casos = [
+            ('loads', lambda: json.loads(cuerpo), lambda: json_backend.loads(cuerpo)),
+            ('dumps', lambda: json.dumps(track, cls=JSONEncoder, indent=2, sort_keys=True),
+             lambda: json_backend.dumps(track, indent=2)),
+        ]
+        for nombre, stdlib, backend in casos:
+            t_stdlib, t_backend = _mejor(stdlib, args.repeat), _mejor(backend, args.repeat)
+            print(f"{size:>10} {nombre:<6} {t_stdlib:>10.2f} {t_backend:>11.2f} {t_stdlib / t_backend:>7.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
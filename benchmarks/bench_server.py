@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark del servidor: app.run (servidor de desarrollo de Flask) frente a
+gunicorn y, con --servers, al modo aiohttp.
+
+Uso:
+    python benchmarks/bench_server.py [--path /] [--cookie TOKEN] [--concurrency 32]
+                                      [--duration 10] [--servers flask,gunicorn,aiohttp]
+
+Arranca `python -m swagger_server` una vez por cada valor de WEB_SERVER en un
+puerto libre, lanza peticiones GET concurrentes a --path durante --duration
+segundos y muestra peticiones por segundo y latencias p50/p99. El resto de
+variables (WEB_WORKERS, WEB_THREADS, DB_*...) se heredan del entorno.
+Por defecto pide GET /, que no toca la base de datos ni SYU; con --path
+/track/N y --cookie se mide el camino completo.
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _esperar(port, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El servidor no escucha en el puerto {port}")
+
+
+def _cliente(port, path, cookie, hasta, latencias, errores):
+    headers = {'Cookie': f"oversound_auth={cookie}"} if cookie else {}
+    conexion = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.monotonic() < hasta:
+        inicio = time.perf_counter()
+        try:
+            conexion.request('GET', path, headers=headers)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status >= 400:
+                errores.append(respuesta.status)
+        except (OSError, http.client.HTTPException):
+            errores.append(None)
+            conexion.close()
+            continue
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    conexion.close()
+
+
+def bench(server, path, cookie, concurrency, duration):
+    port = _puerto_libre()
+    entorno = dict(os.environ, WEB_SERVER=server, HOST='127.0.0.1', PORT=str(port))
+    proceso = subprocess.Popen([sys.executable, '-m', 'swagger_server'], cwd=RAIZ, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _esperar(port)
+        latencias, errores = [], []
+        hasta = time.monotonic() + duration
+        hilos = [threading.Thread(target=_cliente, args=(port, path, cookie, hasta, latencias, errores))
+                 for _ in range(concurrency)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+
+    if not latencias:
+        return {'rps': 0.0, 'p50_ms': None, 'p99_ms': None, 'errors': len(errores)}
+    percentiles = statistics.quantiles(latencias, n=100)
+    return {
+        'rps': len(latencias) / duration,
+        'p50_ms': percentiles[49],
+        'p99_ms': percentiles[98],
+        'errors': len(errores),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara app.run con gunicorn")
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--cookie', default=None, help="Token oversound_auth para rutas protegidas")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--servers', default='flask,gunicorn')
+    args = parser.parse_args(argv)
+
+    print(f"GET {args.path}, {args.concurrency} clientes, {args.duration:g} s")
+    for server in args.servers.split(','):
+        r = bench(server, args.path, args.cookie, args.concurrency, args.duration)
+        p50 = f"{r['p50_ms']:.1f}" if r['p50_ms'] is not None else '-'
+        p99 = f"{r['p99_ms']:.1f}" if r['p99_ms'] is not None else '-'
+        print(f"{server:<10} {r['rps']:>9.1f} req/s   p50 {p50:>7} ms   p99 {p99:>7} ms   "
+              f"errores {r['errors']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
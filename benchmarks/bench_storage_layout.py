@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark del layout de almacenamiento: BYTEA único frente a track_chunks.
+
+Uso:
+    python benchmarks/bench_storage_layout.py [--size-mb 10] [--repeat 5]
+
+Necesita una base de datos con las variables DB_* (la misma que el servicio)
+y el esquema de trozos aplicado (python -m swagger_server.storage.migrate_chunks).
+Para cada layout mide: inserción, lectura completa, lectura de un rango de
+64 KB en mitad de la pista y actualización con un único trozo modificado.
+Las pistas creadas se borran al terminar.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from swagger_server.controllers.dbconx.tempName import dbConectar, dbDesconectar  # noqa: E402
+from swagger_server.storage import ByteaStorage, ChunkedStorage, TrackSpool  # noqa: E402
+
+RANGE_SIZE = 64 * 1024
+
+
+def _medir(funcion, repeat):
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def bench(store, data, repeat):
+    conexion = dbConectar()
+    ids = []
+    try:
+        def insertar():
+            with TrackSpool.from_stream(io.BytesIO(data), max_size=len(data)) as spool:
+                ids.append(store.insert(conexion, spool))
+            conexion.commit()
+
+        resultados = {'insert_ms': _medir(insertar, repeat)}
+        track_id = ids[0]
+        mitad = len(data) // 2
+
+        resultados['read_full_ms'] = _medir(
+            lambda: b''.join(store.read(conexion, track_id)), repeat)
+        resultados['read_range_ms'] = _medir(
+            lambda: b''.join(store.read(conexion, track_id, mitad, mitad + RANGE_SIZE - 1)), repeat)
+
+        # Actualización que cambia un solo byte en mitad de la pista
+        modificado = bytearray(data)
+
+        def actualizar():
+            modificado[mitad] ^= 0xFF
+            with TrackSpool.from_stream(io.BytesIO(modificado), max_size=len(data)) as spool:
+                store.update(conexion, track_id, spool)
+            conexion.commit()
+
+        resultados['update_one_chunk_ms'] = _medir(actualizar, repeat)
+        return resultados
+    finally:
+        for track_id in ids:
+            store.delete(conexion, track_id)
+        conexion.commit()
+        dbDesconectar(conexion)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BYTEA vs track_chunks")
+    parser.add_argument('--size-mb', type=float, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    data = os.urandom(int(args.size_mb * 1024 * 1024))
+    print(f"Track de {args.size_mb} MB, mediana de {args.repeat} repeticiones")
+    print(f"{'layout':<8} {'insert':>10} {'read_full':>10} {'read_64k':>10} {'update_1':>10}")
+    for nombre, store in (('bytea', ByteaStorage()), ('chunks', ChunkedStorage())):
+        r = bench(store, data, args.repeat)
+        print(f"{nombre:<8} {r['insert_ms']:>10.1f} {r['read_full_ms']:>10.1f} "
+              f"{r['read_range_ms']:>10.1f} {r['update_one_chunk_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga de las operaciones de tracks: subida, lectura,
+actualización y borrado concurrentes con pistas de distintos tamaños.
+
+Uso:
+    python benchmarks/bench_tracks.py [--sizes 100K,1M,10M,100M] [--mix upload=1,get=6,update=2,delete=1]
+                                      [--concurrency 8] [--duration 20] [--server gunicorn]
+                                      [--format json] [--seed 1] [--output resultados.json]
+
+Arranca un SYU de pega que acepta cualquier token con read:tracks y
+write:tracks, y `python -m swagger_server` con WEB_SERVER=--server apuntando
+a él. La base de datos es la de las variables DB_* si DB_HOST está definida.
+Si no, se crea un cluster de Postgres temporal con initdb, que necesita los
+binarios de Postgres en el PATH o en /usr/lib/postgresql/*/bin, y se borra
+al terminar.
+
+Para cada tamaño, cada cliente sube primero sus propias pistas y después
+lanza operaciones al azar según --mix durante --duration segundos. Cada
+cliente solo lee, actualiza y borra sus propias pistas, así que no hay 404
+por carreras entre clientes. El audio es aleatorio y sale de --seed, así que
+dos ejecuciones con los mismos argumentos lanzan la misma carga.
+
+Por operación y tamaño se mide el throughput (op/s y MB/s), las latencias
+p50/p95/p99 y los errores. Por tamaño se mide el pico de RSS del servidor y
+sus workers, muestreado de /proc. Con --output se escribe todo en JSON.
+"""
+import argparse
+import base64
+import glob
+import http.client
+import http.server
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_server import RAIZ, _esperar, _puerto_libre
+
+UNIDADES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+OPERACIONES = ('upload', 'get', 'update', 'delete')
+TOKEN = 'bench'
+# Pistas que sube cada cliente antes de medir
+PISTAS_INICIALES = 2
+# Cada cuántos segundos se muestrea el RSS del servidor
+RSS_INTERVALO = 0.1
+
+
+def _tamano(texto):
+    texto = texto.strip().upper().rstrip('B')
+    if texto[-1] in UNIDADES:
+        return int(float(texto[:-1]) * UNIDADES[texto[-1]])
+    return int(texto)
+
+
+def _mezcla(texto):
+    pesos = {}
+    for parte in texto.split(','):
+        operacion, peso = parte.split('=')
+        if operacion not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{operacion}'")
+        pesos[operacion] = float(peso)
+    return pesos
+
+
+class _SYU(http.server.BaseHTTPRequestHandler):
+    """SYU de pega: GET /auth con cualquier cookie oversound_auth es un usuario con todos los scopes"""
+
+    def do_GET(self):
+        if self.path == '/auth' and 'oversound_auth=' in self.headers.get('Cookie', ''):
+            cuerpo = json.dumps({'userId': 1, 'username': 'bench',
+                                 'scopes': ['read:tracks', 'write:tracks']}).encode()
+            self.send_response(200)
+        else:
+            cuerpo = b'{}'
+            self.send_response(401)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def arrancar_syu():
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _SYU)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def _binario_pg(nombre):
+    ruta = shutil.which(nombre)
+    if ruta:
+        return ruta
+    candidatos = sorted(glob.glob(f"/usr/lib/postgresql/*/bin/{nombre}"))
+    if not candidatos:
+        raise RuntimeError(f"No DB_HOST and no '{nombre}' found to start a temporary Postgres")
+    return candidatos[-1]
+
+
+class PostgresTemporal(object):
+    """Cluster de Postgres desechable en un directorio temporal"""
+
+    def __init__(self):
+        self.directorio = tempfile.mkdtemp(prefix='pt-bench-pg-')
+        self.port = _puerto_libre()
+
+    def __enter__(self):
+        datos = os.path.join(self.directorio, 'data')
+        subprocess.run([_binario_pg('initdb'), '-D', datos, '-U', 'pt_admin', '--auth=trust', '-E', 'UTF8'],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([_binario_pg('pg_ctl'), '-D', datos, '-w', '-l', os.path.join(self.directorio, 'log'),
+                        '-o', f"-p {self.port} -k {self.directorio} -c listen_addresses=127.0.0.1", 'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([_binario_pg('createdb'), '-h', '127.0.0.1', '-p', str(self.port), '-U', 'pt_admin', 'pt'],
+                       check=True)
+        return {'DB_HOST': '127.0.0.1', 'DB_PORT': str(self.port), 'DB_NAME': 'pt',
+                'DB_USER': 'pt_admin', 'DB_PWD': ''}
+
+    def __exit__(self, *exc):
+        subprocess.run([_binario_pg('pg_ctl'), '-D', os.path.join(self.directorio, 'data'), '-m', 'fast', 'stop'],
+                       stdout=subprocess.DEVNULL)
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+
+def crear_esquema(entorno):
+    """Tabla tracks y esquema del backend de TRACK_STORAGE en una base de datos vacía"""
+    import psycopg2
+    conexion = psycopg2.connect(host=entorno['DB_HOST'], port=entorno['DB_PORT'], dbname=entorno['DB_NAME'],
+                                user=entorno['DB_USER'], password=entorno['DB_PWD'])
+    with conexion, conexion.cursor() as cur:
+        cur.execute("CREATE TABLE IF NOT EXISTS tracks (idtrack bigserial PRIMARY KEY, track bytea NOT NULL)")
+    conexion.close()
+    subprocess.run([sys.executable, '-m', 'swagger_server.storage'], cwd=RAIZ, env=entorno, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def _rss_arbol(pid):
+    """RSS en bytes del proceso y todos sus descendientes (Linux)"""
+    hijos = {}
+    for stat in glob.glob('/proc/[0-9]*/stat'):
+        try:
+            with open(stat) as f:
+                campos = f.read().rsplit(')', 1)[1].split()
+            hijos.setdefault(int(campos[1]), []).append(int(stat.split('/')[2]))
+        except (OSError, IndexError, ValueError):
+            continue
+    total, pendientes = 0, [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        pendientes.extend(hijos.get(actual, []))
+        try:
+            with open(f"/proc/{actual}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            continue
+    return total
+
+
+class MonitorRSS(object):
+    """Pico de RSS del árbol de procesos del servidor mientras está activo"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.pico = 0
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+
+    def _bucle(self):
+        while not self._parar.wait(RSS_INTERVALO):
+            self.pico = max(self.pico, _rss_arbol(self.pid))
+
+    def __enter__(self):
+        self.pico = 0
+        if os.path.isdir('/proc'):
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, daemon=True)
+            self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        if self._hilo.is_alive():
+            self._hilo.join()
+
+
+class Cliente(object):
+    """Un cliente HTTP con sus propias pistas"""
+
+    def __init__(self, port, cuerpo, content_type, semilla):
+        self.aleatorio = random.Random(semilla)
+        self.conexion = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+        self.cuerpo = cuerpo
+        self.content_type = content_type
+        self.pistas = []
+
+    def _peticion(self, metodo, ruta, cuerpo=None):
+        headers = {'Cookie': f"oversound_auth={TOKEN}"}
+        if cuerpo is not None:
+            headers['Content-Type'] = self.content_type
+        try:
+            self.conexion.request(metodo, ruta, body=cuerpo, headers=headers)
+            respuesta = self.conexion.getresponse()
+            return respuesta.status, respuesta.read()
+        except (OSError, http.client.HTTPException):
+            self.conexion.close()
+            return None, b''
+
+    def upload(self):
+        status, cuerpo = self._peticion('POST', '/track/upload', self.cuerpo)
+        if status in (200, 201):
+            self.pistas.append(json.loads(cuerpo)['idtrack'])
+        return status
+
+    def get(self):
+        return self._peticion('GET', f"/track/{self.aleatorio.choice(self.pistas)}")[0]
+
+    def update(self):
+        return self._peticion('PATCH', f"/track/{self.aleatorio.choice(self.pistas)}", self.cuerpo)[0]
+
+    def delete(self):
+        track_id = self.pistas.pop(self.aleatorio.randrange(len(self.pistas)))
+        return self._peticion('DELETE', f"/track/{track_id}")[0]
+
+    def limpiar(self):
+        while self.pistas:
+            self.delete()
+        self.conexion.close()
+
+
+def _trabajar(cliente, mezcla, hasta, muestras):
+    operaciones, pesos = zip(*mezcla.items())
+    while time.monotonic() < hasta:
+        operacion = cliente.aleatorio.choices(operaciones, pesos)[0]
+        # Sin pistas propias solo se puede subir
+        if operacion != 'upload' and not cliente.pistas:
+            operacion = 'upload'
+        inicio = time.perf_counter()
+        status = getattr(cliente, operacion)()
+        muestras.append((operacion, (time.perf_counter() - inicio) * 1000, status))
+
+
+def _resumen(size, operacion, muestras, duracion):
+    latencias = [ms for op, ms, status in muestras if op == operacion and status is not None and status < 400]
+    errores = sum(1 for op, ms, status in muestras if op == operacion and (status is None or status >= 400))
+    resumen = {'size_bytes': size, 'operation': operacion, 'ok': len(latencias), 'errors': errores,
+               'ops_per_s': len(latencias) / duracion,
+               'mb_per_s': len(latencias) * size / duracion / 1024 ** 2 if operacion != 'delete' else None,
+               'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    if len(latencias) >= 2:
+        percentiles = statistics.quantiles(latencias, n=100, method='inclusive')
+        resumen.update(p50_ms=percentiles[49], p95_ms=percentiles[94], p99_ms=percentiles[98])
+    elif latencias:
+        resumen.update(p50_ms=latencias[0], p95_ms=latencias[0], p99_ms=latencias[0])
+    return resumen
+
+
+def bench_size(port, pid, size, args):
+    audio = random.Random(f"{args.seed}-{size}").randbytes(size)
+    if args.format == 'json':
+        cuerpo, content_type = b'{"track": "' + base64.b64encode(audio) + b'"}', 'application/json'
+    else:
+        cuerpo, content_type = audio, 'application/octet-stream'
+    del audio
+
+    clientes = [Cliente(port, cuerpo, content_type, f"{args.seed}-{size}-{i}") for i in range(args.concurrency)]
+    for cliente in clientes:
+        for _ in range(PISTAS_INICIALES):
+            cliente.upload()
+
+    muestras = []
+    with MonitorRSS(pid) as monitor:
+        hasta = time.monotonic() + args.duration
+        hilos = [threading.Thread(target=_trabajar, args=(cliente, args.mix, hasta, muestras))
+                 for cliente in clientes]
+        inicio = time.monotonic()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.monotonic() - inicio
+
+    for cliente in clientes:
+        cliente.limpiar()
+    return ([_resumen(size, operacion, muestras, duracion) for operacion in OPERACIONES if operacion in args.mix],
+            {'size_bytes': size, 'peak_rss_bytes': monitor.pico or None, 'duration_s': duracion})
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _imprimir(resultados, memoria):
+    print(f"{'size':>10} {'op':<7} {'ok':>6} {'err':>5} {'op/s':>9} {'MB/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    formato = lambda v: f"{v:.1f}" if v is not None else '-'  # noqa: E731
+    for r in resultados:
+        print(f"{r['size_bytes']:>10} {r['operation']:<7} {r['ok']:>6} {r['errors']:>5} {r['ops_per_s']:>9.1f} "
+              f"{formato(r['mb_per_s']):>8} {formato(r['p50_ms']):>9} {formato(r['p95_ms']):>9} "
+              f"{formato(r['p99_ms']):>9}")
+    for m in memoria:
+        pico = f"{m['peak_rss_bytes'] / 1024 ** 2:.0f} MB" if m['peak_rss_bytes'] else '-'
+        print(f"{m['size_bytes']:>10} peak RSS {pico}")
+
+
+def ejecutar(args, entorno_db):
+    syu, url_syu = arrancar_syu()
+    port = _puerto_libre()
+    entorno = dict(os.environ, **entorno_db, WEB_SERVER=args.server, HOST='127.0.0.1', PORT=str(port),
+                   HOST_SYU=url_syu)
+    proceso = subprocess.Popen([sys.executable, '-m', 'swagger_server'], cwd=RAIZ, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    resultados, memoria = [], []
+    try:
+        _esperar(port)
+        for size in args.sizes:
+            print(f"{size} bytes...", file=sys.stderr)
+            filas, pico = bench_size(port, proceso.pid, size, args)
+            resultados.extend(filas)
+            memoria.append(pico)
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+        syu.shutdown()
+    return resultados, memoria
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga de subida/lectura/actualización/borrado")
+    parser.add_argument('--sizes', type=lambda t: [_tamano(s) for s in t.split(',')], default='100K,1M,10M,100M')
+    parser.add_argument('--mix', type=_mezcla, default='upload=1,get=6,update=2,delete=1')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help="Segundos de carga por tamaño")
+    parser.add_argument('--server', default='gunicorn', help="WEB_SERVER del servicio")
+    parser.add_argument('--format', choices=('json', 'binary'), default='json',
+                        help="Cuerpo de subidas y actualizaciones: JSON con base64 o application/octet-stream")
+    parser.add_argument('--seed', default='1')
+    parser.add_argument('--output', default=None, help="Fichero JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    if os.getenv('DB_HOST'):
+        resultados, memoria = ejecutar(args, {})
+        base_datos = 'external'
+    else:
+        with PostgresTemporal() as entorno_db:
+            crear_esquema(dict(os.environ, **entorno_db))
+            resultados, memoria = ejecutar(args, entorno_db)
+        base_datos = 'temporary'
+
+    _imprimir(resultados, memoria)
+    if args.output:
+        informe = {
+            'meta': {
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'commit': _commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'server': args.server,
+                'storage': os.getenv('TRACK_STORAGE', 'bytea'),
+                'database': base_datos,
+                'format': args.format,
+                'concurrency': args.concurrency,
+                'duration_s': args.duration,
+                'mix': args.mix,
+                'seed': args.seed,
+            },
+            'results': resultados,
+            'memory': memoria,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(informe, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,30 @@
 #!/usr/bin/env python3
 
-import connexion
-
-from swagger_server import encoder
+from swagger_server import ingest
+from swagger_server.app import create_app, create_aio_app
 import os
 
+# 'flask' (servidor de desarrollo, un proceso), 'gunicorn' (pre-fork, producción)
+# o 'aiohttp' (controladores async def en un event loop)
+WEB_SERVER = os.getenv('WEB_SERVER', 'flask')
+
+
 def main():
-    app = connexion.App(__name__, specification_dir='./swagger/')
-    app.app.json_encoder = encoder.JSONEncoder
-    app.add_api('swagger.yaml', arguments={'title': 'Proveedor de Pistas (PP)', 'host': '0.0.0.0'}, pythonic_params=True)
-    app.run(host=os.environ.get('HOST', '0.0.0.0'), port=int(os.environ.get('PORT', 8082)))
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 8082))
+    if WEB_SERVER == 'gunicorn':
+        from swagger_server import server
+        server.run(create_app().app, host, port)
+    elif WEB_SERVER == 'flask':
+        app = create_app()
+        ingest.resume()
+        app.run(host=host, port=port)
+    elif WEB_SERVER == 'aiohttp':
+        app = create_aio_app()
+        ingest.resume()
+        app.run(host=host, port=port)
+    else:
+        raise ValueError(f"Unknown WEB_SERVER '{WEB_SERVER}'")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,69 @@
+# coding: utf-8
+
+import os
+
+import connexion
+import yaml
+
+from connexion.jsonifier import Jsonifier
+
+from swagger_server import encoder, json_backend, metrics, profiling
+from swagger_server.controllers import track_controller
+
+SPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'swagger', 'swagger.yaml')
+CONTROLLERS = 'swagger_server.controllers.'
+AIO_CONTROLLERS = 'swagger_server.controllers.aio.'
+
+
+def create_app():
+    """Crea la app de Connexion con la API y los hooks del servicio"""
+    app = connexion.App(__name__, specification_dir='./swagger/')
+    app.app.json_encoder = encoder.JSONEncoder
+    # JSON_BACKEND: JSONEncoder queda como respaldo para lo que orjson no escribe igual
+    app.app.json = json_backend.JSONProvider(app.app)
+    app.add_api('swagger.yaml', arguments={'title': 'Proveedor de Pistas (PP)', 'host': '0.0.0.0'}, pythonic_params=True)
+    # marcar_operacion tiene que ir antes de stream_upload, que puede responder sin pasar al resto
+    app.app.before_request(metrics.marcar_operacion)
+    app.app.before_request(track_controller.stream_upload)
+    app.app.wsgi_app = metrics.MetricsMiddleware(app.app.wsgi_app)
+    if profiling.PROFILE_TOKEN:
+        app.app.wsgi_app = profiling.ProfilerMiddleware(app.app.wsgi_app)
+    return app
+
+
+def _aio_spec():
+    """La misma especificación, apuntando a los controladores de swagger_server.controllers.aio"""
+    with open(SPEC_PATH) as fichero:
+        spec = yaml.safe_load(fichero)
+    for operaciones in spec['paths'].values():
+        for operacion in operaciones.values():
+            if not isinstance(operacion, dict):
+                continue
+            controlador = operacion.get('x-openapi-router-controller', '')
+            if controlador.startswith(CONTROLLERS):
+                operacion['x-openapi-router-controller'] = controlador.replace(CONTROLLERS, AIO_CONTROLLERS, 1)
+    for esquema in spec['components']['securitySchemes'].values():
+        funcion = esquema.get('x-apikeyInfoFunc', '')
+        if funcion.startswith(CONTROLLERS):
+            esquema['x-apikeyInfoFunc'] = funcion.replace(CONTROLLERS, AIO_CONTROLLERS, 1)
+    return spec
+
+
+def create_aio_app():
+    """Crea la app de Connexion sobre aiohttp, con los controladores async def"""
+    from connexion.apis.aiohttp_api import AioHttpApi
+    from swagger_server.controllers.aio import authorization_controller, track_controller as aio_track_controller
+    from swagger_server.controllers.dbconx.aio import abrirPoolAsync, cerrarPoolAsync
+
+    app = connexion.AioHttpApp(__name__, specification_dir='./swagger/', only_one_api=True)
+    app.add_api(_aio_spec(), pythonic_params=True, pass_context_arg_name='request')
+    # Mismo JSON que el jsonifier de Connexion en Flask, con JSON_BACKEND (Connexion lo usa como atributo de clase)
+    AioHttpApi.jsonifier = Jsonifier(json_backend, indent=2)
+    # Con only_one_api la app es la de la API: los middlewares van delante de los de Connexion
+    app.app.middlewares.insert(0, aio_track_controller.stream_upload)
+    app.app.middlewares.insert(0, metrics.aiohttp_middleware())
+    app.app.on_startup.append(abrirPoolAsync)
+    app.app.on_startup.append(authorization_controller.abrir_sesion)
+    app.app.on_cleanup.append(authorization_controller.cerrar_sesion)
+    app.app.on_cleanup.append(cerrarPoolAsync)
+    return app
@@ -0,0 +1,501 @@
+# coding: utf-8
+
+import bisect
+import collections
+import re
+import struct
+import sys
+
+# Bytes de cabecera necesarios para reconocer el formato
+SNIFF_BYTES = 12
+# Bytes del principio del audio (y de tras la etiqueta ID3) que guarda AudioSniffer
+SNIFF_HEAD = 64 * 1024
+# Bytes del final que guarda AudioSniffer: caben la última página Ogg y la etiqueta ID3v1
+SNIFF_TAIL = 64 * 1024 + 512
+# Separación entre los puntos del índice de búsqueda por tiempo (MP3 y WAV)
+SEEK_INTERVAL_MS = 1000
+# Tamaño máximo de un bloque que SeekIndexer tiene que leer entero (fmt de WAV, SEEKTABLE de FLAC)
+SEEK_MAX_BLOCK = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def detect_mime(head):
+    """Detects the audio MIME type from the first bytes of a file.
+
+    :param head: first bytes of the file (at least SNIFF_BYTES).
+    :type head: bytes
+    :return: MIME type, application/octet-stream if unknown.
+    :rtype: str
+    """
+    head = bytes(head or b'')
+    if head.startswith(b'ID3') or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'audio/mpeg'
+    if head.startswith(b'RIFF') and head[8:12] == b'WAVE':
+        return 'audio/wav'
+    if head.startswith(b'fLaC'):
+        return 'audio/flac'
+    if head.startswith(b'OggS'):
+        return 'audio/ogg'
+    if head[4:8] == b'ftyp':
+        return 'audio/mp4'
+    return 'application/octet-stream'
+
+
+# MPEG audio: (versión, capa) -> bitrates en kbps por índice
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Bits de versión -> (versión para las tablas, frecuencias de muestreo)
+_MP3_VERSIONS = {
+    3: (1, (44100, 48000, 32000)),
+    2: (2, (22050, 24000, 16000)),
+    0: (2, (11025, 12000, 8000)),
+}
+
+
+def _mp3_header(data, i):
+    """(bitrate, sample_rate, samples por trama, longitud de trama, mono, mpeg1) de la trama en i, o None"""
+    if i + 4 > len(data) or data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[i + 1], data[i + 2], data[i + 3]
+    version_bits, layer_bits = (b1 >> 3) & 3, (b1 >> 1) & 3
+    bitrate_index, rate_index, padding = b2 >> 4, (b2 >> 2) & 3, (b2 >> 1) & 1
+    if version_bits not in _MP3_VERSIONS or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version, rates = _MP3_VERSIONS[version_bits]
+    layer = 4 - layer_bits
+    bitrate = _MP3_BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = rates[rate_index]
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version == 2:
+        samples, length = 576, 72 * bitrate // sample_rate + padding
+    else:
+        samples, length = 1152, 144 * bitrate // sample_rate + padding
+    return bitrate, sample_rate, samples, length, b3 >> 6 == 3, version == 1
+
+
+def _mp3_info(frames, audio_size):
+    """(duración en s, bitrate, sample_rate) de un MP3 a partir de su primera trama"""
+    # Una cabecera suelta puede ser casualidad: la siguiente trama también tiene que serlo
+    i = frames.find(b'\xff')
+    while i >= 0:
+        header = _mp3_header(frames, i)
+        if header is not None and (i + header[3] + 4 > len(frames) or _mp3_header(frames, i + header[3])):
+            break
+        i = frames.find(b'\xff', i + 1)
+    else:
+        return None
+
+    bitrate, sample_rate, samples, length, mono, mpeg1 = header
+    audio_size -= i
+    # Cabecera Xing/Info (VBR y LAME) tras la información lateral, o VBRI de Fraunhofer
+    lateral = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = i + 4 + lateral
+    tramas = None
+    if frames[xing:xing + 4] in (b'Xing', b'Info'):
+        flags, = struct.unpack('>I', frames[xing + 4:xing + 8])
+        if flags & 1:
+            tramas, = struct.unpack('>I', frames[xing + 8:xing + 12])
+    elif frames[i + 36:i + 40] == b'VBRI':
+        tramas, = struct.unpack('>I', frames[i + 50:i + 54])
+    if tramas:
+        duracion = tramas * samples / sample_rate
+        return duracion, int(audio_size * 8 / duracion), sample_rate
+    return audio_size * 8 / bitrate, bitrate, sample_rate
+
+
+def _mp3_is_info_frame(frames, i, header):
+    """True si la trama en i es la cabecera Xing/Info/VBRI, que no lleva audio"""
+    mono, mpeg1 = header[4], header[5]
+    xing = i + 4 + ((17 if mono else 32) if mpeg1 else (9 if mono else 17))
+    return frames[xing:xing + 4] in (b'Xing', b'Info') or frames[i + 36:i + 40] == b'VBRI'
+
+
+def _wav_info(head, size):
+    posicion, byte_rate, sample_rate = 12, None, None
+    while posicion + 8 <= len(head):
+        chunk_id = head[posicion:posicion + 4]
+        chunk_size, = struct.unpack('<I', head[posicion + 4:posicion + 8])
+        if chunk_id == b'fmt ':
+            sample_rate, byte_rate = struct.unpack('<II', head[posicion + 12:posicion + 20])
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            # Los WAV escritos en streaming pueden llevar 0 o 0xFFFFFFFF como tamaño
+            datos = min(chunk_size, size - posicion - 8) if chunk_size else size - posicion - 8
+            return datos / byte_rate, byte_rate * 8, sample_rate
+        posicion += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _flac_info(head, size):
+    # STREAMINFO es siempre el primer bloque de metadatos
+    if len(head) < 42 or head[4] & 0x7F != 0:
+        return None
+    campos = int.from_bytes(head[18:26], 'big')
+    sample_rate, muestras = campos >> 44, campos & ((1 << 36) - 1)
+    if not sample_rate or not muestras:
+        return None
+    duracion = muestras / sample_rate
+    return duracion, int(size * 8 / duracion), sample_rate
+
+
+def _ogg_info(head, tail, size):
+    if len(head) < 28:
+        return None
+    paquete = head[27 + head[26]:]
+    if paquete.startswith(b'\x01vorbis'):
+        sample_rate, = struct.unpack('<I', paquete[12:16])
+        pre_skip, reloj = 0, sample_rate
+    elif paquete.startswith(b'OpusHead'):
+        # Opus siempre se decodifica a 48 kHz; la granule position cuenta a 48 kHz
+        pre_skip, = struct.unpack('<H', paquete[10:12])
+        sample_rate = reloj = 48000
+    else:
+        return None
+    ultima = tail.rfind(b'OggS')
+    if ultima < 0 or not reloj:
+        return None
+    granule, = struct.unpack('<q', tail[ultima + 6:ultima + 14])
+    duracion = (granule - pre_skip) / reloj
+    if duracion <= 0:
+        return None
+    return duracion, int(size * 8 / duracion), sample_rate
+
+
+class SeekIndexer(object):
+    """Builds the time to byte offset index of an audio file while it is
+    written, keeping only the bytes of the frame or block being read.
+
+    - MP3: one point every SEEK_INTERVAL_MS, at the start of a frame, from
+      the frame headers of the whole file.
+    - FLAC: the points of the SEEKTABLE block, if the file has one.
+    - WAV: one point every SEEK_INTERVAL_MS, aligned to the sample frames.
+
+    Every index starts with the point (0, offset of the first audio byte).
+    """
+
+    def __init__(self, interval_ms=SEEK_INTERVAL_MS):
+        self.interval_ms = interval_ms
+        self.size = 0
+        self._formato = None
+        self._buffer = bytearray()
+        # Posición absoluta de _buffer[0] y del siguiente bloque o trama que hay que leer
+        self._base = 0
+        self._pos = 0
+        self._points = []
+        # MP3
+        self._segundos = 0.0
+        self._siguiente_ms = 0
+        self._sincronizado = False
+        # FLAC y WAV
+        self._sample_rate = None
+        self._seektable = []
+        self._byte_rate = None
+        self._block_align = None
+        self._data = None
+
+    def feed(self, data):
+        """Adds the next chunk of the file"""
+        self._buffer += data
+        self.size += len(data)
+        if self._formato is None:
+            if len(self._buffer) < SNIFF_BYTES:
+                return
+            self._empezar()
+        if self._formato == 'mp3':
+            self._mp3()
+        elif self._formato == 'flac':
+            self._flac()
+        elif self._formato == 'wav':
+            self._wav()
+        if self._formato in ('otro', 'hecho'):
+            self._pos = self.size
+        # Lo anterior a _pos ya no se necesita
+        corte = min(self._pos - self._base, len(self._buffer))
+        del self._buffer[:corte]
+        self._base += corte
+
+    def _empezar(self):
+        mime = detect_mime(self._buffer)
+        if mime == 'audio/mpeg':
+            self._formato, self._pos = 'mp3', AudioSniffer._id3_end(self._buffer)
+        elif mime == 'audio/flac':
+            self._formato, self._pos = 'flac', 4
+        elif mime == 'audio/wav':
+            self._formato, self._pos = 'wav', 12
+        else:
+            self._formato = 'otro'
+
+    def _bloque(self, longitud, salto=0):
+        """Los longitud bytes desde _pos + salto, o None si aún no han llegado"""
+        i = self._pos + salto - self._base
+        if i < 0 or i + longitud > len(self._buffer):
+            return None
+        return self._buffer[i:i + longitud]
+
+    def _mp3(self):
+        while True:
+            i = self._pos - self._base
+            if i + 4 > len(self._buffer):
+                return
+            header = _mp3_header(self._buffer, i)
+            if header is not None and not self._sincronizado:
+                # Como en _mp3_info, la primera trama (o la de tras basura) se confirma con la siguiente
+                if i + header[3] + 4 > len(self._buffer):
+                    return
+                if _mp3_header(self._buffer, i + header[3]) is None:
+                    header = None
+                elif not self._points and _mp3_is_info_frame(self._buffer, i, header):
+                    self._pos += header[3]
+                    continue
+            if header is None:
+                self._sincronizado = False
+                siguiente = self._buffer.find(b'\xff', i + 1)
+                self._pos = self._base + (siguiente if siguiente >= 0 else len(self._buffer))
+                continue
+            self._sincronizado = True
+            ms = int(self._segundos * 1000)
+            if ms >= self._siguiente_ms:
+                self._points.append((ms, self._pos))
+                self._siguiente_ms = (ms // self.interval_ms + 1) * self.interval_ms
+            self._segundos += header[2] / header[1]
+            self._pos += header[3]
+
+    def _flac(self):
+        while self._formato == 'flac':
+            cabecera = self._bloque(4)
+            if cabecera is None:
+                return
+            ultimo, tipo = cabecera[0] & 0x80, cabecera[0] & 0x7F
+            longitud = int.from_bytes(cabecera[1:4], 'big')
+            if tipo in (0, 3):
+                if longitud > SEEK_MAX_BLOCK:
+                    self._formato = 'otro'
+                    return
+                cuerpo = self._bloque(longitud, 4)
+                if cuerpo is None:
+                    return
+                if tipo == 0:
+                    self._sample_rate = int.from_bytes(cuerpo[10:18], 'big') >> 44
+                else:
+                    for j in range(0, longitud - 17, 18):
+                        muestra, offset = struct.unpack('>QQ', cuerpo[j:j + 16])
+                        # 0xFFFFFFFFFFFFFFFF marca los puntos reservados sin usar
+                        if muestra != 0xFFFFFFFFFFFFFFFF:
+                            self._seektable.append((muestra, offset))
+            self._pos += 4 + longitud
+            if ultimo:
+                # Fin de los metadatos: aquí empieza la primera trama
+                self._data = self._pos
+                self._formato = 'hecho'
+
+    def _wav(self):
+        while self._formato == 'wav':
+            cabecera = self._bloque(8)
+            if cabecera is None:
+                return
+            chunk_id = bytes(cabecera[:4])
+            chunk_size, = struct.unpack('<I', cabecera[4:8])
+            if chunk_id == b'fmt ':
+                if chunk_size > SEEK_MAX_BLOCK:
+                    self._formato = 'otro'
+                    return
+                cuerpo = self._bloque(chunk_size, 8)
+                if cuerpo is None:
+                    return
+                self._byte_rate, self._block_align = struct.unpack('<IH', cuerpo[8:14])
+            elif chunk_id == b'data':
+                self._data = self._pos + 8
+                self._formato = 'hecho'
+                return
+            self._pos += 8 + chunk_size + (chunk_size & 1)
+
+    def points(self):
+        """Returns the index as a list of (milliseconds, byte offset), in order.
+
+        :rtype: list
+        """
+        if self._data is not None and self._byte_rate and self._block_align:
+            # WAV: todas las muestras ocupan lo mismo
+            puntos, ms = [], 0
+            while True:
+                offset = self._data + ms * self._byte_rate // 1000 // self._block_align * self._block_align
+                if offset >= self.size:
+                    return puntos
+                puntos.append((ms, offset))
+                ms += self.interval_ms
+        if self._data is not None and self._sample_rate:
+            # FLAC: los offsets de SEEKTABLE cuentan desde la primera trama
+            puntos = [(0, self._data)]
+            for muestra, offset in self._seektable:
+                ms = muestra * 1000 // self._sample_rate
+                if ms > puntos[-1][0] and self._data + offset < self.size:
+                    puntos.append((ms, self._data + offset))
+            return puntos
+        return list(self._points)
+
+
+def pack_seek_index(points):
+    """Packs (milliseconds, offset) points as little-endian int64 pairs; None if there are none.
+
+    :rtype: bytes
+    """
+    if not points:
+        return None
+    return struct.pack('<%dq' % (2 * len(points)), *(valor for punto in points for valor in punto))
+
+
+def seek_lookup(index, ms):
+    """Finds the last point of a packed seek index at or before ms, by binary search.
+
+    :param index: index written by pack_seek_index.
+    :type index: bytes
+    :return: (milliseconds, byte offset) of the point.
+    :rtype: tuple
+    """
+    if sys.byteorder == 'little':
+        valores = memoryview(index).cast('q')
+    else:  # pragma: no cover - depende de la máquina
+        valores = struct.unpack('<%dq' % (len(index) // 8), index)
+    tiempos = valores[::2]
+    i = max(bisect.bisect_right(tiempos, ms) - 1, 0)
+    return valores[2 * i], valores[2 * i + 1]
+
+
+class AudioSniffer(object):
+    """Reads the format, duration, bitrate and sample rate of an audio file
+    while it is written, keeping only its first and last bytes.
+
+    Supports MP3 (with or without ID3v2, CBR, Xing/Info and VBRI), WAV, FLAC
+    and Ogg Vorbis/Opus. Other formats only get size and MIME type.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self._head = bytearray()
+        # Ventana de SNIFF_HEAD bytes tras la etiqueta ID3v2, donde empieza el MP3
+        self._frames_at = None
+        self._frames = bytearray()
+        self._tail = collections.deque()
+        self._tail_size = 0
+        self._indexer = SeekIndexer()
+
+    def feed(self, data):
+        """Adds the next chunk of the file"""
+        data = bytes(data)
+        self._indexer.feed(data)
+        offset = self.size
+        self.size += len(data)
+
+        if len(self._head) < SNIFF_HEAD:
+            self._head += data[:SNIFF_HEAD - len(self._head)]
+            if self._frames_at is None and len(self._head) >= 10:
+                self._frames_at = self._id3_end(self._head)
+                self._frames = bytearray(self._head[self._frames_at:])
+        if self._frames_at is not None and len(self._frames) < SNIFF_HEAD:
+            desde = self._frames_at + len(self._frames) - offset
+            if 0 <= desde < len(data):
+                self._frames += data[desde:desde + SNIFF_HEAD - len(self._frames)]
+
+        # Últimos trozos, sin copiarlos, hasta cubrir SNIFF_TAIL
+        self._tail.append(data)
+        self._tail_size += len(data)
+        while self._tail_size - len(self._tail[0]) >= SNIFF_TAIL:
+            self._tail_size -= len(self._tail.popleft())
+
+    @staticmethod
+    def _id3_end(head):
+        if not head.startswith(b'ID3'):
+            return 0
+        # Tamaño syncsafe: 7 bits por byte, más el pie si lo indica el flag
+        tamano = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        return 10 + tamano + (10 if head[5] & 0x10 else 0)
+
+    def seek_index(self):
+        """Returns the packed seek index (see SeekIndexer), or None.
+
+        :rtype: bytes
+        """
+        return pack_seek_index(self._indexer.points())
+
+    def info(self):
+        """Returns the metadata of what has been fed so far.
+
+        :return: dict with size_bytes, mime, duration_ms, bitrate (bits/s)
+            and sample_rate; the last three are None if unknown.
+        :rtype: dict
+        """
+        head = bytes(self._head)
+        mime = detect_mime(head)
+        resultado = None
+        try:
+            if mime == 'audio/mpeg':
+                audio = self.size - (self._frames_at or 0)
+                tail = b''.join(self._tail)[-SNIFF_TAIL:]
+                if tail[-128:-125] == b'TAG':
+                    audio -= 128
+                resultado = _mp3_info(bytes(self._frames), audio)
+            elif mime == 'audio/wav':
+                resultado = _wav_info(head, self.size)
+            elif mime == 'audio/flac':
+                resultado = _flac_info(head, self.size)
+            elif mime == 'audio/ogg':
+                resultado = _ogg_info(head, b''.join(self._tail)[-SNIFF_TAIL:], self.size)
+        except (struct.error, ValueError, ZeroDivisionError):
+            resultado = None
+        duracion, bitrate, sample_rate = resultado or (None, None, None)
+        return {
+            'size_bytes': self.size,
+            'mime': mime,
+            'duration_ms': int(round(duracion * 1000)) if duracion is not None else None,
+            'bitrate': bitrate,
+            'sample_rate': sample_rate,
+        }
+
+
+def parse_range(header, size):
+    """Parses a single HTTP Range header against a resource size.
+
+    Multiple ranges, other units and invalid ranges such as ``bytes=10-5``
+    are ignored (the whole resource is served), as allowed by RFC 7233.
+
+    :param header: value of the Range header, or None.
+    :type header: str
+    :param size: size in bytes of the resource.
+    :type size: int
+    :return: (start, end) inclusive, or None to serve the whole resource.
+    :rtype: tuple
+    :raises ValueError: if the range is not satisfiable.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: los últimos N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        # Rango sintácticamente inválido: se ignora la cabecera (RFC 7233 2.1)
+        return None
+    if start >= size:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
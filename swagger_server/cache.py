@@ -0,0 +1,84 @@
+# coding: utf-8
+
+import os
+import threading
+from collections import OrderedDict
+
+# Límites de la caché de pistas en memoria (por proceso)
+TRACK_CACHE_MAX_BYTES = int(os.getenv('TRACK_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+TRACK_CACHE_MAX_ITEM = int(os.getenv('TRACK_CACHE_MAX_ITEM', 8 * 1024 * 1024))
+
+
+class ByteLRUCache(object):
+    """
+    Caché LRU acotada por bytes totales y por tamaño máximo de cada entrada.
+    Cada entrada guarda la versión con la que se generó: get() con otra
+    versión es un fallo y descarta la entrada.
+    """
+
+    def __init__(self, max_bytes, max_item_bytes):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()    # key -> (version, value)
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entrada = self._entradas.get(key)
+            if entrada is None or entrada[0] != version:
+                if entrada is not None:
+                    self._remove(key)
+                self._misses += 1
+                return None
+            self._entradas.move_to_end(key)
+            self._hits += 1
+            return entrada[1]
+
+    def put(self, key, version, value):
+        """Guarda value si cabe; devuelve False si supera max_item_bytes"""
+        if len(value) > self.max_item_bytes or len(value) > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entradas:
+                self._remove(key)
+            self._entradas[key] = (version, value)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, (_, valor) = self._entradas.popitem(last=False)
+                self._bytes -= len(valor)
+                self._evictions += 1
+        return True
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entradas:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_item_bytes': self.max_item_bytes,
+            }
+
+    def _remove(self, key):
+        _, valor = self._entradas.pop(key)
+        self._bytes -= len(valor)
+
+
+# Cuerpos JSON ya codificados de get_track, por idtrack
+track_cache = ByteLRUCache(TRACK_CACHE_MAX_BYTES, TRACK_CACHE_MAX_ITEM)
@@ -0,0 +1,5 @@
+# coding: utf-8
+"""
+Controladores async def del modo aiohttp (WEB_SERVER=aiohttp).
+Cada módulo sustituye al controlador del mismo nombre en swagger_server.controllers.
+"""
@@ -0,0 +1,78 @@
+import asyncio
+
+import aiohttp
+
+from swagger_server.controllers.authorization_controller import AUTH_SERVER, _cache, has_scopes
+from swagger_server.metrics import fase
+"""
+Validación de tokens contra SYU sin bloquear el event loop.
+Comparte la caché de tokens con el controlador síncrono.
+"""
+
+_session = None
+_en_curso = {}   # token -> asyncio.Future de la consulta a SYU en curso
+
+
+async def abrir_sesion(app=None):
+    """Abre la sesión HTTP con SYU (on_startup de aiohttp)"""
+    global _session
+    if _session is None:
+        _session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2))
+
+
+async def cerrar_sesion(app=None):
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+async def _consultar_syu(token):
+    async with _session.get(f"{AUTH_SERVER}/auth",
+                            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}) as resp:
+        return await resp.json(content_type=None) if resp.status < 400 else None
+
+
+async def is_valid_token(token):
+    """
+    Valida un token. Las consultas simultáneas del mismo token esperan a la
+    primera; los errores de conexión con SYU no se cachean.
+    """
+    with fase('auth'):
+        return await _validar(token)
+
+
+async def _validar(token):
+    encontrado, user_info = _cache.buscar(token)
+    if encontrado:
+        return user_info
+
+    consulta = _en_curso.get(token)
+    if consulta is not None:
+        return await asyncio.shield(consulta)
+
+    consulta = _en_curso[token] = asyncio.get_running_loop().create_future()
+    user_info = None
+    try:
+        user_info = await _consultar_syu(token)
+        _cache.guardar(token, user_info)
+    except Exception as e:
+        print(f"Couldn't connect to SYU microservice: {e}")
+    finally:
+        _en_curso.pop(token, None)
+        consulta.set_result(user_info)
+    return user_info
+
+
+async def check_oversound_auth(api_key, required_scopes):
+    """
+    Verifica autenticación (x-apikeyInfoFunc del modo aiohttp).
+    Devuelve el user_info si el token es válido y tiene los scopes, None si no.
+    """
+    if not api_key:
+        return None
+
+    user_info = await is_valid_token(api_key)
+    if not user_info or not has_scopes(user_info, required_scopes):
+        return None
+    return user_info
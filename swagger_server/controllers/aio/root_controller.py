@@ -0,0 +1,25 @@
+from aiohttp import web
+
+from swagger_server import metrics
+from swagger_server.cache import track_cache
+from swagger_server.controllers.dbconx.aio import estadisticasPoolAsync
+from swagger_server.controllers.root_controller import get_root as _get_root
+
+
+async def get_root():
+    """Gets root"""
+    return _get_root()
+
+
+async def get_stats():
+    """Gets internal counters of the DB pool and the track cache"""
+    return {
+        'db_pool': estadisticasPoolAsync(),
+        'track_cache': track_cache.stats(),
+    }
+
+
+async def get_metrics():
+    """Gets Prometheus metrics of the service"""
+    body, content_type = metrics.exposicion()
+    return web.Response(body=body, headers={'Content-Type': content_type})
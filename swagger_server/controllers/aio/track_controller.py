@@ -0,0 +1,659 @@
+import asyncio
+import re
+import tempfile
+
+from aiohttp import web
+from werkzeug.http import parse_date, parse_etags, parse_if_range_header
+
+from swagger_server.models.error import Error  # noqa: E501
+from swagger_server.models.track import Track  # noqa: E501
+from swagger_server.models.track_batch import TrackBatch  # noqa: E501
+from swagger_server.models.track_info import TrackInfo  # noqa: E501
+from swagger_server import audio_util
+from swagger_server import ingest
+from swagger_server import json_backend
+from swagger_server import storage
+from swagger_server.cache import track_cache
+from swagger_server.storage import TrackSpool, TrackTooLargeError
+from swagger_server.storage import aio as metadata
+from swagger_server.storage.spool import UPLOAD_CHUNK_SIZE, UPLOAD_SPOOL_MEMORY
+from swagger_server.controllers import track_controller
+from swagger_server.controllers.track_controller import (
+    MULTIPART_OVERHEAD, TRACK_BATCH_MAX, TRACK_LIST_MAX, _TRACK_JSON_PREFIX, _TRACK_JSON_SUFFIX,
+    _TRACK_NOT_FOUND_LINE, _Base64Chunks, _accepted, _cache_headers, _decode_track, _enqueue_base64,
+    _info_headers, _ingest_job, _track_json_length, _track_list, _track_peaks)
+from swagger_server.controllers.dbconx.aio import dbConectarAsync, dbDesconectarAsync
+from swagger_server.controllers.aio.authorization_controller import is_valid_token, check_oversound_auth
+"""
+Operaciones de track_controller como async def para el modo aiohttp.
+Mismas respuestas y códigos que el modo WSGI; la espera a SYU, a Postgres y
+a los clientes lentos no ocupa ningún hilo.
+"""
+
+# Subidas que se leen del stream en stream_upload: (método, ruta, operación)
+_RUTAS_SUBIDA = (
+    ('POST', re.compile(r'/track/upload$'), 'add_track'),
+    ('PATCH', re.compile(r'/track/(?P<trackId>\d+)$'), 'update_track'),
+    ('POST', re.compile(r'/tracks/bulk$'), 'add_tracks_bulk'),
+)
+
+
+def _json(body, status, headers=None):
+    # Mismo formato que el jsonifier de Connexion en Flask
+    text = json_backend.dumps(body, indent=2) + '\n'
+    return web.Response(text=text, status=status, content_type='application/json', headers=headers)
+
+
+def _error(code, message):
+    return _json(Error(code=str(code), message=message), code)
+
+
+async def _check_auth(request, required_scopes=None):
+    """Verifica autenticación defensiva (backup de Connexion). Devuelve la respuesta de error o None."""
+    token = request.cookies.get('oversound_auth')
+    if not token or not await is_valid_token(token):
+        return _error(401, "Unauthorized: Missing or invalid token")
+    return None
+
+
+def _not_modified(request, headers, updated_at):
+    """True si la petición condicional ya tiene la versión actual"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(headers['ETag'].strip('"'))
+    if_modified_since = parse_date(request.headers.get('If-Modified-Since'))
+    if if_modified_since:
+        return updated_at.replace(microsecond=0) <= if_modified_since
+    return False
+
+
+async def _size_mime(store, conexion, track_id, info):
+    """Versión asíncrona de track_controller._size_mime"""
+    size = info['size_bytes']
+    if size is None:
+        size = await store.size(conexion, track_id)
+    mime = info['mime']
+    if not mime:
+        cabecera = b''.join([chunk async for chunk in store.read(conexion, track_id, 0, audio_util.SNIFF_BYTES - 1)])
+        mime = audio_util.detect_mime(cabecera)
+    return size, mime
+
+
+async def _enviar(request, conexion, piezas, status=200, headers=None):
+    """
+    Envía piezas en streaming y devuelve la conexión al pool al terminar, si
+    el cliente se corta o si falla el envío de las cabeceras
+    """
+    try:
+        response = web.StreamResponse(status=status, headers=headers)
+        await response.prepare(request)
+        async for pieza in piezas:
+            await response.write(pieza)
+        await response.write_eof()
+        return response
+    finally:
+        await piezas.aclose()
+        await dbDesconectarAsync(conexion)
+
+
+async def _track_json(track_id, chunks):
+    """Versión asíncrona de track_controller._track_json"""
+    yield _TRACK_JSON_PREFIX % track_id
+    codificador = _Base64Chunks()
+    async for chunk in chunks:
+        for pieza in codificador.encode(chunk):
+            yield pieza
+    yield codificador.final()
+    yield _TRACK_JSON_SUFFIX
+
+
+def _track_body(request, body):
+    """
+    Track del cuerpo JSON, o None si no lo es. Con varios tipos de contenido
+    en requestBody Connexion pasa el cuerpo sin leer (en Flask se usa get_json)
+    """
+    if request.content_type != 'application/json':
+        return None
+    if isinstance(body, (bytes, str)):
+        try:
+            body = json_backend.loads(body)
+        except ValueError:
+            return None
+    if not isinstance(body, dict):
+        return None
+    return Track.from_dict(body)
+
+
+async def _spool_from(leer, max_size=None):
+    """
+    Copia al spool lo que devuelve leer(n) (StreamReader.read, BodyPartReader.read_chunk).
+    Cada escritura va a un hilo: el spool puede pasar a disco y calcula los picos
+    """
+    loop = asyncio.get_running_loop()
+    spool = TrackSpool(max_size)
+    try:
+        while True:
+            chunk = await leer(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await loop.run_in_executor(None, spool.write, chunk)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+async def _enqueue_from(leer):
+    """Versión asíncrona de track_controller._enqueue para el audio que devuelve leer(n)"""
+    loop = asyncio.get_running_loop()
+    try:
+        with ingest.ingest_queue.upload('raw', storage.TRACK_MAX_SIZE) as subida:
+            while True:
+                chunk = await leer(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await loop.run_in_executor(None, subida.write, chunk)
+            return _json(*_accepted(subida.submit()))
+    except ingest.IngestQueueFull:
+        return _error(503, "Upload queue is full")
+    except TrackTooLargeError:
+        return _error(413, "Track too large")
+    except OSError as e:
+        print(f"Error al encolar track: {e}")
+        return _error(500, "Could not queue the upload")
+
+
+async def _insert_spool(spool, track_base64=None):
+    store = storage.get_async_storage()
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    try:
+        new_id = await store.insert(conexion, spool)
+        info = await asyncio.get_running_loop().run_in_executor(None, spool.audio_info)
+        await metadata.save_info(conexion, new_id, info)
+        await conexion.commit()
+        return _json(Track(idtrack=new_id, track=track_base64), 201)
+    except Exception as e:
+        await conexion.rollback()
+        print(f"Error al crear track: {e}")
+        return _error(500, "Database error")
+    finally:
+        await dbDesconectarAsync(conexion)
+
+
+async def _update_spool(track_id, spool):
+    store = storage.get_async_storage()
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    try:
+        if not await store.update(conexion, track_id, spool):
+            await conexion.rollback()
+            return _error(404, "Track not found")
+        await metadata.touch(conexion, track_id)
+        info = await asyncio.get_running_loop().run_in_executor(None, spool.audio_info)
+        await metadata.save_info(conexion, track_id, info)
+        await conexion.commit()
+        track_cache.invalidate(track_id)
+        return web.Response(status=204)
+    except Exception as e:
+        await conexion.rollback()
+        print(f"Error al actualizar track: {e}")
+        return _error(500, "Database error")
+    finally:
+        await dbDesconectarAsync(conexion)
+
+
+async def _bulk_upload(request):
+    """
+    add_tracks_bulk: el cuerpo se copia a spools sin bloquear el loop y los
+    lotes se insertan con el camino síncrono en un hilo, con cualquier backend.
+    """
+    loop = asyncio.get_running_loop()
+    if request.content_type == 'multipart/form-data':
+        items = []
+        try:
+            reader = await request.multipart()
+            while True:
+                parte = await reader.next()
+                if parte is None:
+                    break
+                if parte.name != 'track':
+                    await parte.release()
+                    continue
+                try:
+                    items.append((await _spool_from(parte.read_chunk), None))
+                except TrackTooLargeError:
+                    await parte.release()
+                    items.append((None, (Error(code="413", message="Track too large"), 413)))
+            body, status = await loop.run_in_executor(None, track_controller._bulk_insert, iter(items))
+        finally:
+            for spool, _ in items:
+                if spool:
+                    spool.close()
+        return _json(body, status)
+
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY) as cuerpo:
+        while True:
+            chunk = await request.content.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await loop.run_in_executor(None, cuerpo.write, chunk)
+        cuerpo.seek(0)
+        body, status = await loop.run_in_executor(
+            None, lambda: track_controller._bulk_insert(track_controller._ndjson_tracks(cuerpo)))
+    return _json(body, status)
+
+
+@web.middleware
+async def stream_upload(request, handler):
+    """
+    Middleware de aiohttp equivalente a track_controller.stream_upload: las
+    subidas binarias, multipart y NDJSON se leen del stream por trozos antes
+    de que Connexion cargue el cuerpo entero.
+    """
+    for metodo, ruta, operacion in _RUTAS_SUBIDA:
+        encaje = ruta.search(request.path)
+        if request.method == metodo and encaje:
+            break
+    else:
+        return await handler(request)
+
+    tipos = track_controller.BULK_UPLOAD_TYPES if operacion == 'add_tracks_bulk' \
+        else track_controller.STREAM_UPLOAD_TYPES
+    if request.content_type not in tipos:
+        return await handler(request)
+
+    # La seguridad de Connexion no llega a ejecutarse: se comprueba aquí
+    if not await check_oversound_auth(request.cookies.get('oversound_auth'), ['write:tracks']):
+        return _error(401, "Unauthorized: Missing or invalid token")
+
+    if operacion == 'add_tracks_bulk':
+        return await _bulk_upload(request)
+
+    limite = storage.TRACK_MAX_SIZE
+    if request.content_type == 'multipart/form-data':
+        limite += MULTIPART_OVERHEAD
+    if request.content_length and request.content_length > limite:
+        return _error(413, "Track too large")
+
+    if request.content_type == 'multipart/form-data':
+        reader = await request.multipart()
+        while True:
+            parte = await reader.next()
+            if parte is None:
+                return _error(400, "Missing track file")
+            if parte.name == 'track':
+                break
+            await parte.release()
+        leer = parte.read_chunk
+    else:
+        leer = request.content.read
+
+    if operacion == 'add_track' and ingest.enabled():
+        return await _enqueue_from(leer)
+
+    try:
+        spool = await _spool_from(leer)
+    except TrackTooLargeError:
+        return _error(413, "Track too large")
+
+    with spool:
+        if operacion == 'add_track':
+            return await _insert_spool(spool)
+        return await _update_spool(int(encaje.group('trackId')), spool)
+
+
+async def add_track(body, request):
+    """Add a new track to the database"""
+    error_response = await _check_auth(request, required_scopes=['write:tracks'])
+    if error_response:
+        return error_response
+
+    track = _track_body(request, body)
+    if track is None:
+        return _error(400, "Invalid JSON")
+
+    loop = asyncio.get_running_loop()
+    if ingest.enabled():
+        return _json(*await loop.run_in_executor(None, _enqueue_base64, track.track))
+
+    # Decodificar el base64 por trozos a un fichero temporal, en un hilo: puede pasar a disco
+    spool, error_response = await loop.run_in_executor(None, _decode_track, track)
+    if error_response:
+        return _json(*error_response)
+
+    with spool:
+        return await _insert_spool(spool, track.track)
+
+
+async def get_upload_job(job_id, request):
+    """Gets the state of an asynchronous upload"""
+    error_response = await _check_auth(request, required_scopes=['write:tracks'])
+    if error_response:
+        return error_response
+
+    estado = ingest.ingest_queue.status(job_id)
+    if estado is None:
+        return _error(404, "Job not found")
+    return _json(_ingest_job(estado), 200)
+
+
+async def add_tracks_bulk(body, request):
+    """Adds many tracks in batches"""
+    # Las variantes NDJSON y multipart se atienden en stream_upload
+    return _error(415, "Use application/x-ndjson or multipart/form-data")
+
+
+async def get_track(track_id, request):
+    """Gets a track file directly (returns audio in base64)"""
+    error_response = await _check_auth(request, required_scopes=['read:tracks'])
+    if error_response:
+        return error_response
+
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    piezas = None
+    try:
+        # El cuerpo que se guarda en track_cache tiene que ser el de la versión del ETag
+        await metadata.snapshot(conexion)
+        # Solo metadatos: si el cliente ya tiene esta versión no se lee el audio
+        validadores = await metadata.validators(conexion, track_id)
+        if not validadores:
+            return _error(404, "Track not found")
+        headers = _cache_headers(track_id, *validadores, 'json')
+        if _not_modified(request, headers, validadores[1]):
+            return web.Response(status=304, headers=headers)
+
+        # Las pistas calientes se sirven ya codificadas desde la caché
+        body = track_cache.get(track_id, validadores[0])
+        if body is not None:
+            return web.Response(body=body, content_type='application/json', headers=headers)
+
+        store = storage.get_async_storage()
+        size = await store.size(conexion, track_id)
+        longitud = _track_json_length(track_id, size)
+        if longitud <= track_cache.max_item_bytes:
+            body = b''.join([pieza async for pieza in _track_json(track_id, store.read(conexion, track_id, 0, size - 1))])
+            track_cache.put(track_id, validadores[0], body)
+            return web.Response(body=body, content_type='application/json', headers=headers)
+
+        headers['Content-Length'] = str(longitud)
+        headers['Content-Type'] = 'application/json'
+        piezas = _track_json(track_id, store.read(conexion, track_id, 0, size - 1))
+
+    except Exception as e:
+        print(f"Error al obtener track: {e}")
+        return _error(500, "Database error")
+
+    finally:
+        if piezas is None:
+            await dbDesconectarAsync(conexion)
+
+    # Pistas grandes: se codifican y envían por trozos; _enviar libera la conexión
+    return await _enviar(request, conexion, piezas, headers=headers)
+
+
+async def head_track(track_id, request):
+    """Gets the headers of get_track without reading the audio"""
+    error_response = await _check_auth(request, required_scopes=['read:tracks'])
+    if error_response:
+        return error_response
+
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    try:
+        info = await metadata.info(conexion, track_id)
+        if not info:
+            return _error(404, "Track not found")
+        headers = _cache_headers(track_id, info['version'], info['updated_at'], 'json')
+        if _not_modified(request, headers, info['updated_at']):
+            return web.Response(status=304, headers=headers)
+
+        size, mime = await _size_mime(storage.get_async_storage(), conexion, track_id, info)
+        headers.update(_info_headers(info, mime))
+        headers['Content-Length'] = str(_track_json_length(track_id, size))
+        headers['Content-Type'] = 'application/json'
+        return web.Response(status=200, headers=headers)
+
+    except Exception as e:
+        print(f"Error al obtener track: {e}")
+        return _error(500, "Database error")
+
+    finally:
+        await dbDesconectarAsync(conexion)
+
+
+async def get_track_info(track_id, request):
+    """Gets the audio metadata of a track"""
+    error_response = await _check_auth(request, required_scopes=['read:tracks'])
+    if error_response:
+        return error_response
+
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    try:
+        info = await metadata.info(conexion, track_id)
+        if not info:
+            return _error(404, "Track not found")
+        headers = _cache_headers(track_id, info['version'], info['updated_at'], 'info')
+        if _not_modified(request, headers, info['updated_at']):
+            return web.Response(status=304, headers=headers)
+
+        size, mime = await _size_mime(storage.get_async_storage(), conexion, track_id, info)
+        return _json(TrackInfo(idtrack=track_id, size_bytes=size, mime=mime, duration_ms=info['duration_ms'],
+                               bitrate=info['bitrate'], sample_rate=info['sample_rate']), 200, headers)
+
+    except Exception as e:
+        print(f"Error al obtener info del track: {e}")
+        return _error(500, "Database error")
+
+    finally:
+        await dbDesconectarAsync(conexion)
+
+
+async def get_track_peaks(track_id, request, buckets=None):
+    """Gets the waveform peaks of a track"""
+    error_response = await _check_auth(request, required_scopes=['read:tracks'])
+    if error_response:
+        return error_response
+
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    try:
+        fila = await metadata.peaks(conexion, track_id)
+        if not fila:
+            return _error(404, "Track not found")
+        version, updated_at, picos = fila
+        if picos is None:
+            return _error(404, "Waveform not available for this track")
+        headers = _cache_headers(track_id, version, updated_at, 'peaks')
+        if _not_modified(request, headers, updated_at):
+            return web.Response(status=304, headers=headers)
+
+        return _json(_track_peaks(track_id, picos, buckets), 200, headers)
+
+    except Exception as e:
+        print(f"Error al obtener picos del track: {e}")
+        return _error(500, "Database error")
+
+    finally:
+        await dbDesconectarAsync(conexion)
+
+
+async def _batch_lines(store, conexion, track_ids):
+    """Una línea JSON por pista encontrada y, al final, una por cada id que no existe"""
+    encontrados = set()
+    async for track_id, chunks in store.read_many(conexion, track_ids):
+        encontrados.add(track_id)
+        yield _TRACK_JSON_PREFIX % track_id
+        codificador = _Base64Chunks()
+        for chunk in chunks:
+            for pieza in codificador.encode(chunk):
+                yield pieza
+        yield codificador.final()
+        yield _TRACK_JSON_SUFFIX + b'\n'
+    for track_id in track_ids:
+        if track_id not in encontrados:
+            yield _TRACK_NOT_FOUND_LINE % track_id
+
+
+async def get_tracks_batch(body, request):
+    """Gets several tracks at once, streamed as newline-delimited JSON"""
+    error_response = await _check_auth(request, required_scopes=['read:tracks'])
+    if error_response:
+        return error_response
+
+    batch = TrackBatch.from_dict(body)
+    # Sin repetidos, en el orden de la petición
+    track_ids = list(dict.fromkeys(batch.ids or []))
+    if len(track_ids) > TRACK_BATCH_MAX:
+        return _error(400, f"Too many ids (max {TRACK_BATCH_MAX})")
+
+    store = storage.get_async_storage()
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    return await _enviar(request, conexion, _batch_lines(store, conexion, track_ids),
+                         headers={'Content-Type': 'application/x-ndjson'})
+
+
+async def list_tracks(request, after_id=None, limit=None):
+    """Lists the tracks by idtrack with keyset pagination, metadata only"""
+    error_response = await _check_auth(request, required_scopes=['read:tracks'])
+    if error_response:
+        return error_response
+
+    after_id = after_id or 0
+    limit = limit or 100
+    if limit > TRACK_LIST_MAX:
+        return _error(400, f"limit too large (max {TRACK_LIST_MAX})")
+
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    try:
+        # Solo el índice tracks_listing_idx: nunca se lee el audio
+        filas = await metadata.list_tracks(conexion, after_id, limit + 1)
+        return _json(_track_list(filas, limit), 200)
+
+    except Exception as e:
+        print(f"Error al listar tracks: {e}")
+        return _error(500, "Database error")
+
+    finally:
+        await dbDesconectarAsync(conexion)
+
+
+async def get_track_audio(track_id, request, t=None):
+    """Gets the raw audio of a track, supports HTTP Range requests and seeking to t seconds"""
+    error_response = await _check_auth(request, required_scopes=['read:tracks'])
+    if error_response:
+        return error_response
+
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    piezas = None
+    try:
+        # ETag, Content-Length y bytes de la misma versión de la pista
+        await metadata.snapshot(conexion)
+        info = await metadata.info(conexion, track_id)
+        if not info:
+            return _error(404, "Track not found")
+        validadores = info['version'], info['updated_at']
+        headers = _cache_headers(track_id, *validadores, 'audio')
+        if _not_modified(request, headers, validadores[1]):
+            return web.Response(status=304, headers=headers)
+
+        store = storage.get_async_storage()
+        size, mime = await _size_mime(store, conexion, track_id, info)
+
+        range_header = request.headers.get('Range')
+        if_range = parse_if_range_header(request.headers.get('If-Range'))
+        if t is not None:
+            # El tiempo se convierte en un rango desde el punto del índice anterior a t
+            ms, offset = await metadata.seek_point(conexion, track_id, int(t * 1000)) or (0, 0)
+            headers['X-Seek-Time-Ms'] = str(ms)
+            range_header = f'bytes={offset}-' if offset else None
+        elif (if_range.etag and if_range.etag != headers['ETag'].strip('"')) or \
+                (if_range.date and if_range.date != validadores[1].replace(microsecond=0)):
+            # If-Range de otra versión: se envía la pista entera
+            range_header = None
+        try:
+            rango = audio_util.parse_range(range_header, size)
+        except ValueError:
+            return web.Response(status=416, headers={'Content-Range': f'bytes */{size}',
+                                                     'Accept-Ranges': 'bytes'})
+
+        headers['Accept-Ranges'] = 'bytes'
+        if rango is None:
+            status, (start, end) = 200, (0, size - 1)
+        else:
+            status, (start, end) = 206, rango
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        headers['Content-Length'] = str(end - start + 1)
+        headers['Content-Type'] = mime
+
+        piezas = store.read(conexion, track_id, start, end)
+
+    except Exception as e:
+        print(f"Error al obtener audio: {e}")
+        return _error(500, "Database error")
+
+    finally:
+        if piezas is None:
+            await dbDesconectarAsync(conexion)
+
+    return await _enviar(request, conexion, piezas, status, headers)
+
+
+async def update_track(body, track_id, request):
+    """Updates a track in the database"""
+    error_response = await _check_auth(request, required_scopes=['write:tracks'])
+    if error_response:
+        return error_response
+
+    track = _track_body(request, body)
+    if track is None:
+        return _error(400, "Invalid JSON")
+
+    # Decodificar el base64 por trozos a un fichero temporal, en un hilo: puede pasar a disco
+    spool, error_response = await asyncio.get_running_loop().run_in_executor(None, _decode_track, track)
+    if error_response:
+        return _json(*error_response)
+
+    with spool:
+        return await _update_spool(track_id, spool)
+
+
+async def delete_track(track_id, request):
+    """Deletes a track"""
+    error_response = await _check_auth(request, required_scopes=['write:tracks'])
+    if error_response:
+        return error_response
+
+    store = storage.get_async_storage()
+    conexion = await dbConectarAsync()
+    if not conexion:
+        return _error(500, "Database connection failed")
+    try:
+        if not await store.delete(conexion, track_id):
+            await conexion.rollback()
+            return _error(404, "Track not found")
+        await conexion.commit()
+        track_cache.invalidate(track_id)
+        return web.Response(status=204)
+
+    except Exception as e:
+        await conexion.rollback()
+        print(f"Error al eliminar track: {e}")
+        return _error(500, "Database error")
+
+    finally:
+        await dbDesconectarAsync(conexion)
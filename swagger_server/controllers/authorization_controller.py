@@ -1,12 +1,117 @@
 from typing import List
+from collections import OrderedDict
+from flask import g, has_request_context
 import requests
+import threading
+import time
 import os
+
+from swagger_server.metrics import fase
 """
 controller generated to handled auth operation described at:
 https://connexion.readthedocs.io/en/latest/security.html
 """
 
 AUTH_SERVER = os.getenv('HOST_SYU', 'http://localhost:8080')
+AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL', 60))
+AUTH_CACHE_NEGATIVE_TTL = float(os.getenv('AUTH_CACHE_NEGATIVE_TTL', 5))
+AUTH_CACHE_MAX = int(os.getenv('AUTH_CACHE_MAX', 10000))
+
+
+class _Consulta:
+    """Consulta a SYU en curso; el resto de hilos esperan su resultado."""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+
+
+class TokenCache:
+    """
+    Caché LRU acotada de token -> user_info con caducidad.
+    - Los tokens rechazados se guardan con un TTL más corto.
+    - Las consultas simultáneas del mismo token se agrupan en una sola.
+    """
+
+    def __init__(self, maximo, ttl, ttl_negativo):
+        self.maximo = maximo
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()   # token -> (caduca, user_info)
+        self._en_curso = {}              # token -> _Consulta
+
+    def obtener(self, token, cargar):
+        """
+        Devuelve el user_info del token (o None si es inválido).
+        cargar(token) consulta el origen; si lanza excepción no se cachea.
+        """
+        with self._lock:
+            encontrado, user_info = self._buscar(token)
+            if encontrado:
+                return user_info
+
+            consulta = self._en_curso.get(token)
+            lider = consulta is None
+            if lider:
+                consulta = self._en_curso[token] = _Consulta()
+
+        if not lider:
+            consulta.evento.wait()
+            return consulta.resultado
+
+        try:
+            consulta.resultado = cargar(token)
+            self.guardar(token, consulta.resultado)
+            return consulta.resultado
+        finally:
+            with self._lock:
+                self._en_curso.pop(token, None)
+            consulta.evento.set()
+
+    def buscar(self, token):
+        """(True, user_info) si el token está en caché y vigente; (False, None) si no"""
+        with self._lock:
+            return self._buscar(token)
+
+    def guardar(self, token, user_info):
+        ttl = self.ttl if user_info else self.ttl_negativo
+        with self._lock:
+            self._entradas[token] = (time.monotonic() + ttl, user_info)
+            self._entradas.move_to_end(token)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+    def _buscar(self, token):
+        entrada = self._entradas.get(token)
+        if entrada is not None:
+            caduca, user_info = entrada
+            if caduca > time.monotonic():
+                self._entradas.move_to_end(token)
+                return True, user_info
+            del self._entradas[token]
+        return False, None
+
+    def invalidar(self, token=None):
+        with self._lock:
+            if token is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(token, None)
+
+
+_cache = TokenCache(AUTH_CACHE_MAX, AUTH_CACHE_TTL, AUTH_CACHE_NEGATIVE_TTL)
+
+
+def reset_auth_cache():
+    """Vacía la caché de tokens (p. ej. en cada worker tras el fork)"""
+    _cache.invalidar()
+
+
+def _consultar_syu(token):
+    resp = requests.get(f"{AUTH_SERVER}/auth", timeout=2, headers={"Accept": "application/json", "Cookie":f"oversound_auth={token}"})
+    return resp.json() if resp.ok else None
+
 
 def is_valid_token(token):
     """
@@ -15,14 +120,26 @@ def is_valid_token(token):
     - Validación JWT
     - Consulta a BD de sesiones/usuarios
     - Integración con OAuth/IAM
+
+    El resultado se guarda en la petición actual (flask.g) para que
+    check_oversound_auth y check_auth validen el token una sola vez.
     """
+    if has_request_context():
+        validado = g.get('oversound_auth')
+        if validado is not None and validado[0] == token:
+            return validado[1]
+
     try:
-        resp = requests.get(f"{AUTH_SERVER}/auth", timeout=2, headers={"Accept": "application/json", "Cookie":f"oversound_auth={token}"})
-        return resp.json() if resp.ok else None
+        with fase('auth'):
+            user_info = _cache.obtener(token, _consultar_syu)
     except Exception as e:
         print(f"Couldn't connect to SYU microservice: {e}")
         return None
 
+    if has_request_context():
+        g.oversound_auth = (token, user_info)
+    return user_info
+
 
 def check_oversound_auth(api_key, required_scopes):
     """
@@ -44,8 +161,7 @@ def check_oversound_auth(api_key, required_scopes):
         return None
     
     # Verificar que el usuario tiene los scopes requeridos
-    user_scopes = user_info.get('scopes', [])
-    if required_scopes and not any(scope in user_scopes for scope in required_scopes):
+    if not has_scopes(user_info, required_scopes):
         # No tiene permisos suficientes -> rechazar
         return None
     
@@ -53,3 +169,9 @@ def check_oversound_auth(api_key, required_scopes):
     return user_info
 
 
+def has_scopes(user_info, required_scopes):
+    """True si user_info tiene alguno de los scopes requeridos (o no se requiere ninguno)"""
+    user_scopes = user_info.get('scopes', [])
+    return not required_scopes or any(scope in user_scopes for scope in required_scopes)
+
+
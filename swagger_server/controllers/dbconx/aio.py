@@ -0,0 +1,111 @@
+"""
+Pool asíncrono de conexiones (psycopg 3) para el modo aiohttp.
+Usa las mismas variables DB_* y DB_POOL_* que el pool síncrono.
+"""
+import os
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from swagger_server.controllers.dbconx.tempName import POOL_MAX, POOL_TIMEOUT, POOL_MAX_LIFETIME
+from swagger_server.metrics import fase
+
+_pool = None
+
+
+class CursorMedidoAsync(psycopg.AsyncCursor):
+    """Cursor que suma el tiempo de cada ida y vuelta a Postgres a la fase db_query"""
+
+    async def execute(self, query, params=None, **kwargs):
+        with fase('db_query'):
+            return await super().execute(query, params, **kwargs)
+
+    async def fetchone(self):
+        with fase('db_query'):
+            return await super().fetchone()
+
+    async def fetchall(self):
+        with fase('db_query'):
+            return await super().fetchall()
+
+
+class ServerCursorMedidoAsync(psycopg.AsyncServerCursor):
+    """Cursor de servidor: cada bloque de itersize filas es una ida y vuelta"""
+
+    async def execute(self, query, params=None, **kwargs):
+        with fase('db_query'):
+            return await super().execute(query, params, **kwargs)
+
+    async def fetchmany(self, size=0):
+        with fase('db_query'):
+            return await super().fetchmany(size)
+
+    async def __aiter__(self):
+        while True:
+            filas = await self.fetchmany(self.itersize)
+            if not filas:
+                return
+            for fila in filas:
+                yield fila
+
+
+async def _configurar(conexion):
+    conexion.cursor_factory = CursorMedidoAsync
+    conexion.server_cursor_factory = ServerCursorMedidoAsync
+
+
+def _conninfo():
+    return psycopg.conninfo.make_conninfo(
+        host=os.getenv('DB_HOST', '10.1.1.1'),
+        port=os.getenv('DB_PORT', 5432),
+        dbname=os.getenv('DB_NAME', 'pt'),
+        user=os.getenv('DB_USER', 'pt_admin'),
+        password=os.getenv('DB_PWD', '12345'))
+
+
+async def abrirPoolAsync(app=None):
+    """Abre el pool del event loop actual (on_startup de aiohttp)."""
+    global _pool
+    if _pool is None:
+        print("---Conectando a Postgresql (async)---")
+        _pool = AsyncConnectionPool(_conninfo(), min_size=1, max_size=POOL_MAX, timeout=POOL_TIMEOUT,
+                                    max_lifetime=POOL_MAX_LIFETIME, configure=_configurar, open=False)
+        await _pool.open()
+
+
+async def cerrarPoolAsync(app=None):
+    """Cierra el pool (on_cleanup de aiohttp)."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def dbConectarAsync():
+    try:
+        with fase('db_acquire'):
+            return await _pool.getconn()
+    except PoolTimeout as error:
+        print("Error en la conexión")
+        print(error)
+        return None
+    except psycopg.Error as error:
+        print("Error en la conexión")
+        print(error)
+        return None
+
+
+async def dbDesconectarAsync(conexion):
+    # El pool deshace la transacción abierta, si la hay, al recibirla
+    try:
+        await _pool.putconn(conexion)
+        return True
+    except psycopg.Error as error:
+        print("Error en la desconexión")
+        print(error)
+        return False
+
+
+def estadisticasPoolAsync() -> dict:
+    """Devuelve las estadísticas del pool asíncrono."""
+    return _pool.get_stats() if _pool is not None else {}
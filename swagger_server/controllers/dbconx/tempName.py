@@ -1,8 +1,61 @@
 import psycopg2 as DB
-from psycopg2.extensions import connection
+from psycopg2.extensions import connection, cursor, TRANSACTION_STATUS_IDLE
 import os
+import threading
+import time
 
-def dbConectar() -> connection:
+from swagger_server.metrics import fase
+
+# Parámetros del pool (mismas variables DB_* que la conexión)
+POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 1800))
+POOL_PING_IDLE = float(os.getenv('DB_POOL_PING_IDLE', 30))
+
+
+class PoolAgotadoError(Exception):
+    """No se ha liberado ninguna conexión antes de agotar el timeout."""
+
+
+class CursorMedido(cursor):
+    """Cursor que suma el tiempo de cada ida y vuelta a Postgres a la fase db_query"""
+
+    def execute(self, query, vars=None):
+        with fase('db_query'):
+            return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with fase('db_query'):
+            return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        with fase('db_query'):
+            return super().copy_expert(sql, file, size)
+
+    def fetchone(self):
+        with fase('db_query'):
+            return super().fetchone()
+
+    def fetchmany(self, size=None):
+        with fase('db_query'):
+            return super().fetchmany(self.arraysize if size is None else size)
+
+    def fetchall(self):
+        with fase('db_query'):
+            return super().fetchall()
+
+    def __iter__(self):
+        # En los cursores de servidor cada bloque de itersize filas es una ida y vuelta
+        filas = super().__iter__()
+        while True:
+            with fase('db_query'):
+                fila = next(filas, None)
+            if fila is None:
+                return
+            yield fila
+
+
+def _abrirConexion() -> connection:
     ip = os.getenv('DB_HOST', '10.1.1.1')
     puerto = os.getenv('DB_PORT', 5432)
     basedatos = os.getenv('DB_NAME', 'pt')
@@ -10,26 +63,212 @@ def dbConectar() -> connection:
     usuario = os.getenv('DB_USER', 'pt_admin')
     contrasena = os.getenv('DB_PWD', '12345')
 
-    print("---dbConectar---")
     print("---Conectando a Postgresql---")
+    conexion = DB.connect(user=usuario, password=contrasena, host=ip, port=puerto, database=basedatos,
+                          cursor_factory=CursorMedido)
+    conexion.autocommit = False
+    print("Conexión realizada a la base de datos", conexion)
+    return conexion
+
+
+def _cerrarConexion(conexion):
+    try:
+        conexion.close()
+    except DB.Error as error:
+        print("Error en la desconexión")
+        print(error)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones compartido por todo el proceso.
+    - Comprueba la salud de la conexión al prestarla.
+    - Recicla las conexiones que superan su tiempo de vida máximo.
+    - Lanza PoolAgotadoError si no hay conexión libre antes del timeout.
+    """
+
+    def __init__(self, maximo, timeout, vida_maxima, ping_inactiva):
+        self.maximo = maximo
+        self.timeout = timeout
+        self.vida_maxima = vida_maxima
+        self.ping_inactiva = ping_inactiva
+        self._cond = threading.Condition()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._pid = os.getpid()
+        self._libres = []        # [(conexion, instante de devolución)]
+        self._creadas = {}       # conexion -> instante de creación
+        self._reservas = 0       # conexiones que se están abriendo
+        self._en_uso = 0
+        self._stats = {
+            'creadas': 0,
+            'prestamos': 0,
+            'esperas': 0,
+            'timeouts': 0,
+            'recicladas': 0,
+            'descartadas': 0,
+        }
 
+    def _comprobarFork(self):
+        # Tras un fork las conexiones del padre no se pueden compartir:
+        # se olvidan sin cerrarlas para no cortar las del proceso padre.
+        if self._pid != os.getpid():
+            self._reiniciar()
+
+    def _abiertas(self):
+        return len(self._creadas) + self._reservas
+
+    def _caducada(self, conexion, ahora):
+        return ahora - self._creadas.get(conexion, ahora) > self.vida_maxima
+
+    def _sana(self, conexion, devuelta):
+        if conexion.closed:
+            return False
+        if time.monotonic() - devuelta < self.ping_inactiva:
+            return True
+        try:
+            with conexion.cursor() as cur:
+                cur.execute("SELECT 1")
+            conexion.rollback()
+            return True
+        except DB.Error:
+            return False
+
+    def _olvidar(self, conexion, motivo):
+        """Cierra la conexión y la cuenta una sola vez en _stats[motivo]"""
+        with self._cond:
+            if self._creadas.pop(conexion, None) is not None:
+                self._stats[motivo] += 1
+            self._cond.notify()
+        _cerrarConexion(conexion)
+
+    def obtener(self) -> connection:
+        limite = time.monotonic() + self.timeout
+        while True:
+            crear = False
+            with self._cond:
+                self._comprobarFork()
+                if not self._libres and self._abiertas() >= self.maximo:
+                    self._stats['esperas'] += 1
+                while not self._libres and self._abiertas() >= self.maximo:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolAgotadoError(f"Pool agotado ({self.maximo} conexiones en uso)")
+                    self._cond.wait(restante)
+                if self._libres:
+                    conexion, devuelta = self._libres.pop()
+                else:
+                    # Reservamos el hueco y conectamos fuera del lock
+                    self._reservas += 1
+                    crear = True
+
+            if crear:
+                try:
+                    conexion = _abrirConexion()
+                except Exception:
+                    with self._cond:
+                        self._reservas -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._reservas -= 1
+                    self._creadas[conexion] = time.monotonic()
+                    self._stats['creadas'] += 1
+                    self._stats['prestamos'] += 1
+                    self._en_uso += 1
+                return conexion
+
+            if not conexion.closed and self._caducada(conexion, time.monotonic()):
+                self._olvidar(conexion, 'recicladas')
+            elif self._sana(conexion, devuelta):
+                with self._cond:
+                    self._stats['prestamos'] += 1
+                    self._en_uso += 1
+                return conexion
+            else:
+                self._olvidar(conexion, 'descartadas')
+
+    def devolver(self, conexion):
+        with self._cond:
+            if self._pid != os.getpid() or conexion not in self._creadas:
+                # Conexión heredada de otro proceso o ajena al pool
+                return
+            self._en_uso -= 1
+
+        if not conexion.closed and conexion.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conexion.rollback()
+            except DB.Error:
+                pass
+
+        if conexion.closed or conexion.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            self._olvidar(conexion, 'descartadas')
+            return
+        if self._caducada(conexion, time.monotonic()):
+            self._olvidar(conexion, 'recicladas')
+            return
+
+        with self._cond:
+            self._libres.append((conexion, time.monotonic()))
+            self._cond.notify()
+
+    def cerrar(self):
+        with self._cond:
+            libres = [conexion for conexion, _ in self._libres]
+            for conexion in libres:
+                self._creadas.pop(conexion, None)
+            self._libres = []
+        for conexion in libres:
+            _cerrarConexion(conexion)
+
+    def estadisticas(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'maximo': self.maximo,
+                'abiertas': self._abiertas(),
+                'libres': len(self._libres),
+                'en_uso': self._en_uso,
+            })
+            return stats
+
+
+_pool = PoolConexiones(POOL_MAX, POOL_TIMEOUT, POOL_MAX_LIFETIME, POOL_PING_IDLE)
+
+
+def dbConectar() -> connection:
     try:
-        conexion = DB.connect(user=usuario, password=contrasena, host=ip, port=puerto, database=basedatos)
-        conexion.autocommit = False
-        print("Conexión realizada a la base de datos", conexion)
-        return conexion
+        with fase('db_acquire'):
+            return _pool.obtener()
+    except PoolAgotadoError as error:
+        print("Error en la conexión")
+        print(error)
+        return None
     except DB.DatabaseError as error:
         print("Error en la conexión")
         print(error)
         return None
 
 def dbDesconectar(conexion):
-    print("---dbDesconectar---")
     try:
-        conexion.close()
-        print("Desconexión realizada correctamente")
+        _pool.devolver(conexion)
         return True
     except DB.DatabaseError as error:
         print("Error en la desconexión")
         print(error)
-        return False
\ No newline at end of file
+        return False
+
+def estadisticasPool() -> dict:
+    """Devuelve las estadísticas del pool de conexiones del proceso."""
+    return _pool.estadisticas()
+
+def cerrarPool():
+    """Cierra las conexiones libres del pool (p. ej. al parar el servidor)."""
+    _pool.cerrar()
+
+def reiniciarPool():
+    """Olvida, sin cerrarlas, las conexiones heredadas del proceso padre tras un fork."""
+    with _pool._cond:
+        _pool._reiniciar()
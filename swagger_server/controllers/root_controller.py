@@ -1,5 +1,9 @@
 from typing import List
 from swagger_server.models.error import Error  # noqa: E501
+from flask import Response
+from swagger_server import metrics
+from swagger_server.cache import track_cache
+from swagger_server.controllers.dbconx.tempName import estadisticasPool
 import requests
 """
 controller generated to handled auth operation described at:
@@ -8,4 +12,18 @@ https://connexion.readthedocs.io/en/latest/security.html
 
 def get_root():
     """Gets root"""
-    return "Proveedor de Tracks (PT) MSVC - GB02 - Samuel Monasterio Pérez"
\ No newline at end of file
+    return "Proveedor de Tracks (PT) MSVC - GB02 - Samuel Monasterio Pérez"
+
+
+def get_stats():
+    """Gets internal counters of the DB pool and the track cache"""
+    return {
+        'db_pool': estadisticasPool(),
+        'track_cache': track_cache.stats(),
+    }
+
+
+def get_metrics():
+    """Gets Prometheus metrics of the service"""
+    body, content_type = metrics.exposicion()
+    return Response(body, status=200, headers={'Content-Type': content_type})
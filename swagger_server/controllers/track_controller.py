@@ -1,16 +1,52 @@
 import connexion
+import flask
 import base64
 import six
 import io
+import os
+import datetime
 
-from flask import send_file
+from flask import send_file, Response
+from werkzeug.http import http_date
 from swagger_server.models.error import Error  # noqa: E501
+from swagger_server.models.ingest_job import IngestJob  # noqa: E501
 from swagger_server.models.track import Track  # noqa: E501
+from swagger_server.models.track_batch import TrackBatch  # noqa: E501
+from swagger_server.models.track_info import TrackInfo  # noqa: E501
+from swagger_server.models.track_list import TrackList  # noqa: E501
+from swagger_server.models.track_peaks import TrackPeaks  # noqa: E501
+from swagger_server.models.track_summary import TrackSummary  # noqa: E501
 from swagger_server import util
+from swagger_server import audio_util
+from swagger_server import ingest
+from swagger_server import json_backend
+from swagger_server import peaks
+from swagger_server import storage
+from swagger_server.metrics import fase
+from swagger_server.cache import track_cache
+from swagger_server.storage import TrackSpool, TrackTooLargeError
+from swagger_server.storage import metadata
+from swagger_server.storage.spool import UPLOAD_CHUNK_SIZE
+from swagger_server.storage.postgres import AUDIO_CHUNK_SIZE
 from swagger_server.controllers.dbconx.tempName import dbConectar, dbDesconectar
-from swagger_server.controllers.authorization_controller import is_valid_token
+from swagger_server.controllers.authorization_controller import is_valid_token, check_oversound_auth
 import psycopg2 as DB
 
+# Tipos de subida que se atienden en stream_upload, fuera de Connexion
+STREAM_UPLOAD_TYPES = ('application/octet-stream', 'multipart/form-data')
+# Tipos de subida de add_tracks_bulk, también atendidos en stream_upload
+BULK_UPLOAD_TYPES = ('application/x-ndjson', 'multipart/form-data')
+# Margen para las cabeceras de las partes multipart
+MULTIPART_OVERHEAD = 64 * 1024
+# Pistas por transacción (y por COPY) en add_tracks_bulk
+TRACK_BULK_BATCH = int(os.getenv('TRACK_BULK_BATCH', 100))
+# Cache-Control de las pistas: 'no-cache' obliga a revalidar (y a pasar auth) en cada uso
+TRACK_CACHE_CONTROL = os.getenv('TRACK_CACHE_CONTROL', 'public, no-cache')
+# Máximo de ids por petición de get_tracks_batch
+TRACK_BATCH_MAX = int(os.getenv('TRACK_BATCH_MAX', 100))
+# Máximo de pistas por página de list_tracks
+TRACK_LIST_MAX = int(os.getenv('TRACK_LIST_MAX', 1000))
+
 
 def check_auth(required_scopes=None):
     """
@@ -23,6 +59,333 @@ def check_auth(required_scopes=None):
         return False, (error, 401)
     return True, None
 
+def _decode_track(track):
+    """Decodifica por trozos el base64 del cuerpo JSON. Devuelve (spool, error_response)"""
+    try:
+        with fase('base64_decode'):
+            return TrackSpool.from_base64(track.track), None
+    except TrackTooLargeError:
+        return None, (Error(code="413", message="Track too large"), 413)
+    except Exception as e:
+        return None, (Error(code="400", message="Invalid base64 encoding"), 400)
+
+
+def _insert_spool(spool, track_base64=None):
+    """Guarda una pista nueva a partir del spool"""
+    store = storage.get_storage()
+    conexion = None
+    try:
+        conexion = dbConectar()
+        if not conexion:
+            return Error(code="500", message="Database connection failed"), 500
+
+        new_id = store.insert(conexion, spool)
+        metadata.save_info(conexion, new_id, spool.audio_info())
+        store.commit(conexion)
+
+        # Crear un nuevo objeto Track con el ID generado para la respuesta
+        response_track = Track(idtrack=new_id, track=track_base64)
+        return response_track, 201
+
+    except Exception as e:
+        if conexion:
+            store.rollback(conexion)
+        print(f"Error al crear track: {e}")
+        return Error(code="500", message="Database error"), 500
+
+    finally:
+        if conexion:
+            dbDesconectar(conexion)
+
+
+def _update_spool(track_id, spool):
+    """Sustituye el audio de una pista a partir del spool"""
+    store = storage.get_storage()
+    conexion = None
+    try:
+        conexion = dbConectar()
+        if not conexion:
+            return Error(code="500", message="Database connection failed"), 500
+
+        if not store.update(conexion, track_id, spool):
+            store.rollback(conexion)
+            return Error(code="404", message="Track not found"), 404
+
+        metadata.touch(conexion, track_id)
+        metadata.save_info(conexion, track_id, spool.audio_info())
+        store.commit(conexion)
+        track_cache.invalidate(track_id)
+
+        return '', 204
+
+    except Exception as e:
+        if conexion:
+            store.rollback(conexion)
+        print(f"Error al actualizar track: {e}")
+        return Error(code="500", message="Database error"), 500
+
+    finally:
+        if conexion:
+            dbDesconectar(conexion)
+
+
+def _ingest_job(estado):
+    """IngestJob a partir del estado que guarda ingest"""
+    error = estado.get('error')
+    return IngestJob(job_id=estado['job_id'], status=estado['status'], size_bytes=estado['size_bytes'],
+                     processed_bytes=estado['processed_bytes'], idtrack=estado.get('idtrack'),
+                     error=Error(**error) if error else None,
+                     created_at=datetime.datetime.fromisoformat(estado['created_at']),
+                     updated_at=datetime.datetime.fromisoformat(estado['updated_at']))
+
+
+def _accepted(estado):
+    """Respuesta 202 de una subida encolada, con la URL de su estado"""
+    return _ingest_job(estado), 202, {'Location': f"/track/upload/{estado['job_id']}"}
+
+
+def _enqueue(formato, piezas, max_size=None):
+    """Copia piezas (bytes) al directorio de ingest y encola el trabajo (TRACK_INGEST=async)"""
+    try:
+        with ingest.ingest_queue.upload(formato, max_size) as subida:
+            for pieza in piezas:
+                subida.write(pieza)
+            return _accepted(subida.submit())
+    except ingest.IngestQueueFull:
+        return Error(code="503", message="Upload queue is full"), 503
+    except TrackTooLargeError:
+        return Error(code="413", message="Track too large"), 413
+    except OSError as e:
+        print(f"Error al encolar track: {e}")
+        return Error(code="500", message="Could not queue the upload"), 500
+
+
+def _enqueue_base64(track_base64):
+    """Encola el base64 de un cuerpo JSON sin decodificarlo; lo decodifica el pool"""
+    if not isinstance(track_base64, str):
+        return Error(code="400", message="Invalid base64 encoding"), 400
+    # Mismo margen que una línea de add_tracks_bulk; el límite exacto se aplica al decodificar
+    if len(track_base64) > 4 * ((storage.TRACK_MAX_SIZE + 2) // 3) + MULTIPART_OVERHEAD:
+        return Error(code="413", message="Track too large"), 413
+    piezas = (track_base64[i:i + UPLOAD_CHUNK_SIZE].encode('utf-8')
+              for i in range(0, len(track_base64), UPLOAD_CHUNK_SIZE))
+    return _enqueue('b64', piezas)
+
+
+def _cache_headers(track_id, version, updated_at, representation):
+    """Validadores HTTP de una representación (json, audio) de la pista"""
+    return {
+        'ETag': f'"{track_id}-{version}-{representation}"',
+        'Last-Modified': http_date(updated_at),
+        'Cache-Control': TRACK_CACHE_CONTROL,
+    }
+
+
+def _not_modified(headers, updated_at):
+    """True si la petición condicional ya tiene la versión actual"""
+    request = connexion.request
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(headers['ETag'].strip('"'))
+    if request.if_modified_since:
+        return updated_at.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _size_mime(store, conexion, track_id, info):
+    """Tamaño y tipo guardados al subir; las pistas anteriores se miran en el almacenamiento"""
+    size = info['size_bytes']
+    if size is None:
+        size = store.size(conexion, track_id)
+    mime = info['mime'] or \
+        audio_util.detect_mime(b''.join(store.read(conexion, track_id, 0, audio_util.SNIFF_BYTES - 1)))
+    return size, mime
+
+
+def _info_headers(info, mime):
+    """Cabeceras X-Track-* con los metadatos del audio que se conocen"""
+    headers = {'X-Track-Mime': mime}
+    for columna, cabecera in (('duration_ms', 'X-Track-Duration-Ms'), ('bitrate', 'X-Track-Bitrate'),
+                              ('sample_rate', 'X-Track-Sample-Rate')):
+        if info[columna] is not None:
+            headers[cabecera] = str(info[columna])
+    return headers
+
+
+def _flaskify_endpoint(operation):
+    # Mismo nombre de endpoint que registra Connexion para la operación
+    return f"{__name__}.{operation}".replace('.', '_')
+
+
+def _as_response(result):
+    body, status = result[:2]
+    headers = result[2] if len(result) > 2 else None
+    if isinstance(body, str) and not body:
+        return Response(status=status, headers=headers)
+    return Response(flask.json.dumps(body), status=status, mimetype='application/json', headers=headers)
+
+
+def _ndjson_tracks(stream):
+    """Genera (spool, error_response) por cada línea de un cuerpo NDJSON de objetos Track"""
+    # Una línea cabe si su base64 no supera TRACK_MAX_SIZE decodificado
+    limite = 4 * ((storage.TRACK_MAX_SIZE + 2) // 3) + MULTIPART_OVERHEAD
+    while True:
+        line = stream.readline(limite)
+        if not line:
+            return
+        if len(line) >= limite and not line.endswith(b'\n'):
+            # Se descarta el resto de la línea sin guardarlo
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(UPLOAD_CHUNK_SIZE)
+            yield None, (Error(code="413", message="Track too large"), 413)
+            continue
+        if not line.strip():
+            continue
+        try:
+            track = Track.from_dict(json_backend.loads(line))
+        except Exception:
+            yield None, (Error(code="400", message="Invalid JSON"), 400)
+            continue
+        yield _decode_track(track)
+
+
+def _multipart_tracks(files):
+    """Genera (spool, error_response) por cada parte 'track' de un cuerpo multipart"""
+    for fichero in files.getlist('track'):
+        try:
+            yield TrackSpool.from_stream(fichero.stream), None
+        except TrackTooLargeError:
+            yield None, (Error(code="413", message="Track too large"), 413)
+
+
+def _insert_batch(store, conexion, lote, resultados):
+    """Inserta un lote en una transacción; si falla, reintenta cada pista por separado"""
+    try:
+        new_ids = store.insert_many(conexion, [spool for _, spool in lote])
+        metadata.save_info_many(conexion, [(new_id, spool.audio_info())
+                                           for (_, spool), new_id in zip(lote, new_ids)])
+        store.commit(conexion)
+        for (posicion, _), new_id in zip(lote, new_ids):
+            resultados[posicion] = {'idtrack': new_id}
+        return
+    except Exception as e:
+        store.rollback(conexion)
+        print(f"Error al crear lote de {len(lote)} tracks: {e}")
+
+    for posicion, spool in lote:
+        try:
+            new_id = store.insert(conexion, spool)
+            metadata.save_info(conexion, new_id, spool.audio_info())
+            store.commit(conexion)
+            resultados[posicion] = {'idtrack': new_id}
+        except Exception as e:
+            store.rollback(conexion)
+            print(f"Error al crear track: {e}")
+            resultados[posicion] = {'error': Error(code="500", message="Database error")}
+
+
+def _bulk_insert(items):
+    """
+    Guarda las pistas de items ((spool, error_response) en orden) por lotes de
+    TRACK_BULK_BATCH. Devuelve un resultado por elemento, en el mismo orden.
+    """
+    store = storage.get_storage()
+    conexion = None
+    lote = []    # (posición en resultados, spool)
+    try:
+        conexion = dbConectar()
+        if not conexion:
+            return Error(code="500", message="Database connection failed"), 500
+
+        resultados = []
+        for spool, error_response in items:
+            resultados.append({'error': error_response[0]} if error_response else None)
+            if spool is None:
+                continue
+            lote.append((len(resultados) - 1, spool))
+            if len(lote) >= TRACK_BULK_BATCH:
+                _insert_batch(store, conexion, lote, resultados)
+                for _, spool in lote:
+                    spool.close()
+                lote = []
+        if lote:
+            _insert_batch(store, conexion, lote, resultados)
+        return resultados, 200
+
+    except Exception as e:
+        print(f"Error en la subida masiva: {e}")
+        return Error(code="500", message="Database error"), 500
+
+    finally:
+        for _, spool in lote:
+            spool.close()
+        if conexion:
+            dbDesconectar(conexion)
+
+
+def stream_upload():
+    """
+    before_request de Flask para las variantes application/octet-stream y
+    multipart/form-data de add_track y update_track, y para add_tracks_bulk.
+    Connexion lee el cuerpo entero en memoria antes de llamar al controlador,
+    así que estas subidas se atienden aquí leyendo el stream por trozos.
+    """
+    request = flask.request
+    if not request.endpoint:
+        return None
+
+    endpoint = request.endpoint.rsplit('.', 1)[-1]
+    if endpoint == _flaskify_endpoint('add_tracks_bulk'):
+        if request.mimetype not in BULK_UPLOAD_TYPES:
+            return None
+        track_id = None
+    elif request.mimetype not in STREAM_UPLOAD_TYPES:
+        return None
+    elif endpoint == _flaskify_endpoint('add_track'):
+        track_id = None
+    elif endpoint == _flaskify_endpoint('update_track'):
+        track_id = request.view_args['trackId']
+    else:
+        return None
+
+    # La seguridad de Connexion no llega a ejecutarse: se comprueba aquí
+    if not check_oversound_auth(request.cookies.get('oversound_auth'), ['write:tracks']):
+        return _as_response((Error(code="401", message="Unauthorized: Missing or invalid token"), 401))
+
+    if endpoint == _flaskify_endpoint('add_tracks_bulk'):
+        # Cada pista se limita por separado; el cuerpo entero no
+        if request.mimetype == 'multipart/form-data':
+            return _as_response(_bulk_insert(_multipart_tracks(request.files)))
+        return _as_response(_bulk_insert(_ndjson_tracks(request.stream)))
+
+    limite = storage.TRACK_MAX_SIZE
+    if request.mimetype == 'multipart/form-data':
+        limite += MULTIPART_OVERHEAD
+    if request.content_length and request.content_length > limite:
+        return _as_response((Error(code="413", message="Track too large"), 413))
+
+    if request.mimetype == 'multipart/form-data':
+        fichero = request.files.get('track')
+        if fichero is None:
+            return _as_response((Error(code="400", message="Missing track file"), 400))
+        stream = fichero.stream
+    else:
+        stream = request.stream
+
+    if track_id is None and ingest.enabled():
+        return _as_response(_enqueue('raw', iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''),
+                                     storage.TRACK_MAX_SIZE))
+
+    try:
+        spool = TrackSpool.from_stream(stream)
+    except TrackTooLargeError:
+        return _as_response((Error(code="413", message="Track too large"), 413))
+
+    with spool:
+        if track_id is None:
+            return _as_response(_insert_spool(spool))
+        return _as_response(_update_spool(track_id, spool))
+
+
 def add_track(body):
     """Add a new track to the database"""
     # Verificar autenticación defensiva
@@ -34,34 +397,207 @@ def add_track(body):
         return Error(code="400", message="Invalid JSON"), 400
 
     track = Track.from_dict(connexion.request.get_json())
-    conexion = None
 
+    if ingest.enabled():
+        return _enqueue_base64(track.track)
+
+    # Decodificar el base64 por trozos a un fichero temporal
+    spool, error_response = _decode_track(track)
+    if error_response:
+        return error_response
+
+    with spool:
+        return _insert_spool(spool, track.track)
+
+
+def get_upload_job(job_id):
+    """Gets the state of an asynchronous upload"""
+    # Verificar autenticación defensiva
+    authorized, error_response = check_auth(required_scopes=['write:tracks'])
+    if not authorized:
+        return error_response
+
+    estado = ingest.ingest_queue.status(job_id)
+    if estado is None:
+        return Error(code="404", message="Job not found"), 404
+    return _ingest_job(estado), 200
+
+
+def add_tracks_bulk(body):
+    """Adds many tracks in batches"""
+    # Las variantes NDJSON y multipart se atienden en stream_upload
+    return Error(code="415", message="Use application/x-ndjson or multipart/form-data"), 415
+
+
+_TRACK_JSON_PREFIX = b'{"idtrack": %d, "track": "'
+_TRACK_JSON_SUFFIX = b'"}'
+
+
+class _Base64Chunks(object):
+    """
+    Codifica en base64 una secuencia de trozos como si fueran uno solo.
+    Cada trozo se corta en múltiplos de 3 bytes y el sobrante pasa al siguiente,
+    para que el base64 concatenado sea el del audio entero.
+    """
+
+    def __init__(self):
+        self._resto = b''
+
+    def encode(self, chunk):
+        """Lista de piezas de base64 que ya se pueden enviar"""
+        piezas = []
+        vista = memoryview(chunk)
+        with fase('base64_encode'):
+            if self._resto:
+                falta = 3 - len(self._resto)
+                self._resto += vista[:falta].tobytes()
+                vista = vista[falta:]
+                if len(self._resto) < 3:
+                    return piezas
+                piezas.append(base64.b64encode(self._resto))
+            corte = len(vista) - len(vista) % 3
+            if corte:
+                piezas.append(base64.b64encode(vista[:corte]))
+            self._resto = vista[corte:].tobytes()
+        return piezas
+
+    def final(self):
+        with fase('base64_encode'):
+            return base64.b64encode(self._resto)
+
+
+def _track_json_length(track_id, size):
+    """Longitud en bytes de lo que genera _track_json para un audio de size bytes"""
+    return len(_TRACK_JSON_PREFIX % track_id) + 4 * ((size + 2) // 3) + len(_TRACK_JSON_SUFFIX)
+
+
+def _track_json(track_id, chunks):
+    """
+    Genera el JSON de Track ({"idtrack":…,"track":"<base64>"}) codificando el
+    audio trozo a trozo según sale del almacenamiento.
+    """
+    yield _TRACK_JSON_PREFIX % track_id
+    codificador = _Base64Chunks()
+    for chunk in chunks:
+        yield from codificador.encode(chunk)
+    yield codificador.final()
+    yield _TRACK_JSON_SUFFIX
+
+
+def get_track(track_id):
+    """Gets a track file directly (returns audio in base64)"""
+    # Verificar autenticación defensiva
+    authorized, error_response = check_auth(required_scopes=['read:tracks'])
+    if not authorized:
+        return error_response
+    
+    conexion = None
     try:
         conexion = dbConectar()
         if not conexion:
             return Error(code="500", message="Database connection failed"), 500
 
-        # Decodificar el base64 a bytes para almacenar en BYTEA
-        try:
-            track_bytes = base64.b64decode(track.track)
-        except Exception as e:
-            return Error(code="400", message="Invalid base64 encoding"), 400
+        # El cuerpo que se guarda en track_cache tiene que ser el de la versión del ETag
+        metadata.snapshot(conexion)
+        # Solo metadatos: si el cliente ya tiene esta versión no se lee el audio
+        validadores = metadata.validators(conexion, track_id)
+        if not validadores:
+            return Error(code="404", message="Track not found"), 404
+        headers = _cache_headers(track_id, *validadores, 'json')
+        if _not_modified(headers, validadores[1]):
+            return Response(status=304, headers=headers)
+
+        # Las pistas calientes se sirven ya codificadas desde la caché
+        body = track_cache.get(track_id, validadores[0])
+        if body is not None:
+            return Response(body, status=200, mimetype='application/json', headers=headers)
+
+        store = storage.get_storage()
+        size = store.size(conexion, track_id)
+        longitud = _track_json_length(track_id, size)
+        if longitud <= track_cache.max_item_bytes:
+            body = b''.join(_track_json(track_id, store.read(conexion, track_id, 0, size - 1)))
+            track_cache.put(track_id, validadores[0], body)
+            return Response(body, status=200, mimetype='application/json', headers=headers)
+
+        # Pistas grandes: se codifican y envían por trozos, sin copias del audio entero
+        headers['Content-Length'] = str(longitud)
+        response = Response(_track_json(track_id, store.read(conexion, track_id, 0, size - 1)), status=200,
+                            mimetype='application/json', headers=headers)
+        # La conexión se libera cuando termina de enviarse la respuesta
+        response.call_on_close(lambda conexion=conexion: dbDesconectar(conexion))
+        conexion = None
+        return response
 
-        with conexion.cursor() as cur:
-            query = "INSERT INTO tracks (track) VALUES (%s) RETURNING idtrack;"
-            cur.execute(query, [DB.Binary(track_bytes)])  
+    except Exception as e:
+        print(f"Error al obtener track: {e}")
+        return Error(code="500", message="Database error"), 500
 
-            new_id = cur.fetchone()[0]
-            conexion.commit()
+    finally:
+        if conexion:
+            dbDesconectar(conexion)
 
-        # Crear un nuevo objeto Track con el ID generado para la respuesta
-        response_track = Track(idtrack=new_id, track=track.track)
-        return response_track, 201
+
+def head_track(track_id):
+    """Gets the headers of get_track without reading the audio"""
+    # Verificar autenticación defensiva
+    authorized, error_response = check_auth(required_scopes=['read:tracks'])
+    if not authorized:
+        return error_response
+
+    conexion = None
+    try:
+        conexion = dbConectar()
+        if not conexion:
+            return Error(code="500", message="Database connection failed"), 500
+
+        info = metadata.info(conexion, track_id)
+        if not info:
+            return Error(code="404", message="Track not found"), 404
+        headers = _cache_headers(track_id, info['version'], info['updated_at'], 'json')
+        if _not_modified(headers, info['updated_at']):
+            return Response(status=304, headers=headers)
+
+        size, mime = _size_mime(storage.get_storage(), conexion, track_id, info)
+        headers.update(_info_headers(info, mime))
+        headers['Content-Length'] = str(_track_json_length(track_id, size))
+        return Response(status=200, mimetype='application/json', headers=headers)
 
     except Exception as e:
+        print(f"Error al obtener track: {e}")
+        return Error(code="500", message="Database error"), 500
+
+    finally:
         if conexion:
-            conexion.rollback()
-        print(f"Error al crear track: {e}")
+            dbDesconectar(conexion)
+
+
+def get_track_info(track_id):
+    """Gets the audio metadata of a track"""
+    # Verificar autenticación defensiva
+    authorized, error_response = check_auth(required_scopes=['read:tracks'])
+    if not authorized:
+        return error_response
+
+    conexion = None
+    try:
+        conexion = dbConectar()
+        if not conexion:
+            return Error(code="500", message="Database connection failed"), 500
+
+        info = metadata.info(conexion, track_id)
+        if not info:
+            return Error(code="404", message="Track not found"), 404
+        headers = _cache_headers(track_id, info['version'], info['updated_at'], 'info')
+        if _not_modified(headers, info['updated_at']):
+            return Response(status=304, headers=headers)
+
+        size, mime = _size_mime(storage.get_storage(), conexion, track_id, info)
+        return TrackInfo(idtrack=track_id, size_bytes=size, mime=mime, duration_ms=info['duration_ms'],
+                         bitrate=info['bitrate'], sample_rate=info['sample_rate']), 200, headers
+
+    except Exception as e:
+        print(f"Error al obtener info del track: {e}")
         return Error(code="500", message="Database error"), 500
 
     finally:
@@ -69,36 +605,39 @@ def add_track(body):
             dbDesconectar(conexion)
 
 
-def get_track(track_id):
-    """Gets a track file directly (returns audio in base64)"""
+def _track_peaks(track_id, picos, buckets):
+    """TrackPeaks con buckets tramos (o los que haya) de los picos guardados"""
+    tramos, valores = peaks.select(picos, buckets or 1024)
+    return TrackPeaks(idtrack=track_id, buckets=tramos, bits=8, data=valores)
+
+
+def get_track_peaks(track_id, buckets=None):
+    """Gets the waveform peaks of a track"""
     # Verificar autenticación defensiva
     authorized, error_response = check_auth(required_scopes=['read:tracks'])
     if not authorized:
         return error_response
-    
+
     conexion = None
     try:
         conexion = dbConectar()
         if not conexion:
             return Error(code="500", message="Database connection failed"), 500
 
-        with conexion.cursor() as cur:
-            query = "SELECT track FROM tracks WHERE idtrack = %s"
-            cur.execute(query, [track_id])
-            row = cur.fetchone()
-        if not row:
+        fila = metadata.peaks(conexion, track_id)
+        if not fila:
             return Error(code="404", message="Track not found"), 404
+        version, updated_at, picos = fila
+        if picos is None:
+            return Error(code="404", message="Waveform not available for this track"), 404
+        headers = _cache_headers(track_id, version, updated_at, 'peaks')
+        if _not_modified(headers, updated_at):
+            return Response(status=304, headers=headers)
 
-        # Obtener los bytes del campo BYTEA
-        track_bytes = bytes(row[0])
-        # Codificar a base64 para devolver
-        track_base64 = base64.b64encode(track_bytes).decode('utf-8')
-        
-        track_obj = Track(idtrack=track_id, track=track_base64)
-        return track_obj, 200
+        return _track_peaks(track_id, picos, buckets), 200, headers
 
     except Exception as e:
-        print(f"Error al obtener track: {e}")
+        print(f"Error al obtener picos del track: {e}")
         return Error(code="500", message="Database error"), 500
 
     finally:
@@ -106,46 +645,175 @@ def get_track(track_id):
             dbDesconectar(conexion)
 
 
-def update_track(body, track_id):
-    """Updates a track in the database"""
+_TRACK_NOT_FOUND_LINE = b'{"idtrack": %d, "error": {"code": "404", "message": "Track not found"}}\n'
+
+
+def _batch_lines(store, conexion, track_ids):
+    """Una línea JSON por pista encontrada y, al final, una por cada id que no existe"""
+    encontrados = set()
+    for track_id, chunks in store.read_many(conexion, track_ids):
+        encontrados.add(track_id)
+        yield from _track_json(track_id, chunks)
+        yield b'\n'
+    for track_id in track_ids:
+        if track_id not in encontrados:
+            yield _TRACK_NOT_FOUND_LINE % track_id
+
+
+def get_tracks_batch(body):
+    """Gets several tracks at once, streamed as newline-delimited JSON"""
     # Verificar autenticación defensiva
-    authorized, error_response = check_auth(required_scopes=['write:tracks'])
+    authorized, error_response = check_auth(required_scopes=['read:tracks'])
     if not authorized:
         return error_response
-    
+
     if not connexion.request.is_json:
         return Error(code="400", message="Invalid JSON"), 400
 
-    track = Track.from_dict(connexion.request.get_json())
-    conexion = None
+    batch = TrackBatch.from_dict(connexion.request.get_json())
+    # Sin repetidos, en el orden de la petición
+    track_ids = list(dict.fromkeys(batch.ids or []))
+    if len(track_ids) > TRACK_BATCH_MAX:
+        return Error(code="400", message=f"Too many ids (max {TRACK_BATCH_MAX})"), 400
 
+    conexion = None
     try:
         conexion = dbConectar()
         if not conexion:
             return Error(code="500", message="Database connection failed"), 500
 
-        # Decodificar el base64 a bytes para almacenar en BYTEA
-        try:
-            track_bytes = base64.b64decode(track.track)
-        except Exception as e:
-            return Error(code="400", message="Invalid base64 encoding"), 400
+        store = storage.get_storage()
+        response = Response(_batch_lines(store, conexion, track_ids), status=200,
+                            mimetype='application/x-ndjson')
+        # La conexión se libera cuando termina de enviarse la respuesta
+        response.call_on_close(lambda conexion=conexion: dbDesconectar(conexion))
+        conexion = None
+        return response
+
+    except Exception as e:
+        print(f"Error al obtener tracks: {e}")
+        return Error(code="500", message="Database error"), 500
 
-        with conexion.cursor() as cur:
-            query = "UPDATE tracks SET track = %s WHERE idtrack = %s;"
-            cur.execute(query, [DB.Binary(track_bytes), track_id])
+    finally:
+        if conexion:
+            dbDesconectar(conexion)
 
-            if cur.rowcount == 0:
-                conexion.rollback()
-                return Error(code="404", message="Track not found"), 404
 
-            conexion.commit()
+def _track_list(filas, limit):
+    """Página de list_tracks a partir de hasta limit + 1 filas: la sobrante indica que hay más"""
+    tracks = [TrackSummary(**fila) for fila in filas[:limit]]
+    next_after_id = tracks[-1].idtrack if len(filas) > limit else None
+    return TrackList(tracks=tracks, next_after_id=next_after_id)
 
-        return '', 204
+
+def list_tracks(after_id=None, limit=None):
+    """Lists the tracks by idtrack with keyset pagination, metadata only"""
+    # Verificar autenticación defensiva
+    authorized, error_response = check_auth(required_scopes=['read:tracks'])
+    if not authorized:
+        return error_response
+
+    after_id = after_id or 0
+    limit = limit or 100
+    if limit > TRACK_LIST_MAX:
+        return Error(code="400", message=f"limit too large (max {TRACK_LIST_MAX})"), 400
+
+    conexion = None
+    try:
+        conexion = dbConectar()
+        if not conexion:
+            return Error(code="500", message="Database connection failed"), 500
+
+        # Solo el índice tracks_listing_idx: nunca se lee el audio
+        filas = metadata.list_tracks(conexion, after_id, limit + 1)
+        return _track_list(filas, limit), 200
 
     except Exception as e:
+        print(f"Error al listar tracks: {e}")
+        return Error(code="500", message="Database error"), 500
+
+    finally:
         if conexion:
-            conexion.rollback()
-        print(f"Error al actualizar track: {e}")
+            dbDesconectar(conexion)
+
+
+def _audio_file(store, conexion, track_id, start, end):
+    """wsgi.file_wrapper con el audio, para enviarlo con sendfile; None si el backend o el servidor no lo permiten"""
+    file_wrapper = connexion.request.environ.get('wsgi.file_wrapper')
+    if file_wrapper and end >= start:
+        fichero = store.open_file(conexion, track_id)
+        if fichero:
+            # El servidor (p. ej. gunicorn) envía Content-Length bytes desde la posición actual
+            fichero.seek(start)
+            return file_wrapper(fichero, AUDIO_CHUNK_SIZE)
+    return None
+
+
+def get_track_audio(track_id, t=None):
+    """Gets the raw audio of a track, supports HTTP Range requests and seeking to t seconds"""
+    # Verificar autenticación defensiva
+    authorized, error_response = check_auth(required_scopes=['read:tracks'])
+    if not authorized:
+        return error_response
+
+    conexion = None
+    try:
+        conexion = dbConectar()
+        if not conexion:
+            return Error(code="500", message="Database connection failed"), 500
+
+        # ETag, Content-Length y bytes de la misma versión de la pista
+        metadata.snapshot(conexion)
+        info = metadata.info(conexion, track_id)
+        if not info:
+            return Error(code="404", message="Track not found"), 404
+        validadores = info['version'], info['updated_at']
+        headers = _cache_headers(track_id, *validadores, 'audio')
+        if _not_modified(headers, validadores[1]):
+            return Response(status=304, headers=headers)
+
+        store = storage.get_storage()
+        size, mime = _size_mime(store, conexion, track_id, info)
+
+        range_header = connexion.request.headers.get('Range')
+        if_range = connexion.request.if_range
+        if t is not None:
+            # El tiempo se convierte en un rango desde el punto del índice anterior a t
+            ms, offset = metadata.seek_point(conexion, track_id, int(t * 1000)) or (0, 0)
+            headers['X-Seek-Time-Ms'] = str(ms)
+            range_header = f'bytes={offset}-' if offset else None
+        elif (if_range.etag and if_range.etag != headers['ETag'].strip('"')) or \
+                (if_range.date and if_range.date != validadores[1].replace(microsecond=0)):
+            # If-Range de otra versión: se envía la pista entera
+            range_header = None
+        try:
+            rango = audio_util.parse_range(range_header, size)
+        except ValueError:
+            return Response(status=416, headers={'Content-Range': f'bytes */{size}',
+                                                 'Accept-Ranges': 'bytes'})
+
+        headers['Accept-Ranges'] = 'bytes'
+        if rango is None:
+            status, (start, end) = 200, (0, size - 1)
+        else:
+            status, (start, end) = 206, rango
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        headers['Content-Length'] = str(end - start + 1)
+
+        fichero = _audio_file(store, conexion, track_id, start, end)
+        if fichero:
+            # El servidor tiene que recibir su file_wrapper tal cual; el fichero ya no necesita la conexión
+            return Response(fichero, status=status, mimetype=mime, headers=headers, direct_passthrough=True)
+
+        response = Response(store.read(conexion, track_id, start, end), status=status, mimetype=mime,
+                            headers=headers)
+        # La conexión se libera cuando termina de enviarse la respuesta
+        response.call_on_close(lambda conexion=conexion: dbDesconectar(conexion))
+        conexion = None
+        return response
+
+    except Exception as e:
+        print(f"Error al obtener audio: {e}")
         return Error(code="500", message="Database error"), 500
 
     finally:
@@ -153,6 +821,27 @@ def update_track(body, track_id):
             dbDesconectar(conexion)
 
 
+def update_track(body, track_id):
+    """Updates a track in the database"""
+    # Verificar autenticación defensiva
+    authorized, error_response = check_auth(required_scopes=['write:tracks'])
+    if not authorized:
+        return error_response
+    
+    if not connexion.request.is_json:
+        return Error(code="400", message="Invalid JSON"), 400
+
+    track = Track.from_dict(connexion.request.get_json())
+
+    # Decodificar el base64 por trozos a un fichero temporal
+    spool, error_response = _decode_track(track)
+    if error_response:
+        return error_response
+
+    with spool:
+        return _update_spool(track_id, spool)
+
+
 def delete_track(track_id):
     """Deletes a track"""
     # Verificar autenticación defensiva
@@ -160,26 +849,25 @@ def delete_track(track_id):
     if not authorized:
         return error_response
     
+    store = storage.get_storage()
     conexion = None
     try:
         conexion = dbConectar()
         if not conexion:
             return Error(code="500", message="Database connection failed"), 500
 
-        with conexion.cursor() as cur:
-            query = "DELETE FROM tracks WHERE idtrack = %s;"
-            cur.execute(query, [track_id])
-            if cur.rowcount == 0:
-                conexion.rollback()
-                return Error(code="404", message="Track not found"), 404
+        if not store.delete(conexion, track_id):
+            store.rollback(conexion)
+            return Error(code="404", message="Track not found"), 404
 
-            conexion.commit()
+        store.commit(conexion)
+        track_cache.invalidate(track_id)
 
         return '', 204
 
     except Exception as e:
         if conexion:
-            conexion.rollback()
+            store.rollback(conexion)
         print(f"Error al eliminar track: {e}")
         return Error(code="500", message="Database error"), 500
 
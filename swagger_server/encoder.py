@@ -1,20 +1,17 @@
 from connexion.apps.flask_app import FlaskJSONEncoder
-import six
 
+from swagger_server.metrics import fase
 from swagger_server.models.base_model_ import Model
 
 
 class JSONEncoder(FlaskJSONEncoder):
     include_nulls = False
 
+    def encode(self, o):
+        with fase('serialize'):
+            return FlaskJSONEncoder.encode(self, o)
+
     def default(self, o):
         if isinstance(o, Model):
-            dikt = {}
-            for attr, _ in six.iteritems(o.swagger_types):
-                value = getattr(o, attr)
-                if value is None and not self.include_nulls:
-                    continue
-                attr = o.attribute_map[attr]
-                dikt[attr] = value
-            return dikt
+            return o.to_json_dict(self.include_nulls)
         return FlaskJSONEncoder.default(self, o)
@@ -0,0 +1,368 @@
+# coding: utf-8
+"""
+Subida asíncrona de pistas (TRACK_INGEST=async).
+
+POST /track/upload solo copia el cuerpo a TRACK_INGEST_DIR y responde 202
+con el id del trabajo. Un pool de TRACK_INGEST_WORKERS hilos por proceso lo
+decodifica a un TrackSpool (base64, SHA-256, metadatos, picos) y lo guarda
+con el backend de TRACK_STORAGE, por el camino síncrono también en el modo
+aiohttp. GET /track/upload/{jobId} devuelve el estado.
+
+Cada trabajo son dos ficheros en TRACK_INGEST_DIR:
+
+    <job_id>.raw o <job_id>.b64   cuerpo: el audio, o el texto base64 de un JSON
+    <job_id>.json                 estado: queued, decoding, storing, done o failed
+
+El estado se reescribe de forma atómica en cada fase y cada
+INGEST_PROGRESS_BYTES leídos del cuerpo, así que cualquier proceso puede
+contestar al GET. El cuerpo se borra al terminar el trabajo y el estado
+pasadas TRACK_INGEST_JOB_TTL segundos.
+
+Al arrancar, cada proceso vuelve a encolar los trabajos sin terminar que
+encuentra en el directorio (resume). Un hilo bloquea el cuerpo con flock
+antes de procesarlo: si ya lo tiene otro proceso, lo deja. Un trabajo que se
+corte entre el commit y la escritura del estado done se vuelve a guardar al
+reanudarse, con lo que la pista queda repetida.
+"""
+import binascii
+import datetime
+import fcntl
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from swagger_server import storage
+from swagger_server.storage import TrackSpool, TrackTooLargeError
+from swagger_server.storage import metadata
+from swagger_server.controllers.dbconx.tempName import dbConectar, dbDesconectar
+
+# 'sync': add_track guarda la pista antes de responder; 'async': responde 202 y la guarda el pool
+TRACK_INGEST = os.getenv('TRACK_INGEST', 'sync')
+INGEST_MODES = ('sync', 'async')
+# Directorio local de los trabajos; tiene que sobrevivir a los reinicios
+TRACK_INGEST_DIR = os.getenv('TRACK_INGEST_DIR', '/var/lib/pt/ingest')
+# Hilos que procesan trabajos en cada proceso
+TRACK_INGEST_WORKERS = int(os.getenv('TRACK_INGEST_WORKERS', 2))
+# Trabajos pendientes por proceso a partir de los que se responde 503
+TRACK_INGEST_QUEUE_MAX = int(os.getenv('TRACK_INGEST_QUEUE_MAX', 100))
+# Segundos que se guarda el estado de un trabajo terminado
+TRACK_INGEST_JOB_TTL = int(os.getenv('TRACK_INGEST_JOB_TTL', 24 * 3600))
+# Cada cuántos bytes leídos del cuerpo se actualiza processed_bytes
+INGEST_PROGRESS_BYTES = 8 * 1024 * 1024
+# Segundos mínimos entre dos limpiezas del directorio
+INGEST_PURGE_INTERVAL = 3600
+
+FORMATOS = ('raw', 'b64')
+TERMINADOS = ('done', 'failed')
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _modo_async(modo=TRACK_INGEST):
+    if modo not in INGEST_MODES:
+        raise ValueError(f"Unknown TRACK_INGEST '{modo}'")
+    return modo == 'async'
+
+
+_async = _modo_async()
+
+
+def enabled():
+    """True si las subidas de add_track se procesan en segundo plano"""
+    return _async
+
+
+class IngestQueueFull(Exception):
+    """Hay TRACK_INGEST_QUEUE_MAX trabajos pendientes en este proceso."""
+
+
+def _ahora():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class _Progreso(object):
+    """read(n) sobre el cuerpo que avisa cada INGEST_PROGRESS_BYTES bytes leídos"""
+
+    def __init__(self, fichero, avisar):
+        self._fichero = fichero
+        self._avisar = avisar
+        self.leidos = 0
+
+    def read(self, n=-1):
+        datos = self._fichero.read(n)
+        antes, self.leidos = self.leidos, self.leidos + len(datos)
+        if antes // INGEST_PROGRESS_BYTES != self.leidos // INGEST_PROGRESS_BYTES:
+            self._avisar(self.leidos)
+        return datos
+
+
+class _Subida(object):
+    """Cuerpo de un trabajo nuevo mientras se copia al directorio (ver IngestQueue.upload)"""
+
+    def __init__(self, cola, formato, max_size):
+        self.job_id = uuid.uuid4().hex
+        self.size = 0
+        self._cola = cola
+        self._formato = formato
+        self._max_size = max_size
+        fd, self._temporal = tempfile.mkstemp(dir=cola.directorio, prefix=self.job_id, suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        if self._max_size is not None and self.size + len(data) > self._max_size:
+            raise TrackTooLargeError(f"Track larger than {self._max_size} bytes")
+        self._file.write(data)
+        self.size += len(data)
+
+    def submit(self):
+        """Deja el trabajo en la cola y devuelve su estado"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        estado = self._cola._nuevo(self.job_id, self._formato, self._temporal, self.size)
+        self._temporal = None
+        return estado
+
+    def close(self):
+        self._file.close()
+        if self._temporal:
+            os.unlink(self._temporal)
+            self._temporal = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _guardar(spool):
+    """Guarda el spool como pista nueva. Devuelve (idtrack, error)"""
+    store = storage.get_storage()
+    conexion = None
+    try:
+        conexion = dbConectar()
+        if not conexion:
+            return None, {'code': "500", 'message': "Database connection failed"}
+
+        new_id = store.insert(conexion, spool)
+        metadata.save_info(conexion, new_id, spool.audio_info())
+        store.commit(conexion)
+        return new_id, None
+
+    except Exception as e:
+        if conexion:
+            store.rollback(conexion)
+        print(f"Error al crear track: {e}")
+        return None, {'code': "500", 'message': "Database error"}
+
+    finally:
+        if conexion:
+            dbDesconectar(conexion)
+
+
+class IngestQueue(object):
+    """
+    Cola de trabajos de subida guardada en un directorio. Los hilos del pool
+    se crean con el primer trabajo, así que con preload de gunicorn el
+    proceso maestro no arranca ninguno.
+    """
+
+    def __init__(self, directorio=TRACK_INGEST_DIR, workers=TRACK_INGEST_WORKERS,
+                 max_pendientes=TRACK_INGEST_QUEUE_MAX):
+        self.directorio = directorio
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pendientes = set()
+        self._purga = 0
+
+    def upload(self, formato, max_size=None) -> _Subida:
+        """
+        Empieza un trabajo: se escribe el cuerpo con write() y se encola con
+        submit(). Si se sale del with sin submit() el cuerpo se descarta.
+
+        :param formato: 'raw' (audio) o 'b64' (texto base64).
+        :param max_size: bytes máximos del cuerpo (TrackTooLargeError).
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Unknown ingest format '{formato}'")
+        with self._lock:
+            if len(self._pendientes) >= self.max_pendientes:
+                raise IngestQueueFull()
+        os.makedirs(self.directorio, exist_ok=True)
+        return _Subida(self, formato, max_size)
+
+    def status(self, job_id):
+        """Estado del trabajo (dict), o None si no existe"""
+        if not _JOB_ID.match(job_id):
+            return None
+        try:
+            with open(self._ruta(job_id, 'json')) as fichero:
+                return json.load(fichero)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def rescan(self):
+        """Encola los trabajos sin terminar del directorio, del más antiguo al más nuevo"""
+        if not os.path.isdir(self.directorio):
+            return 0
+        self._purgar()
+        trabajos = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.json'):
+                continue
+            estado = self.status(nombre[:-len('.json')])
+            if estado and estado['status'] not in TERMINADOS:
+                trabajos.append((estado['created_at'], estado['job_id']))
+        for _, job_id in sorted(trabajos):
+            self._encolar(job_id)
+        return len(trabajos)
+
+    def pending(self):
+        """Trabajos encolados o en proceso en este proceso"""
+        with self._lock:
+            return len(self._pendientes)
+
+    def _ruta(self, job_id, extension):
+        return os.path.join(self.directorio, f"{job_id}.{extension}")
+
+    def _escribir(self, estado, sync=False):
+        """Sustituye el fichero de estado de forma atómica"""
+        fd, temporal = tempfile.mkstemp(dir=self.directorio, prefix=estado['job_id'], suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as fichero:
+                json.dump(estado, fichero)
+                if sync:
+                    fichero.flush()
+                    os.fsync(fichero.fileno())
+            os.replace(temporal, self._ruta(estado['job_id'], 'json'))
+        except Exception:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+            raise
+
+    def _actualizar(self, estado, **cambios):
+        estado.update(cambios, updated_at=_ahora())
+        self._escribir(estado, sync=estado['status'] in TERMINADOS)
+
+    def _nuevo(self, job_id, formato, temporal, size):
+        # Primero el cuerpo: un trabajo existe cuando tiene estado
+        os.replace(temporal, self._ruta(job_id, formato))
+        ahora = _ahora()
+        estado = {'job_id': job_id, 'status': 'queued', 'format': formato, 'size_bytes': size,
+                  'processed_bytes': 0, 'idtrack': None, 'error': None, 'created_at': ahora, 'updated_at': ahora}
+        self._escribir(estado, sync=True)
+        self._encolar(job_id)
+        return estado
+
+    def _encolar(self, job_id):
+        with self._lock:
+            if job_id in self._pendientes:
+                return
+            self._pendientes.add(job_id)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest')
+            self._pool.submit(self._ejecutar, job_id)
+
+    def _ejecutar(self, job_id):
+        try:
+            self._procesar(job_id)
+        except Exception as e:
+            # Queda sin terminar y se reintenta en el próximo rescan
+            print(f"Error en el trabajo de subida {job_id}: {e}")
+        finally:
+            with self._lock:
+                self._pendientes.discard(job_id)
+            if time.monotonic() - self._purga > INGEST_PURGE_INTERVAL:
+                self._purgar()
+
+    def _procesar(self, job_id):
+        estado = self.status(job_id)
+        if estado is None or estado['status'] in TERMINADOS:
+            return
+        ruta = self._ruta(job_id, estado['format'])
+        try:
+            cuerpo = open(ruta, 'rb')
+        except FileNotFoundError:
+            # Lo ha terminado otro proceso entretanto
+            return
+
+        with cuerpo:
+            try:
+                fcntl.flock(cuerpo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Lo está procesando otro proceso
+                return
+            # Con el lock se vuelve a leer: otro proceso puede haberlo terminado antes
+            estado = self.status(job_id)
+            if estado is None or estado['status'] in TERMINADOS:
+                return
+
+            self._actualizar(estado, status='decoding', processed_bytes=0)
+            lector = _Progreso(cuerpo, lambda leidos: self._actualizar(estado, processed_bytes=leidos))
+            try:
+                if estado['format'] == 'b64':
+                    spool = TrackSpool.from_base64_stream(lector)
+                else:
+                    spool = TrackSpool.from_stream(lector)
+            except TrackTooLargeError:
+                self._actualizar(estado, status='failed', processed_bytes=lector.leidos,
+                                 error={'code': "413", 'message': "Track too large"})
+            except (binascii.Error, ValueError):
+                self._actualizar(estado, status='failed', processed_bytes=lector.leidos,
+                                 error={'code': "400", 'message': "Invalid base64 encoding"})
+            else:
+                with spool:
+                    self._actualizar(estado, status='storing', processed_bytes=lector.leidos)
+                    idtrack, error = _guardar(spool)
+                if error:
+                    self._actualizar(estado, status='failed', error=error)
+                else:
+                    self._actualizar(estado, status='done', idtrack=idtrack)
+            # El estado final ya está escrito: el cuerpo se borra antes de soltar el lock
+            os.unlink(ruta)
+
+    def _purgar(self):
+        """Borra los estados terminados y los ficheros huérfanos de más de TRACK_INGEST_JOB_TTL segundos"""
+        self._purga = time.monotonic()
+        limite = time.time() - TRACK_INGEST_JOB_TTL
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            return
+        for nombre in nombres:
+            ruta = os.path.join(self.directorio, nombre)
+            job_id, _, extension = nombre.partition('.')
+            try:
+                if os.stat(ruta).st_mtime >= limite:
+                    continue
+                if extension == 'json':
+                    estado = self.status(job_id)
+                    if estado and estado['status'] not in TERMINADOS:
+                        continue
+                elif extension in FORMATOS and os.path.exists(self._ruta(job_id, 'json')):
+                    # Cuerpo de un trabajo pendiente
+                    continue
+                os.unlink(ruta)
+            except FileNotFoundError:
+                pass
+
+
+# Cola de las subidas de este proceso
+ingest_queue = IngestQueue()
+
+
+def resume():
+    """Reanuda los trabajos pendientes si TRACK_INGEST=async (al arrancar cada proceso)"""
+    if not _async:
+        return
+    pendientes = ingest_queue.rescan()
+    if pendientes:
+        print(f"Trabajos de subida reanudados: {pendientes}")
@@ -0,0 +1,167 @@
+# coding: utf-8
+"""
+Backend JSON para los cuerpos de petición y respuesta.
+
+JSON_BACKEND elige la implementación:
+- 'auto' (por defecto): orjson si está instalado, si no la de siempre.
+- 'orjson': orjson; falla al arrancar si no está instalado.
+- 'stdlib': el módulo json con encoder.JSONEncoder, como hasta ahora.
+
+La salida de orjson tiene que ser idéntica byte a byte a la de json.dumps
+con sort_keys, ensure_ascii y el JSONEncoder del servicio. Solo se usa para
+los formatos en los que orjson coincide (indent=2, o compacto con
+separators=(',', ':')) y para datos que orjson escribe igual: dicts con
+claves str, listas, str, enteros de 64 bits, bool, None, fechas (que se
+pasan a str como hace JSONEncoder) y modelos. Si hay
+floats, otros tipos o caracteres fuera de ASCII, se usa el camino de
+siempre para ese objeto. Al leer, lo que orjson rechaza (NaN...) o lee
+distinto (enteros de más de 64 bits, que convierte a float) se vuelve a leer
+con json.loads.
+"""
+import datetime
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+from swagger_server.encoder import JSONEncoder
+from swagger_server.metrics import fase
+from swagger_server.models.base_model_ import Model
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+BACKENDS = ('auto', 'orjson', 'stdlib')
+
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 64 - 1
+_COMPACT = (',', ':')
+
+
+class _NoSoportado(Exception):
+    """El objeto tiene algo que orjson no escribiría igual que json.dumps"""
+
+
+def _usar_orjson(backend=JSON_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON_BACKEND '{backend}'")
+    if backend == 'orjson' and orjson is None:
+        raise ImportError("JSON_BACKEND=orjson but orjson is not installed")
+    return backend != 'stdlib' and orjson is not None
+
+
+_orjson = _usar_orjson()
+
+
+def _nativo(obj, include_nulls):
+    """Copia de obj con los modelos convertidos a dict; _NoSoportado si no vale para orjson"""
+    tipo = obj.__class__
+    if tipo is str or obj is None or tipo is bool:
+        return obj
+    if tipo is int:
+        if not _INT_MIN <= obj <= _INT_MAX:
+            raise _NoSoportado()
+        return obj
+    if tipo is dict:
+        resultado = {}
+        for clave, valor in obj.items():
+            if clave.__class__ is not str:
+                raise _NoSoportado()
+            resultado[clave] = _nativo(valor, include_nulls)
+        return resultado
+    if tipo is list or tipo is tuple:
+        return [_nativo(valor, include_nulls) for valor in obj]
+    if isinstance(obj, Model):
+        return _nativo(obj.to_json_dict(include_nulls), include_nulls)
+    if tipo is datetime.datetime:
+        # Igual que FlaskJSONEncoder de Connexion: sin zona horaria se supone UTC
+        return obj.isoformat('T') if obj.tzinfo else obj.isoformat('T') + 'Z'
+    raise _NoSoportado()
+
+
+def _rapido(obj, indent=None, separators=None, sort_keys=True, **kwargs):
+    """obj en JSON con orjson, o None si la salida no sería idéntica a la de json.dumps"""
+    if not _orjson or kwargs:
+        return None
+    if indent == 2 and separators in (None, (',', ': ')):
+        opciones = orjson.OPT_INDENT_2
+    elif indent is None and separators == _COMPACT:
+        opciones = 0
+    else:
+        return None
+    if sort_keys:
+        opciones |= orjson.OPT_SORT_KEYS
+    try:
+        with fase('serialize'):
+            salida = orjson.dumps(_nativo(obj, JSONEncoder.include_nulls), option=opciones)
+    except (_NoSoportado, orjson.JSONEncodeError):
+        return None
+    # json.dumps escapa todo lo que no es ASCII, y también DEL
+    if not salida.isascii() or b'\x7f' in salida:
+        return None
+    return salida.decode('ascii')
+
+
+def dumps(obj, indent=None, separators=None):
+    """json.dumps con el JSONEncoder del servicio y sort_keys, por orjson cuando da lo mismo"""
+    texto = _rapido(obj, indent=indent, separators=separators)
+    if texto is None:
+        texto = json.dumps(obj, cls=JSONEncoder, indent=indent, separators=separators, sort_keys=True)
+    return texto
+
+
+def _tiene_float(obj):
+    tipo = obj.__class__
+    if tipo is float:
+        return True
+    if tipo is dict:
+        return any(_tiene_float(valor) for valor in obj.values())
+    if tipo is list:
+        return any(_tiene_float(valor) for valor in obj)
+    return False
+
+
+def _cargar(s):
+    """orjson.loads, o None si hay que leerlo con json.loads"""
+    try:
+        datos = orjson.loads(s)
+    except orjson.JSONDecodeError:
+        return None
+    # orjson lee los enteros de más de 64 bits como float; json.loads, como int
+    if _tiene_float(datos):
+        return None
+    return datos
+
+
+def loads(s):
+    """json.loads, por orjson cuando lo acepta"""
+    if _orjson:
+        datos = _cargar(s)
+        if datos is not None:
+            return datos
+    return json.loads(s)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask que usa el backend configurado y si no el de siempre"""
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        # Sin ensure_ascii la salida solo coincide si es ASCII, que es lo que _rapido exige siempre
+        ensure_ascii = kwargs.pop('ensure_ascii', None)
+        texto = _rapido(obj, **kwargs)
+        if texto is not None:
+            return texto
+        if ensure_ascii is not None:
+            kwargs['ensure_ascii'] = ensure_ascii
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if _orjson and not kwargs:
+            datos = _cargar(s)
+            if datos is not None:
+                return datos
+        return super().loads(s, **kwargs)
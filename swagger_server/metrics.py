@@ -0,0 +1,320 @@
+# coding: utf-8
+"""
+Métricas Prometheus del servicio, expuestas en GET /metrics:
+
+- pt_request_duration_seconds{operation}: hasta enviar el último byte.
+- pt_phase_duration_seconds{operation, phase}: tiempo de cada petición en
+  auth, db_acquire, db_query, base64_encode, base64_decode y serialize.
+- pt_request_size_bytes / pt_response_size_bytes{operation}.
+- pt_requests_in_flight.
+- pt_responses_total{operation, status}.
+
+Una fracción SERVER_TIMING_RATE de las peticiones, además, devuelve sus fases
+en la cabecera Server-Timing y, con SERVER_TIMING_LOG, escribe una línea JSON
+al terminar. Si SERVER_TIMING_FILE apunta a un fichero JSON
+({"rate": 0.1, "log": true}), ambos valores se releen de él en caliente.
+
+Las fases se miden con `with fase('db_query'):` y se suman en la Medicion de
+la petición en curso (un ContextVar), de modo que el código que no atiende
+una petición (scripts, migraciones) no paga nada.
+Con gunicorn, PROMETHEUS_MULTIPROC_DIR agrega las métricas de todos los workers.
+"""
+import contextvars
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+SERVER_TIMING_RATE = float(os.getenv('SERVER_TIMING_RATE', 0))
+SERVER_TIMING_LOG = os.getenv('SERVER_TIMING_LOG', '0') == '1'
+SERVER_TIMING_FILE = os.getenv('SERVER_TIMING_FILE')
+# Cada cuántos segundos se mira si SERVER_TIMING_FILE ha cambiado
+SERVER_TIMING_RELOAD = 1.0
+
+LATENCY_BUCKETS = (.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120)
+# 1 KB .. 256 MB
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+
+REQUEST_DURATION = Histogram('pt_request_duration_seconds', 'Request latency until the last byte is sent',
+                             ['operation'], buckets=LATENCY_BUCKETS)
+PHASE_DURATION = Histogram('pt_phase_duration_seconds', 'Time spent by a request in each phase',
+                           ['operation', 'phase'], buckets=LATENCY_BUCKETS)
+REQUEST_SIZE = Histogram('pt_request_size_bytes', 'Request body size', ['operation'], buckets=SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram('pt_response_size_bytes', 'Response body size', ['operation'], buckets=SIZE_BUCKETS)
+IN_FLIGHT = Gauge('pt_requests_in_flight', 'Requests being served', multiprocess_mode='livesum')
+RESPONSES = Counter('pt_responses_total', 'Responses by operation and status code', ['operation', 'status'])
+
+
+class Medicion(object):
+    """Tiempos de la petición en curso"""
+
+    __slots__ = ('operacion', 'inicio', 'fases', 'detalle')
+
+    def __init__(self, detalle=False):
+        self.operacion = None
+        self.inicio = time.perf_counter()
+        self.fases = {}
+        # Si la petición entra en la muestra de Server-Timing
+        self.detalle = detalle
+
+    def sumar(self, nombre, segundos):
+        self.fases[nombre] = self.fases.get(nombre, 0.0) + segundos
+
+    def server_timing(self):
+        """Valor de la cabecera Server-Timing con las fases medidas hasta ahora, en ms"""
+        partes = [f"{nombre};dur={segundos * 1000:.3f}" for nombre, segundos in self.fases.items()]
+        partes.append(f"total;dur={(time.perf_counter() - self.inicio) * 1000:.3f}")
+        return ', '.join(partes)
+
+
+class _Muestreo(object):
+    """Tasa de muestreo y log de Server-Timing, modificables en caliente"""
+
+    def __init__(self, rate, log, fichero):
+        self.rate = rate
+        self.log = log
+        self.fichero = fichero
+        self._mtime = None
+        self._revisado = 0.0
+
+    def configurar(self, rate=None, log=None):
+        if rate is not None:
+            self.rate = min(max(float(rate), 0.0), 1.0)
+        if log is not None:
+            self.log = bool(log)
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        if ahora - self._revisado < SERVER_TIMING_RELOAD:
+            return
+        self._revisado = ahora
+        try:
+            mtime = os.stat(self.fichero).st_mtime
+            if mtime == self._mtime:
+                return
+            with open(self.fichero) as f:
+                valores = json.load(f)
+            self._mtime = mtime
+            self.configurar(valores.get('rate'), valores.get('log'))
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Error al leer {self.fichero}: {e}")
+            self._mtime = None
+
+    def elegir(self):
+        """True si la petición que empieza entra en la muestra"""
+        if self.fichero:
+            self._recargar()
+        return self.rate > 0 and (self.rate >= 1 or random.random() < self.rate)
+
+
+muestreo = _Muestreo(SERVER_TIMING_RATE, SERVER_TIMING_LOG, SERVER_TIMING_FILE)
+
+
+_actual = contextvars.ContextVar('pt_medicion', default=None)
+
+
+def actual():
+    """Medicion de la petición en curso, o None fuera de una petición"""
+    return _actual.get()
+
+
+@contextmanager
+def fase(nombre):
+    """Suma la duración del bloque a la fase nombre de la petición en curso"""
+    medicion = _actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar(nombre, time.perf_counter() - inicio)
+
+
+def operacion(endpoint):
+    """operationId a partir del endpoint de Flask o del nombre de ruta de aiohttp"""
+    nombre = endpoint.rsplit('.', 1)[-1]
+    return nombre.rsplit('_controller_', 1)[-1]
+
+
+def iniciar():
+    """Empieza a medir una petición. Devuelve (medicion, token) para terminar()"""
+    medicion = Medicion(muestreo.elegir())
+    IN_FLIGHT.inc()
+    return medicion, _actual.set(medicion)
+
+
+def terminar(medicion, token, status, recibidos, enviados):
+    """Registra la petición medida desde iniciar()"""
+    IN_FLIGHT.dec()
+    try:
+        _actual.reset(token)
+    except ValueError:
+        # Terminada desde otro contexto (p. ej. close() desde otro hilo)
+        pass
+    nombre = medicion.operacion or 'unknown'
+    REQUEST_DURATION.labels(nombre).observe(time.perf_counter() - medicion.inicio)
+    for fase_, segundos in medicion.fases.items():
+        PHASE_DURATION.labels(nombre, fase_).observe(segundos)
+    REQUEST_SIZE.labels(nombre).observe(recibidos)
+    RESPONSE_SIZE.labels(nombre).observe(enviados)
+    RESPONSES.labels(nombre, str(status)).inc()
+    if medicion.detalle and muestreo.log:
+        _log(medicion, nombre, status, recibidos, enviados)
+
+
+def _log(medicion, nombre, status, recibidos, enviados):
+    """Línea JSON con el desglose de la petición"""
+    print(json.dumps({
+        'operation': nombre,
+        'status': status,
+        'duration_ms': round((time.perf_counter() - medicion.inicio) * 1000, 3),
+        'phases_ms': {fase_: round(segundos * 1000, 3) for fase_, segundos in medicion.fases.items()},
+        'request_bytes': recibidos,
+        'response_bytes': enviados,
+    }), flush=True)
+
+
+def exposicion():
+    """(cuerpo, content_type) de GET /metrics"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def proceso_terminado(pid):
+    """Descarta las métricas en vivo de un worker que ha terminado (child_exit de gunicorn)"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def marcar_operacion():
+    """before_request de Flask: pone el operationId a la medición de la petición"""
+    import flask
+    medicion = _actual.get()
+    if medicion is not None and flask.request.endpoint:
+        medicion.operacion = operacion(flask.request.endpoint)
+
+
+class _LectorContado(object):
+    """wsgi.input que cuenta los bytes leídos del cuerpo"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.leidos = 0
+
+    def read(self, *args):
+        datos = self._stream.read(*args)
+        self.leidos += len(datos)
+        return datos
+
+    def readline(self, *args):
+        datos = self._stream.readline(*args)
+        self.leidos += len(datos)
+        return datos
+
+    def readlines(self, *args):
+        lineas = self._stream.readlines(*args)
+        self.leidos += sum(len(linea) for linea in lineas)
+        return lineas
+
+    def __iter__(self):
+        for linea in self._stream:
+            self.leidos += len(linea)
+            yield linea
+
+
+class _RespuestaMedida(object):
+    """Iterable WSGI que cuenta los bytes enviados y termina la medición en close()"""
+
+    def __init__(self, iterable, alcerrar):
+        self._iterable = iterable
+        self._alcerrar = alcerrar
+        self.enviados = 0
+
+    def __iter__(self):
+        for pieza in self._iterable:
+            self.enviados += len(pieza)
+            yield pieza
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            self._alcerrar(self.enviados)
+
+
+class MetricsMiddleware(object):
+    """Middleware WSGI que mide cada petición hasta que el servidor cierra la respuesta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        medicion, token = iniciar()
+        lector = _LectorContado(environ['wsgi.input'])
+        environ['wsgi.input'] = lector
+        estado = {'status': 500, 'headers': []}
+
+        def _start_response(status, headers, exc_info=None):
+            estado['status'] = int(status.split(' ', 1)[0])
+            if medicion.detalle:
+                headers = headers + [('Server-Timing', medicion.server_timing())]
+            estado['headers'] = headers
+            return start_response(status, headers, exc_info)
+
+        try:
+            resultado = self.app(environ, _start_response)
+        except BaseException:
+            terminar(medicion, token, 500, lector.leidos, 0)
+            raise
+
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(file_wrapper, type) and isinstance(resultado, file_wrapper):
+            # sendfile: el servidor tiene que recibir su file_wrapper; se mide hasta aquí
+            longitud = next((int(valor) for clave, valor in estado['headers']
+                             if clave.lower() == 'content-length'), 0)
+            terminar(medicion, token, estado['status'], lector.leidos, longitud)
+            return resultado
+
+        return _RespuestaMedida(
+            resultado, lambda enviados: terminar(medicion, token, estado['status'], lector.leidos, enviados))
+
+
+def aiohttp_middleware():
+    """Middleware de aiohttp equivalente a MetricsMiddleware, para el modo aiohttp"""
+    from aiohttp import web
+
+    @web.middleware
+    async def medir(request, handler):
+        medicion, token = iniciar()
+        ruta = request.match_info.route
+        if ruta.name:
+            medicion.operacion = operacion(ruta.name)
+        status, enviados = 500, 0
+        try:
+            response = await handler(request)
+            if medicion.detalle and not response.prepared:
+                response.headers['Server-Timing'] = medicion.server_timing()
+            # Se envía aquí para medir también el cuerpo en streaming
+            await response.prepare(request)
+            await response.write_eof()
+            status, enviados = response.status, response.body_length
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            terminar(medicion, token, status, request.content.total_bytes, enviados)
+
+    return medir
@@ -4,4 +4,10 @@
 from __future__ import absolute_import
 # import models into model package
 from swagger_server.models.error import Error
+from swagger_server.models.ingest_job import IngestJob
 from swagger_server.models.track import Track
+from swagger_server.models.track_batch import TrackBatch
+from swagger_server.models.track_info import TrackInfo
+from swagger_server.models.track_list import TrackList
+from swagger_server.models.track_peaks import TrackPeaks
+from swagger_server.models.track_summary import TrackSummary
@@ -1,14 +1,80 @@
 import pprint
 
-import six
 import typing
 
 from swagger_server import util
 
 T = typing.TypeVar('T')
 
+# Tipos que se copian tal cual en to_dict y se comprueban con `is` en from_dict
+_PRIMITIVES = (int, float, str, bool)
+
+
+def _to_dict_value(value):
+    """Valor de to_dict para atributos que no son primitivos"""
+    if isinstance(value, list):
+        return [x.to_dict() if hasattr(x, "to_dict") else x for x in value]
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {k: v.to_dict() if hasattr(v, "to_dict") else v for k, v in value.items()}
+    return value
+
+
+class _Compiled(object):
+    """to_dict, to_json_dict y from_dict generados para una clase de modelo"""
+
+    __slots__ = ('to_dict', 'to_json_dict', 'from_dict', 'source')
+
+    def __init__(self, cls):
+        lineas = ["def to_dict(self):", "    return {"]
+        for attr, attr_type in cls.swagger_types.items():
+            valor = f"self.{attr}"
+            if attr_type not in _PRIMITIVES:
+                valor = f"_to_dict_value({valor})"
+            lineas.append(f"        {attr!r}: {valor},")
+        lineas.append("    }")
+
+        lineas += ["def to_json_dict(self, include_nulls=False):", "    result = {}"]
+        for attr in cls.swagger_types:
+            lineas += [f"    value = self.{attr}",
+                       "    if value is not None or include_nulls:",
+                       f"        result[{cls.attribute_map[attr]!r}] = value"]
+        lineas.append("    return result")
+
+        lineas += ["def from_dict(data):"]
+        if not cls.swagger_types:
+            lineas.append("    return data")
+        else:
+            lineas += ["    instance = cls()",
+                       "    if data is not None and isinstance(data, (list, dict)):"]
+            for attr, attr_type in cls.swagger_types.items():
+                clave = cls.attribute_map[attr]
+                lineas += [f"        if {clave!r} in data:",
+                           f"            value = data[{clave!r}]"]
+                if attr_type in _PRIMITIVES:
+                    lineas += [f"            if value.__class__ is not {attr_type.__name__}:",
+                               f"                value = _deserialize(value, types[{attr!r}])"]
+                else:
+                    lineas.append(f"            value = _deserialize(value, types[{attr!r}])")
+                lineas.append(f"            instance.{attr} = value")
+            lineas.append("    return instance")
+
+        self.source = "\n".join(lineas) + "\n"
+        namespace = {'cls': cls, 'types': dict(cls.swagger_types), '_deserialize': util._deserialize,
+                     '_to_dict_value': _to_dict_value}
+        exec(compile(self.source, f"<compiled {cls.__name__}>", 'exec'), namespace)
+        self.to_dict = namespace['to_dict']
+        self.to_json_dict = namespace['to_json_dict']
+        self.from_dict = namespace['from_dict']
+
+
+_compiled = {}
+
 
 class Model(object):
+    __slots__ = ()
+
     # swaggerTypes: The key is attribute name and the
     # value is attribute type.
     swagger_types = {}
@@ -17,6 +83,18 @@ class Model(object):
     # value is json key in definition.
     attribute_map = {}
 
+    @classmethod
+    def _compiled(cls):
+        """Funciones de serialización de la clase, generadas la primera vez"""
+        compiled = _compiled.get(cls)
+        if compiled is None:
+            compiled = _compiled[cls] = _Compiled(cls)
+            # Las siguientes llamadas van directas a las funciones generadas
+            for nombre in ('to_dict', 'to_json_dict'):
+                if nombre not in cls.__dict__:
+                    setattr(cls, nombre, getattr(compiled, nombre))
+        return compiled
+
     @classmethod
     def from_dict(cls: typing.Type[T], dikt) -> T:
         """Returns the dict as a model"""
@@ -27,27 +105,15 @@ class Model(object):
 
         :rtype: dict
         """
-        result = {}
-
-        for attr, _ in six.iteritems(self.swagger_types):
-            value = getattr(self, attr)
-            if isinstance(value, list):
-                result[attr] = list(map(
-                    lambda x: x.to_dict() if hasattr(x, "to_dict") else x,
-                    value
-                ))
-            elif hasattr(value, "to_dict"):
-                result[attr] = value.to_dict()
-            elif isinstance(value, dict):
-                result[attr] = dict(map(
-                    lambda item: (item[0], item[1].to_dict())
-                    if hasattr(item[1], "to_dict") else item,
-                    value.items()
-                ))
-            else:
-                result[attr] = value
-
-        return result
+        return self._compiled().to_dict(self)
+
+    def to_json_dict(self, include_nulls=False):
+        """Returns the model as a dict with the JSON keys, without None values
+        unless include_nulls
+
+        :rtype: dict
+        """
+        return self._compiled().to_json_dict(self, include_nulls)
 
     def to_str(self):
         """Returns the string representation of the model
@@ -62,7 +128,9 @@ class Model(object):
 
     def __eq__(self, other):
         """Returns true if both objects are equal"""
-        return self.__dict__ == other.__dict__
+        if type(self) is not type(other):
+            return False
+        return all(getattr(self, attr) == getattr(other, attr) for attr in self.swagger_types)
 
     def __ne__(self, other):
         """Returns true if both objects are not equal"""
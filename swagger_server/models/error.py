@@ -14,6 +14,18 @@ class Error(Model):
 
     Do not edit the class manually.
     """
+    __slots__ = ('_code', '_message')
+
+    swagger_types = {
+        'code': str,
+        'message': str
+    }
+
+    attribute_map = {
+        'code': 'code',
+        'message': 'message'
+    }
+
     def __init__(self, code: str=None, message: str=None):  # noqa: E501
         """Error - a model defined in Swagger
 
@@ -22,15 +34,6 @@ class Error(Model):
         :param message: The message of this Error.  # noqa: E501
         :type message: str
         """
-        self.swagger_types = {
-            'code': str,
-            'message': str
-        }
-
-        self.attribute_map = {
-            'code': 'code',
-            'message': 'message'
-        }
         self._code = code
         self._message = message
 
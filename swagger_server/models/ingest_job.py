@@ -0,0 +1,258 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server.models.error import Error  # noqa: F401,E501
+from swagger_server import util
+
+
+class IngestJob(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    __slots__ = ('_job_id', '_status', '_size_bytes', '_processed_bytes', '_idtrack', '_error', '_created_at', '_updated_at')
+
+    swagger_types = {
+        'job_id': str,
+        'status': str,
+        'size_bytes': int,
+        'processed_bytes': int,
+        'idtrack': int,
+        'error': Error,
+        'created_at': datetime,
+        'updated_at': datetime
+    }
+
+    attribute_map = {
+        'job_id': 'job_id',
+        'status': 'status',
+        'size_bytes': 'size_bytes',
+        'processed_bytes': 'processed_bytes',
+        'idtrack': 'idtrack',
+        'error': 'error',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at'
+    }
+
+    def __init__(self, job_id: str=None, status: str=None, size_bytes: int=None, processed_bytes: int=None, idtrack: int=None, error: Error=None, created_at: datetime=None, updated_at: datetime=None):  # noqa: E501
+        """IngestJob - a model defined in Swagger
+
+        :param job_id: The job_id of this IngestJob.  # noqa: E501
+        :type job_id: str
+        :param status: The status of this IngestJob.  # noqa: E501
+        :type status: str
+        :param size_bytes: The size_bytes of this IngestJob.  # noqa: E501
+        :type size_bytes: int
+        :param processed_bytes: The processed_bytes of this IngestJob.  # noqa: E501
+        :type processed_bytes: int
+        :param idtrack: The idtrack of this IngestJob.  # noqa: E501
+        :type idtrack: int
+        :param error: The error of this IngestJob.  # noqa: E501
+        :type error: Error
+        :param created_at: The created_at of this IngestJob.  # noqa: E501
+        :type created_at: datetime
+        :param updated_at: The updated_at of this IngestJob.  # noqa: E501
+        :type updated_at: datetime
+        """
+        self._job_id = job_id
+        self._status = status
+        self._size_bytes = size_bytes
+        self._processed_bytes = processed_bytes
+        self._idtrack = idtrack
+        self._error = error
+        self._created_at = created_at
+        self._updated_at = updated_at
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'IngestJob':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The IngestJob of this IngestJob.  # noqa: E501
+        :rtype: IngestJob
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def job_id(self) -> str:
+        """Gets the job_id of this IngestJob.
+
+
+        :return: The job_id of this IngestJob.
+        :rtype: str
+        """
+        return self._job_id
+
+    @job_id.setter
+    def job_id(self, job_id: str):
+        """Sets the job_id of this IngestJob.
+
+
+        :param job_id: The job_id of this IngestJob.
+        :type job_id: str
+        """
+        if job_id is None:
+            raise ValueError("Invalid value for `job_id`, must not be `None`")  # noqa: E501
+
+        self._job_id = job_id
+
+    @property
+    def status(self) -> str:
+        """Gets the status of this IngestJob.
+
+
+        :return: The status of this IngestJob.
+        :rtype: str
+        """
+        return self._status
+
+    @status.setter
+    def status(self, status: str):
+        """Sets the status of this IngestJob.
+
+
+        :param status: The status of this IngestJob.
+        :type status: str
+        """
+        if status is None:
+            raise ValueError("Invalid value for `status`, must not be `None`")  # noqa: E501
+        allowed_values = ["queued", "decoding", "storing", "done", "failed"]  # noqa: E501
+        if status not in allowed_values:
+            raise ValueError(
+                "Invalid value for `status` ({0}), must be one of {1}"
+                .format(status, allowed_values)
+            )
+
+        self._status = status
+
+    @property
+    def size_bytes(self) -> int:
+        """Gets the size_bytes of this IngestJob.
+
+
+        :return: The size_bytes of this IngestJob.
+        :rtype: int
+        """
+        return self._size_bytes
+
+    @size_bytes.setter
+    def size_bytes(self, size_bytes: int):
+        """Sets the size_bytes of this IngestJob.
+
+
+        :param size_bytes: The size_bytes of this IngestJob.
+        :type size_bytes: int
+        """
+
+        self._size_bytes = size_bytes
+
+    @property
+    def processed_bytes(self) -> int:
+        """Gets the processed_bytes of this IngestJob.
+
+
+        :return: The processed_bytes of this IngestJob.
+        :rtype: int
+        """
+        return self._processed_bytes
+
+    @processed_bytes.setter
+    def processed_bytes(self, processed_bytes: int):
+        """Sets the processed_bytes of this IngestJob.
+
+
+        :param processed_bytes: The processed_bytes of this IngestJob.
+        :type processed_bytes: int
+        """
+
+        self._processed_bytes = processed_bytes
+
+    @property
+    def idtrack(self) -> int:
+        """Gets the idtrack of this IngestJob.
+
+
+        :return: The idtrack of this IngestJob.
+        :rtype: int
+        """
+        return self._idtrack
+
+    @idtrack.setter
+    def idtrack(self, idtrack: int):
+        """Sets the idtrack of this IngestJob.
+
+
+        :param idtrack: The idtrack of this IngestJob.
+        :type idtrack: int
+        """
+
+        self._idtrack = idtrack
+
+    @property
+    def error(self) -> Error:
+        """Gets the error of this IngestJob.
+
+
+        :return: The error of this IngestJob.
+        :rtype: Error
+        """
+        return self._error
+
+    @error.setter
+    def error(self, error: Error):
+        """Sets the error of this IngestJob.
+
+
+        :param error: The error of this IngestJob.
+        :type error: Error
+        """
+
+        self._error = error
+
+    @property
+    def created_at(self) -> datetime:
+        """Gets the created_at of this IngestJob.
+
+
+        :return: The created_at of this IngestJob.
+        :rtype: datetime
+        """
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, created_at: datetime):
+        """Sets the created_at of this IngestJob.
+
+
+        :param created_at: The created_at of this IngestJob.
+        :type created_at: datetime
+        """
+
+        self._created_at = created_at
+
+    @property
+    def updated_at(self) -> datetime:
+        """Gets the updated_at of this IngestJob.
+
+
+        :return: The updated_at of this IngestJob.
+        :rtype: datetime
+        """
+        return self._updated_at
+
+    @updated_at.setter
+    def updated_at(self, updated_at: datetime):
+        """Sets the updated_at of this IngestJob.
+
+
+        :param updated_at: The updated_at of this IngestJob.
+        :type updated_at: datetime
+        """
+
+        self._updated_at = updated_at
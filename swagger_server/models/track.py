@@ -14,6 +14,18 @@ class Track(Model):
 
     Do not edit the class manually.
     """
+    __slots__ = ('_idtrack', '_track')
+
+    swagger_types = {
+        'idtrack': int,
+        'track': str
+    }
+
+    attribute_map = {
+        'idtrack': 'idtrack',
+        'track': 'track'
+    }
+
     def __init__(self, idtrack: int=None, track: str=None):  # noqa: E501
         """Track - a model defined in Swagger
 
@@ -22,15 +34,6 @@ class Track(Model):
         :param track: The track of this Track.  # noqa: E501
         :type track: str
         """
-        self.swagger_types = {
-            'idtrack': int,
-            'track': str
-        }
-
-        self.attribute_map = {
-            'idtrack': 'idtrack',
-            'track': 'track'
-        }
         self._idtrack = idtrack
         self._track = track
 
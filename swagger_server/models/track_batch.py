@@ -0,0 +1,67 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class TrackBatch(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    __slots__ = ('_ids',)
+
+    swagger_types = {
+        'ids': List[int]
+    }
+
+    attribute_map = {
+        'ids': 'ids'
+    }
+
+    def __init__(self, ids: List[int]=None):  # noqa: E501
+        """TrackBatch - a model defined in Swagger
+
+        :param ids: The ids of this TrackBatch.  # noqa: E501
+        :type ids: List[int]
+        """
+        self._ids = ids
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'TrackBatch':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The TrackBatch of this TrackBatch.  # noqa: E501
+        :rtype: TrackBatch
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def ids(self) -> List[int]:
+        """Gets the ids of this TrackBatch.
+
+
+        :return: The ids of this TrackBatch.
+        :rtype: List[int]
+        """
+        return self._ids
+
+    @ids.setter
+    def ids(self, ids: List[int]):
+        """Sets the ids of this TrackBatch.
+
+
+        :param ids: The ids of this TrackBatch.
+        :type ids: List[int]
+        """
+        if ids is None:
+            raise ValueError("Invalid value for `ids`, must not be `None`")  # noqa: E501
+
+        self._ids = ids
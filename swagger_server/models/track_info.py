@@ -0,0 +1,195 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class TrackInfo(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    __slots__ = ('_idtrack', '_size_bytes', '_mime', '_duration_ms', '_bitrate', '_sample_rate')
+
+    swagger_types = {
+        'idtrack': int,
+        'size_bytes': int,
+        'mime': str,
+        'duration_ms': int,
+        'bitrate': int,
+        'sample_rate': int
+    }
+
+    attribute_map = {
+        'idtrack': 'idtrack',
+        'size_bytes': 'size_bytes',
+        'mime': 'mime',
+        'duration_ms': 'duration_ms',
+        'bitrate': 'bitrate',
+        'sample_rate': 'sample_rate'
+    }
+
+    def __init__(self, idtrack: int=None, size_bytes: int=None, mime: str=None, duration_ms: int=None, bitrate: int=None, sample_rate: int=None):  # noqa: E501
+        """TrackInfo - a model defined in Swagger
+
+        :param idtrack: The idtrack of this TrackInfo.  # noqa: E501
+        :type idtrack: int
+        :param size_bytes: The size_bytes of this TrackInfo.  # noqa: E501
+        :type size_bytes: int
+        :param mime: The mime of this TrackInfo.  # noqa: E501
+        :type mime: str
+        :param duration_ms: The duration_ms of this TrackInfo.  # noqa: E501
+        :type duration_ms: int
+        :param bitrate: The bitrate of this TrackInfo.  # noqa: E501
+        :type bitrate: int
+        :param sample_rate: The sample_rate of this TrackInfo.  # noqa: E501
+        :type sample_rate: int
+        """
+        self._idtrack = idtrack
+        self._size_bytes = size_bytes
+        self._mime = mime
+        self._duration_ms = duration_ms
+        self._bitrate = bitrate
+        self._sample_rate = sample_rate
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'TrackInfo':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The TrackInfo of this TrackInfo.  # noqa: E501
+        :rtype: TrackInfo
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def idtrack(self) -> int:
+        """Gets the idtrack of this TrackInfo.
+
+
+        :return: The idtrack of this TrackInfo.
+        :rtype: int
+        """
+        return self._idtrack
+
+    @idtrack.setter
+    def idtrack(self, idtrack: int):
+        """Sets the idtrack of this TrackInfo.
+
+
+        :param idtrack: The idtrack of this TrackInfo.
+        :type idtrack: int
+        """
+
+        self._idtrack = idtrack
+
+    @property
+    def size_bytes(self) -> int:
+        """Gets the size_bytes of this TrackInfo.
+
+
+        :return: The size_bytes of this TrackInfo.
+        :rtype: int
+        """
+        return self._size_bytes
+
+    @size_bytes.setter
+    def size_bytes(self, size_bytes: int):
+        """Sets the size_bytes of this TrackInfo.
+
+
+        :param size_bytes: The size_bytes of this TrackInfo.
+        :type size_bytes: int
+        """
+
+        self._size_bytes = size_bytes
+
+    @property
+    def mime(self) -> str:
+        """Gets the mime of this TrackInfo.
+
+
+        :return: The mime of this TrackInfo.
+        :rtype: str
+        """
+        return self._mime
+
+    @mime.setter
+    def mime(self, mime: str):
+        """Sets the mime of this TrackInfo.
+
+
+        :param mime: The mime of this TrackInfo.
+        :type mime: str
+        """
+
+        self._mime = mime
+
+    @property
+    def duration_ms(self) -> int:
+        """Gets the duration_ms of this TrackInfo.
+
+
+        :return: The duration_ms of this TrackInfo.
+        :rtype: int
+        """
+        return self._duration_ms
+
+    @duration_ms.setter
+    def duration_ms(self, duration_ms: int):
+        """Sets the duration_ms of this TrackInfo.
+
+
+        :param duration_ms: The duration_ms of this TrackInfo.
+        :type duration_ms: int
+        """
+
+        self._duration_ms = duration_ms
+
+    @property
+    def bitrate(self) -> int:
+        """Gets the bitrate of this TrackInfo.
+
+
+        :return: The bitrate of this TrackInfo.
+        :rtype: int
+        """
+        return self._bitrate
+
+    @bitrate.setter
+    def bitrate(self, bitrate: int):
+        """Sets the bitrate of this TrackInfo.
+
+
+        :param bitrate: The bitrate of this TrackInfo.
+        :type bitrate: int
+        """
+
+        self._bitrate = bitrate
+
+    @property
+    def sample_rate(self) -> int:
+        """Gets the sample_rate of this TrackInfo.
+
+
+        :return: The sample_rate of this TrackInfo.
+        :rtype: int
+        """
+        return self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, sample_rate: int):
+        """Sets the sample_rate of this TrackInfo.
+
+
+        :param sample_rate: The sample_rate of this TrackInfo.
+        :type sample_rate: int
+        """
+
+        self._sample_rate = sample_rate
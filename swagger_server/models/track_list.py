@@ -0,0 +1,94 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server.models.track_summary import TrackSummary  # noqa: F401,E501
+from swagger_server import util
+
+
+class TrackList(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    __slots__ = ('_tracks', '_next_after_id')
+
+    swagger_types = {
+        'tracks': List[TrackSummary],
+        'next_after_id': int
+    }
+
+    attribute_map = {
+        'tracks': 'tracks',
+        'next_after_id': 'next_after_id'
+    }
+
+    def __init__(self, tracks: List[TrackSummary]=None, next_after_id: int=None):  # noqa: E501
+        """TrackList - a model defined in Swagger
+
+        :param tracks: The tracks of this TrackList.  # noqa: E501
+        :type tracks: List[TrackSummary]
+        :param next_after_id: The next_after_id of this TrackList.  # noqa: E501
+        :type next_after_id: int
+        """
+        self._tracks = tracks
+        self._next_after_id = next_after_id
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'TrackList':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The TrackList of this TrackList.  # noqa: E501
+        :rtype: TrackList
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def tracks(self) -> List[TrackSummary]:
+        """Gets the tracks of this TrackList.
+
+
+        :return: The tracks of this TrackList.
+        :rtype: List[TrackSummary]
+        """
+        return self._tracks
+
+    @tracks.setter
+    def tracks(self, tracks: List[TrackSummary]):
+        """Sets the tracks of this TrackList.
+
+
+        :param tracks: The tracks of this TrackList.
+        :type tracks: List[TrackSummary]
+        """
+        if tracks is None:
+            raise ValueError("Invalid value for `tracks`, must not be `None`")  # noqa: E501
+
+        self._tracks = tracks
+
+    @property
+    def next_after_id(self) -> int:
+        """Gets the next_after_id of this TrackList.
+
+
+        :return: The next_after_id of this TrackList.
+        :rtype: int
+        """
+        return self._next_after_id
+
+    @next_after_id.setter
+    def next_after_id(self, next_after_id: int):
+        """Sets the next_after_id of this TrackList.
+
+
+        :param next_after_id: The next_after_id of this TrackList.
+        :type next_after_id: int
+        """
+
+        self._next_after_id = next_after_id
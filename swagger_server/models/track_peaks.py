@@ -0,0 +1,143 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class TrackPeaks(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    __slots__ = ('_idtrack', '_buckets', '_bits', '_data')
+
+    swagger_types = {
+        'idtrack': int,
+        'buckets': int,
+        'bits': int,
+        'data': List[int]
+    }
+
+    attribute_map = {
+        'idtrack': 'idtrack',
+        'buckets': 'buckets',
+        'bits': 'bits',
+        'data': 'data'
+    }
+
+    def __init__(self, idtrack: int=None, buckets: int=None, bits: int=None, data: List[int]=None):  # noqa: E501
+        """TrackPeaks - a model defined in Swagger
+
+        :param idtrack: The idtrack of this TrackPeaks.  # noqa: E501
+        :type idtrack: int
+        :param buckets: The buckets of this TrackPeaks.  # noqa: E501
+        :type buckets: int
+        :param bits: The bits of this TrackPeaks.  # noqa: E501
+        :type bits: int
+        :param data: The data of this TrackPeaks.  # noqa: E501
+        :type data: List[int]
+        """
+        self._idtrack = idtrack
+        self._buckets = buckets
+        self._bits = bits
+        self._data = data
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'TrackPeaks':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The TrackPeaks of this TrackPeaks.  # noqa: E501
+        :rtype: TrackPeaks
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def idtrack(self) -> int:
+        """Gets the idtrack of this TrackPeaks.
+
+
+        :return: The idtrack of this TrackPeaks.
+        :rtype: int
+        """
+        return self._idtrack
+
+    @idtrack.setter
+    def idtrack(self, idtrack: int):
+        """Sets the idtrack of this TrackPeaks.
+
+
+        :param idtrack: The idtrack of this TrackPeaks.
+        :type idtrack: int
+        """
+
+        self._idtrack = idtrack
+
+    @property
+    def buckets(self) -> int:
+        """Gets the buckets of this TrackPeaks.
+
+
+        :return: The buckets of this TrackPeaks.
+        :rtype: int
+        """
+        return self._buckets
+
+    @buckets.setter
+    def buckets(self, buckets: int):
+        """Sets the buckets of this TrackPeaks.
+
+
+        :param buckets: The buckets of this TrackPeaks.
+        :type buckets: int
+        """
+
+        self._buckets = buckets
+
+    @property
+    def bits(self) -> int:
+        """Gets the bits of this TrackPeaks.
+
+
+        :return: The bits of this TrackPeaks.
+        :rtype: int
+        """
+        return self._bits
+
+    @bits.setter
+    def bits(self, bits: int):
+        """Sets the bits of this TrackPeaks.
+
+
+        :param bits: The bits of this TrackPeaks.
+        :type bits: int
+        """
+
+        self._bits = bits
+
+    @property
+    def data(self) -> List[int]:
+        """Gets the data of this TrackPeaks.
+
+
+        :return: The data of this TrackPeaks.
+        :rtype: List[int]
+        """
+        return self._data
+
+    @data.setter
+    def data(self, data: List[int]):
+        """Sets the data of this TrackPeaks.
+
+
+        :param data: The data of this TrackPeaks.
+        :type data: List[int]
+        """
+
+        self._data = data
@@ -0,0 +1,169 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class TrackSummary(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    __slots__ = ('_idtrack', '_size_bytes', '_version', '_created_at', '_updated_at')
+
+    swagger_types = {
+        'idtrack': int,
+        'size_bytes': int,
+        'version': int,
+        'created_at': datetime,
+        'updated_at': datetime
+    }
+
+    attribute_map = {
+        'idtrack': 'idtrack',
+        'size_bytes': 'size_bytes',
+        'version': 'version',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at'
+    }
+
+    def __init__(self, idtrack: int=None, size_bytes: int=None, version: int=None, created_at: datetime=None, updated_at: datetime=None):  # noqa: E501
+        """TrackSummary - a model defined in Swagger
+
+        :param idtrack: The idtrack of this TrackSummary.  # noqa: E501
+        :type idtrack: int
+        :param size_bytes: The size_bytes of this TrackSummary.  # noqa: E501
+        :type size_bytes: int
+        :param version: The version of this TrackSummary.  # noqa: E501
+        :type version: int
+        :param created_at: The created_at of this TrackSummary.  # noqa: E501
+        :type created_at: datetime
+        :param updated_at: The updated_at of this TrackSummary.  # noqa: E501
+        :type updated_at: datetime
+        """
+        self._idtrack = idtrack
+        self._size_bytes = size_bytes
+        self._version = version
+        self._created_at = created_at
+        self._updated_at = updated_at
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'TrackSummary':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The TrackSummary of this TrackSummary.  # noqa: E501
+        :rtype: TrackSummary
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def idtrack(self) -> int:
+        """Gets the idtrack of this TrackSummary.
+
+
+        :return: The idtrack of this TrackSummary.
+        :rtype: int
+        """
+        return self._idtrack
+
+    @idtrack.setter
+    def idtrack(self, idtrack: int):
+        """Sets the idtrack of this TrackSummary.
+
+
+        :param idtrack: The idtrack of this TrackSummary.
+        :type idtrack: int
+        """
+
+        self._idtrack = idtrack
+
+    @property
+    def size_bytes(self) -> int:
+        """Gets the size_bytes of this TrackSummary.
+
+
+        :return: The size_bytes of this TrackSummary.
+        :rtype: int
+        """
+        return self._size_bytes
+
+    @size_bytes.setter
+    def size_bytes(self, size_bytes: int):
+        """Sets the size_bytes of this TrackSummary.
+
+
+        :param size_bytes: The size_bytes of this TrackSummary.
+        :type size_bytes: int
+        """
+
+        self._size_bytes = size_bytes
+
+    @property
+    def version(self) -> int:
+        """Gets the version of this TrackSummary.
+
+
+        :return: The version of this TrackSummary.
+        :rtype: int
+        """
+        return self._version
+
+    @version.setter
+    def version(self, version: int):
+        """Sets the version of this TrackSummary.
+
+
+        :param version: The version of this TrackSummary.
+        :type version: int
+        """
+
+        self._version = version
+
+    @property
+    def created_at(self) -> datetime:
+        """Gets the created_at of this TrackSummary.
+
+
+        :return: The created_at of this TrackSummary.
+        :rtype: datetime
+        """
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, created_at: datetime):
+        """Sets the created_at of this TrackSummary.
+
+
+        :param created_at: The created_at of this TrackSummary.
+        :type created_at: datetime
+        """
+
+        self._created_at = created_at
+
+    @property
+    def updated_at(self) -> datetime:
+        """Gets the updated_at of this TrackSummary.
+
+
+        :return: The updated_at of this TrackSummary.
+        :rtype: datetime
+        """
+        return self._updated_at
+
+    @updated_at.setter
+    def updated_at(self, updated_at: datetime):
+        """Sets the updated_at of this TrackSummary.
+
+
+        :param updated_at: The updated_at of this TrackSummary.
+        :type updated_at: datetime
+        """
+
+        self._updated_at = updated_at
@@ -0,0 +1,297 @@
+# coding: utf-8
+"""
+Picos de la forma de onda (mínimo y máximo por tramo) calculados al subir
+una pista, para que el front pueda dibujarla sin descargar el audio.
+
+Se calculan con NumPy sobre el PCM de los WAV (enteros de 8, 16, 24 y 32
+bits y coma flotante, también WAVE_FORMAT_EXTENSIBLE) mientras se escribe el
+spool, como el SHA-256 y el índice de búsqueda. Para los formatos comprimidos haría falta un decodificador, así que
+se quedan sin picos, igual que si NumPy no está instalado.
+
+Se guardan en tracks.peaks con varias resoluciones, de PEAKS_BUCKETS tramos
+a la más fina y cada una con la cuarta parte de la anterior hasta
+PEAKS_MIN_BUCKETS:
+
+    uint8 niveles | uint32 tramos de cada nivel (LE) | int8 (min, max) por tramo
+
+Los valores van de -127 a 127 (escala de 8 bits). Para servir otro número de
+tramos se reduce el nivel más pequeño que tenga al menos los pedidos, sin
+necesitar NumPy.
+"""
+import os
+import struct
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depende del entorno
+    numpy = None
+
+# Tramos del nivel más fino
+PEAKS_BUCKETS = int(os.getenv('PEAKS_BUCKETS', 4096))
+# El nivel más grueso no baja de aquí
+PEAKS_MIN_BUCKETS = 64
+# Bytes del principio del fichero donde se buscan los chunks fmt y data
+PEAKS_HEADER = 64 * 1024
+# Muestras (de todos los canales) por bloque que se pasa a NumPy
+PEAKS_BLOCK_FRAMES = 256 * 1024
+# Gránulos por tramo, como mucho, de los WAV sin tamaño de datos
+PEAKS_GRANULES = 16
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _wav_pcm(cabecera):
+    """(entero, canales, bytes por muestra, inicio y tamaño declarado de los datos) del WAV,
+    o None si no es PCM o la cabecera aún no está completa"""
+    if not cabecera.startswith(b'RIFF') or cabecera[8:12] != b'WAVE':
+        return None
+    posicion, formato = 12, None
+    while posicion + 8 <= len(cabecera):
+        chunk_id = cabecera[posicion:posicion + 4]
+        chunk_size, = struct.unpack('<I', cabecera[posicion + 4:posicion + 8])
+        if chunk_id == b'fmt ':
+            if posicion + 24 > len(cabecera):
+                return None
+            tag, canales, _, _, block_align, bits = struct.unpack('<HHIIHH', cabecera[posicion + 8:posicion + 24])
+            if tag == _WAVE_FORMAT_EXTENSIBLE:
+                if posicion + 34 > len(cabecera):
+                    return None
+                # El subformato es un GUID cuyos dos primeros bytes son el tag
+                tag, = struct.unpack('<H', cabecera[posicion + 32:posicion + 34])
+            ancho = bits // 8
+            soportado = ancho in (1, 2, 3, 4) if tag == _WAVE_FORMAT_PCM else \
+                tag == _WAVE_FORMAT_FLOAT and ancho in (4, 8)
+            if not canales or block_align != canales * ancho or not soportado:
+                return None
+            formato = (tag == _WAVE_FORMAT_PCM, canales, ancho)
+        elif chunk_id == b'data':
+            if formato is None:
+                return None
+            return formato + (posicion + 8, chunk_size)
+        posicion += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _muestras(raw, entero, ancho):
+    """Array con las muestras de raw en su tipo, sin convertirlas (ver _normalizar)"""
+    if not entero:
+        return numpy.frombuffer(raw, dtype='<f%d' % ancho)
+    if ancho == 1:
+        return numpy.frombuffer(raw, dtype=numpy.uint8)
+    if ancho == 3:
+        # 24 bits: se colocan en los bytes altos de un int32 para conservar el signo
+        trios = numpy.frombuffer(raw, dtype=numpy.uint8).reshape(-1, 3).astype(numpy.uint32)
+        return ((trios[:, 0] << 8) | (trios[:, 1] << 16) | (trios[:, 2] << 24)).view(numpy.int32)
+    return numpy.frombuffer(raw, dtype='<i%d' % ancho)
+
+
+def _normalizar(valores, entero, ancho):
+    """Valores de _muestras (ya reducidos por tramo) en [-1, 1]"""
+    if not entero:
+        return numpy.clip(valores, -1, 1)
+    if ancho == 1:
+        # 8 bits es sin signo, centrado en 128
+        return (valores - 128) / 128
+    # Las de 24 bits están en un int32 (ver _muestras)
+    bits = 32 if ancho == 3 else 8 * ancho
+    return valores / 2 ** (bits - 1)
+
+
+class PeaksIndexer(object):
+    """Computes the packed peaks of a WAV file while it is written, keeping
+    only the minimum and maximum of each bucket.
+
+    The buckets are exact when the header declares the size of the data.
+    WAV files written in streaming (size 0 or 0xFFFFFFFF) are read in
+    granules of a power of two frames, doubled as the file grows so that
+    there are at most PEAKS_GRANULES per bucket, and reduced at the end.
+    """
+
+    def __init__(self, tramos=None):
+        self.tramos = tramos or PEAKS_BUCKETS
+        # None mientras llega la cabecera, False si el fichero no tiene picos
+        self._formato = None if numpy is not None else False
+        self._cabecera = bytearray()
+        self._pendiente = b''
+        self._restantes = None
+        self._leidos = 0
+        # Bordes de los tramos (en frames) si se conoce el tamaño; si no, gránulos de _granulo frames
+        self._bordes = None
+        self._granulo = 1
+        self._usados = 0
+        self._minimos = self._maximos = None
+
+    def feed(self, data):
+        """Adds the next chunk of the file"""
+        if self._formato is None:
+            self._cabecera += data
+            self._empezar(False)
+        elif self._formato:
+            self._pcm(data)
+
+    def _empezar(self, final):
+        cabecera = self._cabecera
+        if len(cabecera) >= 12 and (not cabecera.startswith(b'RIFF') or cabecera[8:12] != b'WAVE'):
+            self._formato, self._cabecera = False, None
+            return
+        formato = _wav_pcm(cabecera)
+        if formato is None:
+            if final or len(cabecera) >= PEAKS_HEADER:
+                self._formato, self._cabecera = False, None
+            return
+        entero, canales, ancho, inicio, datos = formato
+        self._formato, self._cabecera = (entero, canales, ancho), None
+        if datos not in (0, 0xFFFFFFFF):
+            total = datos // (canales * ancho)
+            if not total:
+                self._formato = False
+                return
+            tramos = min(self.tramos, total)
+            # Tramo i: frames de bordes[i] a bordes[i + 1]
+            self._bordes = numpy.arange(tramos + 1, dtype=numpy.int64) * total // tramos
+            self._minimos = numpy.full(tramos, numpy.inf)
+            self._maximos = numpy.full(tramos, -numpy.inf)
+            self._restantes = datos
+        self._pcm(bytes(cabecera[inicio:]))
+
+    def _pcm(self, data):
+        entero, canales, ancho = self._formato
+        frame = canales * ancho
+        vista = memoryview(data)
+        if self._restantes is not None:
+            vista = vista[:self._restantes]
+            self._restantes -= len(vista)
+        if self._pendiente:
+            vista = memoryview(self._pendiente + bytes(vista))
+        n = len(vista) // frame
+        self._pendiente = bytes(vista[n * frame:])
+        paso = max(PEAKS_BLOCK_FRAMES // canales, 1)
+        for desde in range(0, n, paso):
+            hasta = min(desde + paso, n)
+            self._bloque(_muestras(vista[desde * frame:hasta * frame], entero, ancho), hasta - desde, canales)
+
+    def _bloque(self, bloque, n, canales):
+        """Acumula el min y el max de los n frames de bloque en sus tramos o gránulos"""
+        leidos = self._leidos
+        if self._bordes is not None:
+            primero = numpy.searchsorted(self._bordes, leidos, side='right') - 1
+            ultimo = numpy.searchsorted(self._bordes, leidos + n - 1, side='right') - 1
+            bordes = self._bordes[primero:ultimo + 1]
+        else:
+            primero, ultimo = leidos // self._granulo, (leidos + n - 1) // self._granulo
+            bordes = numpy.arange(primero, ultimo + 1, dtype=numpy.int64) * self._granulo
+            self._reservar(ultimo + 1)
+        # Dónde empieza cada tramo dentro del bloque. Los canales están intercalados,
+        # así que cada tramo abarca sus muestras de todos los canales.
+        inicios = (numpy.maximum(bordes, leidos) - leidos) * canales
+        tramo = slice(primero, ultimo + 1)
+        self._minimos[tramo] = numpy.minimum(self._minimos[tramo], numpy.minimum.reduceat(bloque, inicios))
+        self._maximos[tramo] = numpy.maximum(self._maximos[tramo], numpy.maximum.reduceat(bloque, inicios))
+        self._leidos += n
+        self._usados = ultimo + 1
+        if self._bordes is None:
+            while self._usados > PEAKS_GRANULES * self.tramos:
+                self._juntar()
+
+    def _reservar(self, n):
+        """Amplía los arrays de gránulos para que quepan n"""
+        if self._minimos is not None and len(self._minimos) >= n:
+            return
+        capacidad = max(n, 2 * len(self._minimos)) if self._minimos is not None else n
+        minimos, maximos = numpy.full(capacidad, numpy.inf), numpy.full(capacidad, -numpy.inf)
+        if self._minimos is not None:
+            minimos[:self._usados] = self._minimos[:self._usados]
+            maximos[:self._usados] = self._maximos[:self._usados]
+        self._minimos, self._maximos = minimos, maximos
+
+    def _juntar(self):
+        """Junta los gránulos de dos en dos y duplica su tamaño"""
+        usados, pares = self._usados, numpy.arange(0, self._usados, 2)
+        mitad = len(pares)
+        self._minimos[:mitad] = numpy.minimum.reduceat(self._minimos[:usados], pares)
+        self._maximos[:mitad] = numpy.maximum.reduceat(self._maximos[:usados], pares)
+        self._minimos[mitad:usados] = numpy.inf
+        self._maximos[mitad:usados] = -numpy.inf
+        self._usados, self._granulo = mitad, 2 * self._granulo
+
+    def result(self):
+        """Returns the peaks in the tracks.peaks format, or None if the format
+        is not supported or NumPy is not installed.
+
+        :rtype: bytes
+        """
+        if self._formato is None:
+            self._empezar(True)
+        if not self._formato or not self._leidos:
+            return None
+        # Si el fichero está cortado solo quedan los tramos que llegaron a leerse
+        minimos, maximos = self._minimos[:self._usados], self._maximos[:self._usados]
+        if self._usados > self.tramos:
+            inicios = numpy.arange(self.tramos, dtype=numpy.int64) * self._usados // self.tramos
+            minimos, maximos = numpy.minimum.reduceat(minimos, inicios), numpy.maximum.reduceat(maximos, inicios)
+        entero, _, ancho = self._formato
+        minimos, maximos = _normalizar(minimos, entero, ancho), _normalizar(maximos, entero, ancho)
+        pares = numpy.empty(2 * len(minimos), dtype=numpy.int8)
+        pares[0::2] = numpy.round(minimos * 127)
+        pares[1::2] = numpy.round(maximos * 127)
+        niveles = [pares.tobytes()]
+        while len(niveles[-1]) // 2 >= 4 * PEAKS_MIN_BUCKETS:
+            niveles.append(numpy.array(downsample(niveles[-1], len(niveles[-1]) // 8), dtype=numpy.int8).tobytes())
+        return pack(niveles)
+
+
+def downsample(valores, tramos):
+    """Reduces (min, max) int8 pairs to at most tramos buckets.
+
+    :param valores: bytes or sequence with min and max interleaved.
+    :return: list of int with min and max interleaved.
+    :rtype: list
+    """
+    if isinstance(valores, (bytes, bytearray)):
+        valores = memoryview(valores).cast('b')
+    total = len(valores) // 2
+    if tramos >= total:
+        return list(valores)
+    minimos, maximos = valores[0::2], valores[1::2]
+    resultado = []
+    for i in range(tramos):
+        desde, hasta = i * total // tramos, (i + 1) * total // tramos
+        resultado.append(min(minimos[desde:hasta]))
+        resultado.append(max(maximos[desde:hasta]))
+    return resultado
+
+
+def pack(niveles):
+    """Packs the levels (bytes of int8 pairs, finest first) in the tracks.peaks format"""
+    tamanos = [len(nivel) // 2 for nivel in niveles]
+    return struct.pack('<B%dI' % len(niveles), len(niveles), *tamanos) + b''.join(niveles)
+
+
+def unpack(peaks):
+    """Levels (bytes of int8 pairs, finest first) of a tracks.peaks value"""
+    cuantos = peaks[0]
+    tamanos = struct.unpack_from('<%dI' % cuantos, peaks, 1)
+    niveles, posicion = [], 1 + 4 * cuantos
+    for tamano in tamanos:
+        niveles.append(bytes(peaks[posicion:posicion + 2 * tamano]))
+        posicion += 2 * tamano
+    return niveles
+
+
+def select(peaks, tramos):
+    """Returns (buckets, values) for a request of tramos buckets.
+
+    Reduces the smallest stored level with at least tramos buckets, or
+    returns the finest one if none is large enough.
+
+    :rtype: tuple
+    """
+    niveles = unpack(peaks)
+    nivel = niveles[0]
+    for candidato in niveles:
+        if len(candidato) // 2 >= tramos:
+            nivel = candidato
+    valores = downsample(nivel, tramos)
+    return len(valores) // 2, valores
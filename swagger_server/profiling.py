@@ -0,0 +1,236 @@
+# coding: utf-8
+"""
+Perfilado bajo demanda de peticiones concretas (solo modos WSGI).
+
+Con PROFILE_TOKEN definido, una petición con la cabecera X-Profile: <token>
+(o el parámetro ?profile=<token>) se ejecuta bajo un perfilador:
+
+- cprofile (por defecto): cProfile, determinista. Solo una petición a la vez
+  por proceso; si ya hay otra, se sirve sin perfilar (X-Profile-Error: busy).
+- sampling: un hilo toma la pila del hilo de la petición cada
+  PROFILE_INTERVAL segundos y cuenta pilas colapsadas (formato flamegraph).
+
+El modo se elige con X-Profile-Mode (o ?profile_mode=) y, si no, con
+PROFILE_MODE. Con PROFILE_DIR el perfil se guarda en ese directorio y la
+respuesta normal lleva X-Profile-File con el nombre; sin él, el cuerpo de la
+respuesta se sustituye por el informe en texto.
+Las peticiones sin la cabecera ni el parámetro solo pagan una búsqueda en el
+environ, y sin PROFILE_TOKEN la app ni siquiera se envuelve.
+"""
+import cProfile
+import collections
+import hmac
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode
+
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile')
+PROFILE_DIR = os.getenv('PROFILE_DIR')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+# Funciones del informe en texto de cProfile
+PROFILE_LIMIT = int(os.getenv('PROFILE_LIMIT', 60))
+
+MODES = ('cprofile', 'sampling')
+_QUERY_TOKEN = 'profile'
+_QUERY_MODE = 'profile_mode'
+
+# Solo puede haber un cProfile activo por proceso
+_cprofile_lock = threading.Lock()
+
+
+class _CProfile(object):
+    extension = 'prof'
+
+    def __init__(self):
+        self._perfil = cProfile.Profile()
+
+    def iniciar(self):
+        self._perfil.enable()
+
+    def parar(self):
+        self._perfil.disable()
+
+    def guardar(self, ruta):
+        self._perfil.dump_stats(ruta)
+
+    def informe(self):
+        salida = io.StringIO()
+        pstats.Stats(self._perfil, stream=salida).sort_stats('cumulative').print_stats(PROFILE_LIMIT)
+        return salida.getvalue()
+
+
+class _Muestreo(object):
+    """Perfilador por muestreo de un solo hilo: pilas colapsadas -> número de muestras"""
+    extension = 'collapsed'
+
+    def __init__(self, intervalo=PROFILE_INTERVAL):
+        self.intervalo = intervalo
+        self.muestras = collections.Counter()
+        self._hilo_id = None
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo_id = threading.get_ident()
+        self._hilo = threading.Thread(target=self._bucle, name='pt-profile-sampler', daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self._hilo_id)
+            if frame is None:
+                continue
+            pila = []
+            while frame is not None:
+                codigo = frame.f_code
+                pila.append(f"{codigo.co_name} ({codigo.co_filename}:{codigo.co_firstlineno})")
+                frame = frame.f_back
+            self.muestras[';'.join(reversed(pila))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self._hilo.join()
+
+    def guardar(self, ruta):
+        with open(ruta, 'w') as f:
+            f.write(self.informe())
+
+    def informe(self):
+        return ''.join(f"{pila} {n}\n" for pila, n in self.muestras.most_common())
+
+
+def _nombre(environ, extension):
+    ruta = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{environ.get('REQUEST_METHOD', 'GET')}-{ruta}.{extension}"
+
+
+class _RespuestaPerfilada(object):
+    """Iterable WSGI que para el perfilador y guarda el perfil cuando el servidor la cierra"""
+
+    def __init__(self, iterable, perfilador, ruta, liberar):
+        self._iterable = iterable
+        self._perfilador = perfilador
+        self._ruta = ruta
+        self._liberar = liberar
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            self._perfilador.parar()
+            self._liberar()
+            try:
+                self._perfilador.guardar(self._ruta)
+            except OSError as e:
+                print(f"Error al guardar el perfil {self._ruta}: {e}")
+
+
+class ProfilerMiddleware(object):
+    """Middleware WSGI que perfila las peticiones marcadas con el token de PROFILE_TOKEN"""
+
+    def __init__(self, app, token=PROFILE_TOKEN, directorio=PROFILE_DIR, modo=PROFILE_MODE):
+        self.app = app
+        self.token = token
+        self.directorio = directorio
+        self.modo = modo
+
+    def _pedido(self, environ):
+        """(token, modo) de la petición, quitando los parámetros de perfilado de la query"""
+        token = environ.get('HTTP_X_PROFILE')
+        modo = environ.get('HTTP_X_PROFILE_MODE')
+        query = environ.get('QUERY_STRING', '')
+        if _QUERY_TOKEN in query:
+            resto = []
+            for clave, valor in parse_qsl(query, keep_blank_values=True):
+                if clave == _QUERY_TOKEN:
+                    token = token or valor
+                elif clave == _QUERY_MODE:
+                    modo = modo or valor
+                else:
+                    resto.append((clave, valor))
+            environ['QUERY_STRING'] = urlencode(resto)
+        return token, modo or self.modo
+
+    def __call__(self, environ, start_response):
+        if 'HTTP_X_PROFILE' not in environ and _QUERY_TOKEN not in environ.get('QUERY_STRING', ''):
+            return self.app(environ, start_response)
+
+        token, modo = self._pedido(environ)
+        if not token or not hmac.compare_digest(token.encode(), self.token.encode()):
+            return self.app(environ, start_response)
+        if modo not in MODES:
+            return self._error(environ, start_response, f"unknown mode {modo}")
+
+        liberar = lambda: None  # noqa: E731
+        if modo == 'cprofile':
+            if not _cprofile_lock.acquire(blocking=False):
+                return self._error(environ, start_response, 'busy')
+            liberar = _cprofile_lock.release
+            perfilador = _CProfile()
+        else:
+            perfilador = _Muestreo()
+
+        try:
+            if self.directorio:
+                return self._a_fichero(environ, start_response, perfilador, liberar)
+            return self._en_linea(environ, start_response, perfilador, liberar)
+        except BaseException:
+            liberar()
+            raise
+
+    def _a_fichero(self, environ, start_response, perfilador, liberar):
+        """Respuesta normal; el perfil se escribe en PROFILE_DIR al cerrarla"""
+        nombre = _nombre(environ, perfilador.extension)
+
+        def _start_response(status, headers, exc_info=None):
+            return start_response(status, headers + [('X-Profile-File', nombre)], exc_info)
+
+        perfilador.iniciar()
+        try:
+            resultado = self.app(environ, _start_response)
+        except BaseException:
+            perfilador.parar()
+            raise
+        return _RespuestaPerfilada(resultado, perfilador, os.path.join(self.directorio, nombre), liberar)
+
+    def _en_linea(self, environ, start_response, perfilador, liberar):
+        """Se consume la respuesta entera y se devuelve el informe en su lugar"""
+        estado = {}
+
+        def _start_response(status, headers, exc_info=None):
+            estado['status'] = status
+            return lambda datos: None
+
+        perfilador.iniciar()
+        try:
+            resultado = self.app(environ, _start_response)
+            try:
+                for _ in resultado:
+                    pass
+            finally:
+                if hasattr(resultado, 'close'):
+                    resultado.close()
+        finally:
+            perfilador.parar()
+            liberar()
+
+        cuerpo = perfilador.informe().encode()
+        start_response('200 OK', [('Content-Type', 'text/plain; charset=utf-8'),
+                                  ('Content-Length', str(len(cuerpo))),
+                                  ('X-Profile-Status', estado.get('status', '500').split(' ', 1)[0])])
+        return [cuerpo]
+
+    def _error(self, environ, start_response, motivo):
+        def _start_response(status, headers, exc_info=None):
+            return start_response(status, headers + [('X-Profile-Error', motivo)], exc_info)
+        return self.app(environ, _start_response)
@@ -0,0 +1,101 @@
+# coding: utf-8
+"""
+Arranque de producción: la app bajo gunicorn con varios workers pre-fork.
+
+La app se carga una vez en el proceso maestro (preload) y los workers la
+heredan; cada worker empieza con el pool de conexiones y la caché de tokens
+vacíos, y se recicla tras WEB_MAX_REQUESTS peticiones. Con TRACK_INGEST=async
+cada worker tiene su pool de ingest y vuelve a encolar al arrancar los
+trabajos pendientes del directorio.
+
+Cada worker abre hasta DB_POOL_MAX conexiones, así que WEB_WORKERS ×
+DB_POOL_MAX no debe pasar de DB_MAX_CONNECTIONS, la parte de
+max_connections de Postgres reservada a esta instancia.
+"""
+import multiprocessing
+import os
+
+from swagger_server import ingest, metrics
+from swagger_server.controllers.authorization_controller import reset_auth_cache
+from swagger_server.controllers.dbconx.tempName import POOL_MAX, cerrarPool, reiniciarPool
+
+
+def _cpus():
+    """CPUs que puede usar el proceso: afinidad y cuota del cgroup (límite --cpus de Docker)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - depende del sistema
+        cpus = multiprocessing.cpu_count()
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as fichero:
+            cuota, periodo = fichero.read().split()
+        if cuota != 'max':
+            cpus = min(cpus, max(int(cuota) // int(periodo), 1))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+# Conexiones a Postgres que pueden abrir entre todos los workers
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 100))
+# Por defecto 2 × CPUs + 1, sin pasar del límite de conexiones
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', max(min(_cpus() * 2 + 1, DB_MAX_CONNECTIONS // POOL_MAX), 1)))
+# Hilos por worker; con más de uno se usa el worker gthread
+WEB_THREADS = int(os.getenv('WEB_THREADS', 4))
+# Peticiones tras las que se recicla un worker (0 = nunca), con un margen aleatorio
+WEB_MAX_REQUESTS = int(os.getenv('WEB_MAX_REQUESTS', 1000))
+WEB_MAX_REQUESTS_JITTER = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 100))
+# Segundos sin respuesta tras los que el maestro reinicia un worker
+WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', 120))
+
+
+def post_fork(server, worker):
+    # Nada de lo abierto antes del fork se comparte con el worker
+    reiniciarPool()
+    reset_auth_cache()
+    # Los hilos de ingest no pasan el fork: cada worker reanuda lo pendiente
+    ingest.resume()
+
+
+def worker_exit(server, worker):
+    cerrarPool()
+
+
+def child_exit(server, worker):
+    metrics.proceso_terminado(worker.pid)
+
+
+def options(host, port):
+    """Configuración de gunicorn a partir de las variables WEB_*"""
+    if WEB_WORKERS * POOL_MAX > DB_MAX_CONNECTIONS:
+        print(f"Aviso: {WEB_WORKERS} workers x DB_POOL_MAX={POOL_MAX} conexiones superan "
+              f"DB_MAX_CONNECTIONS={DB_MAX_CONNECTIONS}")
+    return {
+        'bind': f"{host}:{port}",
+        'workers': WEB_WORKERS,
+        'threads': WEB_THREADS,
+        'worker_class': 'gthread' if WEB_THREADS > 1 else 'sync',
+        'max_requests': WEB_MAX_REQUESTS,
+        'max_requests_jitter': WEB_MAX_REQUESTS_JITTER,
+        'timeout': WEB_TIMEOUT,
+        'preload_app': True,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+        'child_exit': child_exit,
+    }
+
+
+def run(application, host, port):
+    """Sirve la aplicación WSGI con gunicorn hasta que se pare el maestro"""
+    from gunicorn.app.base import BaseApplication
+
+    class _Servidor(BaseApplication):
+
+        def load_config(self):
+            for clave, valor in options(host, port).items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            return application
+
+    _Servidor().run()
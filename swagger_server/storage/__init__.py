@@ -0,0 +1,46 @@
+# coding: utf-8
+
+# flake8: noqa
+from __future__ import absolute_import
+import os
+
+from swagger_server.storage.spool import TrackSpool, TrackTooLargeError, TRACK_MAX_SIZE
+from swagger_server.storage.base import StorageBackend
+from swagger_server.storage.postgres import CopyBinaryReader, ByteaStorage, ChunkedStorage
+from swagger_server.storage.dedup import ContentAddressedStorage, DedupByteaStorage
+from swagger_server.storage.filesystem import FilesystemStorage
+from swagger_server.storage.aio import AsyncByteaStorage
+
+# Backend del audio: 'bytea' (tracks.track), 'chunks' (track_chunks),
+# 'dedup' (blobs deduplicados en Postgres) o 'fs' (ficheros por SHA-256)
+TRACK_STORAGE = os.getenv('TRACK_STORAGE', 'bytea')
+
+_STORAGES = {
+    'bytea': ByteaStorage,
+    'chunks': ChunkedStorage,
+    'dedup': DedupByteaStorage,
+    'fs': FilesystemStorage,
+}
+
+_storage = None
+_async_storage = None
+
+
+def get_storage() -> StorageBackend:
+    """Devuelve el backend configurado en TRACK_STORAGE"""
+    global _storage
+    if _storage is None:
+        if TRACK_STORAGE not in _STORAGES:
+            raise ValueError(f"Unknown TRACK_STORAGE '{TRACK_STORAGE}'")
+        _storage = _STORAGES[TRACK_STORAGE]()
+    return _storage
+
+
+def get_async_storage() -> AsyncByteaStorage:
+    """Devuelve el backend de los controladores asíncronos (solo 'bytea' por ahora)"""
+    global _async_storage
+    if _async_storage is None:
+        if TRACK_STORAGE != 'bytea':
+            raise ValueError(f"TRACK_STORAGE '{TRACK_STORAGE}' is not supported in async mode")
+        _async_storage = AsyncByteaStorage()
+    return _async_storage
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Aplica las columnas de metadatos de tracks y el esquema que necesita el
+backend configurado en TRACK_STORAGE.
+
+Uso:
+    TRACK_STORAGE=fs python -m swagger_server.storage
+"""
+import sys
+
+from swagger_server.controllers.dbconx.tempName import dbConectar, dbDesconectar
+from swagger_server.storage import TRACK_STORAGE, get_storage
+from swagger_server.storage.metadata import METADATA_SCHEMA
+
+
+def main():
+    store = get_storage()
+    conexion = dbConectar()
+    if not conexion:
+        print("Database connection failed")
+        return 1
+    try:
+        with conexion.cursor() as cur:
+            cur.execute(METADATA_SCHEMA)
+            if store.schema:
+                cur.execute(store.schema)
+        conexion.commit()
+        print(f"Esquema del backend '{TRACK_STORAGE}' aplicado")
+        return 0
+    finally:
+        dbDesconectar(conexion)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# coding: utf-8
+"""
+Versión asíncrona (psycopg 3) del backend BYTEA y de los metadatos de tracks,
+para los controladores del modo aiohttp. Mismas consultas que ByteaStorage y
+metadata, con await en cada ida y vuelta a Postgres.
+"""
+import asyncio
+
+from swagger_server.audio_util import seek_lookup
+from swagger_server.storage.metadata import (
+    INFO_COLUMNS, INFO_SQL, LIST_COLUMNS, LIST_SQL, PEAKS_SQL, SAVE_INFO_SQL, SEEK_INDEX_SQL, SNAPSHOT_SQL)
+from swagger_server.storage.postgres import AUDIO_CHUNK_SIZE, CopyBinaryReader
+from swagger_server.storage.spool import UPLOAD_CHUNK_SIZE
+
+
+class AsyncByteaStorage(object):
+    """Audio en la columna tracks.track (BYTEA)."""
+
+    async def insert(self, conexion, spool):
+        async with conexion.cursor() as cur:
+            await self._copy_upload(cur, spool)
+            await cur.execute("INSERT INTO tracks (track) SELECT track FROM track_upload RETURNING idtrack")
+            return (await cur.fetchone())[0]
+
+    async def update(self, conexion, track_id, spool):
+        async with conexion.cursor() as cur:
+            await cur.execute("SELECT 1 FROM tracks WHERE idtrack = %s FOR UPDATE", [track_id])
+            if await cur.fetchone() is None:
+                return False
+            await self._copy_upload(cur, spool)
+            await cur.execute("UPDATE tracks SET track = u.track FROM track_upload u WHERE idtrack = %s",
+                              [track_id])
+            return True
+
+    async def delete(self, conexion, track_id):
+        async with conexion.cursor() as cur:
+            await cur.execute("DELETE FROM tracks WHERE idtrack = %s;", [track_id])
+            return cur.rowcount > 0
+
+    async def size(self, conexion, track_id):
+        async with conexion.cursor() as cur:
+            await cur.execute("SELECT coalesce(octet_length(track), 0) FROM tracks WHERE idtrack = %s",
+                              [track_id])
+            row = await cur.fetchone()
+        return row[0] if row else None
+
+    async def read(self, conexion, track_id, start=0, end=None):
+        if end is None:
+            end = (await self.size(conexion, track_id) or 0) - 1
+        offset = start
+        while offset <= end:
+            length = min(AUDIO_CHUNK_SIZE, end - offset + 1)
+            async with conexion.cursor() as cur:
+                # substring en bytea es 1-based
+                await cur.execute("SELECT substring(track from %s for %s) FROM tracks WHERE idtrack = %s",
+                                  [offset + 1, length, track_id])
+                row = await cur.fetchone()
+            if not row or not row[0]:
+                return
+            yield bytes(row[0])
+            offset += length
+
+    async def read_many(self, conexion, track_ids):
+        # Una sola consulta; el cursor de servidor trae las filas de una en una
+        async with conexion.cursor(name='track_read_many') as cur:
+            cur.itersize = 1
+            await cur.execute("SELECT idtrack, track FROM tracks WHERE idtrack = ANY(%s) ORDER BY idtrack",
+                              [list(track_ids)])
+            async for track_id, track in cur:
+                yield track_id, [bytes(track)] if track is not None else []
+
+    @staticmethod
+    async def _copy_upload(cur, spool):
+        # COPY no admite RETURNING: se pasa por una tabla temporal de la sesión
+        await cur.execute("CREATE TEMP TABLE IF NOT EXISTS track_upload (track bytea) ON COMMIT DELETE ROWS")
+        lector = CopyBinaryReader([(spool,)])
+        loop = asyncio.get_running_loop()
+        async with cur.copy("COPY track_upload (track) FROM STDIN (FORMAT binary)") as copy:
+            while True:
+                # El spool puede estar en disco: se lee en un hilo para no bloquear el loop
+                pieza = await loop.run_in_executor(None, lector.read, UPLOAD_CHUNK_SIZE)
+                if not pieza:
+                    break
+                await copy.write(pieza)
+
+
+async def touch(conexion, track_id):
+    """Marca la pista como modificada: nueva versión y nueva fecha"""
+    async with conexion.cursor() as cur:
+        await cur.execute("UPDATE tracks SET version = version + 1, updated_at = now() WHERE idtrack = %s",
+                          [track_id])
+
+
+async def snapshot(conexion):
+    """Lee el resto de la transacción de una sola instantánea (metadata.snapshot)"""
+    async with conexion.cursor() as cur:
+        await cur.execute(SNAPSHOT_SQL)
+
+
+async def validators(conexion, track_id):
+    """(version, updated_at) de la pista sin tocar el audio. None si no existe."""
+    async with conexion.cursor() as cur:
+        await cur.execute("SELECT version, updated_at FROM tracks WHERE idtrack = %s", [track_id])
+        return await cur.fetchone()
+
+
+async def save_info(conexion, track_id, info):
+    """Guarda los metadatos del audio de la pista (dict de TrackSpool.audio_info)"""
+    async with conexion.cursor() as cur:
+        await cur.execute(SAVE_INFO_SQL, dict(info, idtrack=track_id))
+
+
+async def info(conexion, track_id):
+    """Validadores y metadatos de la pista sin tocar el audio, como dict. None si no existe."""
+    async with conexion.cursor() as cur:
+        await cur.execute(INFO_SQL, [track_id])
+        row = await cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(('version', 'updated_at') + INFO_COLUMNS, row))
+
+
+async def list_tracks(conexion, after_id, limit):
+    """Hasta limit pistas con idtrack > after_id, en orden, como dicts de LIST_COLUMNS"""
+    async with conexion.cursor() as cur:
+        await cur.execute(LIST_SQL, [after_id, limit])
+        return [dict(zip(LIST_COLUMNS, row)) for row in await cur.fetchall()]
+
+
+async def seek_point(conexion, track_id, ms):
+    """(ms, offset) del último punto del índice de búsqueda en ms o antes. None si no hay índice."""
+    async with conexion.cursor() as cur:
+        await cur.execute(SEEK_INDEX_SQL, [track_id])
+        row = await cur.fetchone()
+    if not row or row[0] is None:
+        return None
+    return seek_lookup(bytes(row[0]), ms)
+
+
+async def peaks(conexion, track_id):
+    """(version, updated_at, picos en bytes o None) de la pista. None si no existe."""
+    async with conexion.cursor() as cur:
+        await cur.execute(PEAKS_SQL, [track_id])
+        row = await cur.fetchone()
+    if row is None:
+        return None
+    return row[0], row[1], bytes(row[2]) if row[2] is not None else None
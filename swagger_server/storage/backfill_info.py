@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Rellena los metadatos del audio (size_bytes, mime, duration_ms, bitrate,
+sample_rate), el índice de búsqueda por tiempo (seek_index) y los picos de
+la forma de onda (peaks) de las pistas subidas antes de que se guardaran al
+subir.
+
+Uso:
+    python -m swagger_server.storage.backfill_info [--limit N] [--all]
+
+Lee cada pista por trozos del backend configurado en TRACK_STORAGE, sin
+cargarla entera en memoria, y la guarda en su propia transacción. Se puede
+interrumpir y volver a lanzar: solo procesa las filas sin size_bytes, o
+todas con --all (p. ej. para crear seek_index y peaks en las que ya tenían
+metadatos).
+"""
+import argparse
+import sys
+
+from swagger_server import peaks
+from swagger_server.audio_util import AudioSniffer
+from swagger_server.controllers.dbconx.tempName import dbConectar, dbDesconectar
+from swagger_server.storage import get_storage
+from swagger_server.storage.metadata import METADATA_SCHEMA, save_info
+
+
+def rellenar(limit=None, todas=False):
+    store = get_storage()
+    conexion = dbConectar()
+    if not conexion:
+        print("Database connection failed")
+        return 1
+
+    try:
+        with conexion.cursor() as cur:
+            cur.execute(METADATA_SCHEMA)
+        conexion.commit()
+
+        with conexion.cursor() as cur:
+            query = "SELECT idtrack FROM tracks %sORDER BY idtrack" % ('' if todas else "WHERE size_bytes IS NULL ")
+            if limit:
+                query += " LIMIT %d" % limit
+            cur.execute(query)
+            pendientes = [row[0] for row in cur]
+        conexion.rollback()
+
+        print(f"Tracks sin metadatos: {len(pendientes)}")
+        for i, track_id in enumerate(pendientes, 1):
+            try:
+                sniffer, picos = AudioSniffer(), peaks.PeaksIndexer()
+                for chunk in store.read(conexion, track_id):
+                    sniffer.feed(chunk)
+                    picos.feed(chunk)
+                info = sniffer.info()
+                save_info(conexion, track_id, dict(info, seek_index=sniffer.seek_index(), peaks=picos.result()))
+                conexion.commit()
+                print(f"[{i}/{len(pendientes)}] track {track_id}: {info['mime']}, {info['duration_ms']} ms")
+            except Exception as e:
+                conexion.rollback()
+                print(f"[{i}/{len(pendientes)}] Error al leer track {track_id}: {e}")
+        return 0
+    finally:
+        dbDesconectar(conexion)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rellena los metadatos del audio de las pistas antiguas")
+    parser.add_argument('--limit', type=int, default=None, help="Máximo de pistas a procesar")
+    parser.add_argument('--all', action='store_true', help="Procesar también las pistas con metadatos")
+    args = parser.parse_args(argv)
+    return rellenar(args.limit, args.all)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# coding: utf-8
+
+
+class StorageBackend(object):
+    """
+    Interfaz de almacenamiento del audio de las pistas.
+    Todas las operaciones reciben la conexión del pool: la fila de tracks
+    (metadatos) vive siempre en Postgres aunque los bytes estén en otro sitio.
+    El controlador confirma o deshace con commit()/rollback() del backend para
+    que este pueda aplicar sus efectos fuera de la base de datos.
+    """
+
+    # DDL que necesita el backend (idempotente)
+    schema = ''
+
+    def insert(self, conexion, spool):
+        """Guarda una pista nueva a partir de un TrackSpool.
+
+        :return: idtrack generado.
+        """
+        raise NotImplementedError()
+
+    def insert_many(self, conexion, spools):
+        """Guarda varias pistas en la transacción actual.
+
+        :return: idtrack generados, en el orden de spools.
+        """
+        return [self.insert(conexion, spool) for spool in spools]
+
+    def update(self, conexion, track_id, spool):
+        """Sustituye el audio de una pista.
+
+        :return: False si la pista no existe.
+        """
+        raise NotImplementedError()
+
+    def delete(self, conexion, track_id):
+        """Borra una pista.
+
+        :return: False si la pista no existe.
+        """
+        raise NotImplementedError()
+
+    def size(self, conexion, track_id):
+        """Tamaño en bytes del audio, sin leerlo. None si la pista no existe."""
+        raise NotImplementedError()
+
+    def read(self, conexion, track_id, start=0, end=None):
+        """Genera el audio entre start y end (inclusive), leyendo solo ese rango."""
+        raise NotImplementedError()
+
+    def read_many(self, conexion, track_ids):
+        """Genera (idtrack, trozos) de las pistas de track_ids que existen.
+
+        Los trozos de cada pista se deben consumir antes de pedir la siguiente.
+        """
+        with conexion.cursor() as cur:
+            cur.execute("SELECT idtrack FROM tracks WHERE idtrack = ANY(%s) ORDER BY idtrack",
+                        [list(track_ids)])
+            existentes = [row[0] for row in cur]
+        for track_id in existentes:
+            yield track_id, self.read(conexion, track_id)
+
+    def open_file(self, conexion, track_id):
+        """Fichero abierto con el audio, para servirlo con sendfile. None si no aplica."""
+        return None
+
+    def commit(self, conexion):
+        conexion.commit()
+
+    def rollback(self, conexion):
+        conexion.rollback()
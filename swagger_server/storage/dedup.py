@@ -0,0 +1,166 @@
+# coding: utf-8
+
+from swagger_server.storage.base import StorageBackend
+from swagger_server.storage.postgres import AUDIO_CHUNK_SIZE, ByteaStorage, CopyBinaryReader
+
+# Blobs compartidos entre pistas con el mismo contenido (idempotente)
+BLOBS_SCHEMA = """
+ALTER TABLE tracks ALTER COLUMN track DROP NOT NULL;
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS blob_sha256 char(64);
+CREATE INDEX IF NOT EXISTS tracks_blob_sha256_idx ON tracks (blob_sha256);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 char(64) PRIMARY KEY,
+    size bigint NOT NULL,
+    refcount bigint NOT NULL CHECK (refcount >= 0),
+    data bytea
+);
+ALTER TABLE blobs ALTER COLUMN data SET STORAGE EXTERNAL;
+"""
+
+
+class ContentAddressedStorage(ByteaStorage):
+    """
+    Base de los backends deduplicados por SHA-256.
+    tracks.blob_sha256 apunta a una fila de blobs con su tamaño y el número de
+    pistas que la referencian; subir un contenido que ya existe solo incrementa
+    refcount, y los bytes se liberan cuando se va la última referencia.
+    Cada hash se protege con un advisory lock durante la transacción.
+    Las filas sin blob_sha256 siguen en la columna BYTEA.
+
+    Las subclases guardan los bytes: _write_blob, _delete_blob y _read_blob.
+    """
+
+    schema = BLOBS_SCHEMA
+
+    # Los bytes no están en tracks: lectura e inserción genéricas por pista
+    read_many = StorageBackend.read_many
+    insert_many = StorageBackend.insert_many
+
+    def insert(self, conexion, spool):
+        sha256 = self._acquire(conexion, spool)
+        with conexion.cursor() as cur:
+            cur.execute("INSERT INTO tracks (track, blob_sha256) VALUES (NULL, %s) RETURNING idtrack",
+                        [sha256])
+            return cur.fetchone()[0]
+
+    def update(self, conexion, track_id, spool):
+        with conexion.cursor() as cur:
+            cur.execute("SELECT blob_sha256 FROM tracks WHERE idtrack = %s FOR UPDATE", [track_id])
+            row = cur.fetchone()
+            if row is None:
+                return False
+            # Primero se referencia el nuevo: si el contenido no cambia, el blob no se libera
+            sha256 = self._acquire(conexion, spool)
+            cur.execute("UPDATE tracks SET track = NULL, blob_sha256 = %s WHERE idtrack = %s",
+                        [sha256, track_id])
+        if row[0]:
+            self._release(conexion, row[0])
+        return True
+
+    def delete(self, conexion, track_id):
+        with conexion.cursor() as cur:
+            cur.execute("DELETE FROM tracks WHERE idtrack = %s RETURNING blob_sha256", [track_id])
+            row = cur.fetchone()
+        if row is None:
+            return False
+        if row[0]:
+            self._release(conexion, row[0])
+        return True
+
+    def size(self, conexion, track_id):
+        with conexion.cursor() as cur:
+            cur.execute("""
+                SELECT coalesce(b.size, octet_length(t.track), 0)
+                FROM tracks t LEFT JOIN blobs b ON b.sha256 = t.blob_sha256
+                WHERE t.idtrack = %s""", [track_id])
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def read(self, conexion, track_id, start=0, end=None):
+        sha256 = self._lookup(conexion, track_id)
+        if sha256 is None:
+            return
+        if not sha256:
+            yield from super().read(conexion, track_id, start, end)
+            return
+        yield from self._read_blob(conexion, sha256, start, end)
+
+    def _lookup(self, conexion, track_id):
+        """blob_sha256 de la pista, '' si está en BYTEA, None si no existe"""
+        with conexion.cursor() as cur:
+            cur.execute("SELECT blob_sha256 FROM tracks WHERE idtrack = %s", [track_id])
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return (row[0] or '').strip()
+
+    @staticmethod
+    def _lock_blob(conexion, sha256):
+        clave = int.from_bytes(bytes.fromhex(sha256[:16]), 'big', signed=True)
+        with conexion.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", [clave])
+
+    def _acquire(self, conexion, spool):
+        """Referencia el blob del contenido del spool, guardándolo si es nuevo"""
+        sha256 = spool.sha256
+        self._lock_blob(conexion, sha256)
+        with conexion.cursor() as cur:
+            cur.execute("UPDATE blobs SET refcount = refcount + 1 WHERE sha256 = %s", [sha256])
+            if cur.rowcount:
+                return sha256
+        self._write_blob(conexion, sha256, spool)
+        return sha256
+
+    def _release(self, conexion, sha256):
+        """Quita una referencia al blob y lo borra si era la última"""
+        self._lock_blob(conexion, sha256)
+        with conexion.cursor() as cur:
+            cur.execute("UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = %s RETURNING refcount",
+                        [sha256])
+            row = cur.fetchone()
+            if row is None or row[0] > 0:
+                return
+            cur.execute("DELETE FROM blobs WHERE sha256 = %s", [sha256])
+        self._delete_blob(conexion, sha256)
+
+    def _write_blob(self, conexion, sha256, spool):
+        """Guarda los bytes y crea la fila de blobs con refcount 1"""
+        raise NotImplementedError()
+
+    def _delete_blob(self, conexion, sha256):
+        """Libera los bytes de un blob cuya fila ya se ha borrado"""
+        raise NotImplementedError()
+
+    def _read_blob(self, conexion, sha256, start, end):
+        raise NotImplementedError()
+
+
+class DedupByteaStorage(ContentAddressedStorage):
+    """Blobs deduplicados guardados en blobs.data (BYTEA)."""
+
+    def _write_blob(self, conexion, sha256, spool):
+        with conexion.cursor() as cur:
+            cur.copy_expert("COPY blobs (sha256, size, refcount, data) FROM STDIN (FORMAT binary)",
+                            CopyBinaryReader([(sha256.encode('ascii'), spool.size, 1, spool)]))
+
+    def _delete_blob(self, conexion, sha256):
+        # Los bytes se van con la fila de blobs
+        pass
+
+    def _read_blob(self, conexion, sha256, start, end):
+        if end is None:
+            with conexion.cursor() as cur:
+                cur.execute("SELECT size FROM blobs WHERE sha256 = %s", [sha256])
+                row = cur.fetchone()
+            end = (row[0] if row else 0) - 1
+        offset = start
+        while offset <= end:
+            length = min(AUDIO_CHUNK_SIZE, end - offset + 1)
+            with conexion.cursor() as cur:
+                cur.execute("SELECT substring(data from %s for %s) FROM blobs WHERE sha256 = %s",
+                            [offset + 1, length, sha256])
+                row = cur.fetchone()
+            if not row or not row[0]:
+                return
+            yield bytes(row[0])
+            offset += length
@@ -0,0 +1,115 @@
+# coding: utf-8
+
+from swagger_server.audio_util import seek_lookup
+
+# Columnas de metadatos de tracks comunes a todos los backends (idempotente)
+METADATA_SCHEMA = """
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS version bigint NOT NULL DEFAULT 1;
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS size_bytes bigint;
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS mime text;
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS duration_ms bigint;
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS bitrate integer;
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS sample_rate integer;
+-- Índice de búsqueda por tiempo: pares (ms, offset) int64 little-endian (audio_util.pack_seek_index)
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS seek_index bytea;
+-- Picos de la forma de onda en varias resoluciones (formato de swagger_server.peaks)
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS peaks bytea;
+-- Las filas anteriores se quedan sin fecha de creación: no se sabe
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS created_at timestamptz;
+ALTER TABLE tracks ALTER COLUMN created_at SET DEFAULT now();
+-- Índice que cubre list_tracks: se responde con un index-only scan, sin leer el audio
+CREATE INDEX IF NOT EXISTS tracks_listing_idx ON tracks (idtrack)
+    INCLUDE (size_bytes, version, created_at, updated_at);
+"""
+
+# Columnas que rellena save_info a partir de TrackSpool.audio_info(), además de seek_index y peaks
+INFO_COLUMNS = ('size_bytes', 'mime', 'duration_ms', 'bitrate', 'sample_rate')
+
+SAVE_INFO_SQL = ("UPDATE tracks SET size_bytes = %(size_bytes)s, mime = %(mime)s, duration_ms = %(duration_ms)s, "
+                 "bitrate = %(bitrate)s, sample_rate = %(sample_rate)s, seek_index = %(seek_index)s, "
+                 "peaks = %(peaks)s WHERE idtrack = %(idtrack)s")
+INFO_SQL = ("SELECT version, updated_at, size_bytes, mime, duration_ms, bitrate, sample_rate "
+            "FROM tracks WHERE idtrack = %s")
+SEEK_INDEX_SQL = "SELECT seek_index FROM tracks WHERE idtrack = %s"
+# Primera sentencia de la transacción: todas las lecturas ven la misma versión de la pista
+SNAPSHOT_SQL = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+PEAKS_SQL = "SELECT version, updated_at, peaks FROM tracks WHERE idtrack = %s"
+
+# Paginación por clave: el coste no depende de lo lejos que esté la página
+LIST_COLUMNS = ('idtrack', 'size_bytes', 'version', 'created_at', 'updated_at')
+LIST_SQL = ("SELECT idtrack, size_bytes, version, created_at, updated_at FROM tracks "
+            "WHERE idtrack > %s ORDER BY idtrack LIMIT %s")
+
+
+def touch(conexion, track_id):
+    """Marca la pista como modificada: nueva versión y nueva fecha"""
+    with conexion.cursor() as cur:
+        cur.execute("UPDATE tracks SET version = version + 1, updated_at = now() WHERE idtrack = %s",
+                    [track_id])
+
+
+def snapshot(conexion):
+    """
+    Lee el resto de la transacción de una sola instantánea. Sin ella validadores,
+    tamaño y audio salen de consultas distintas y una actualización entre medias
+    mezclaría el ETag de una versión con los bytes de otra.
+    """
+    with conexion.cursor() as cur:
+        cur.execute(SNAPSHOT_SQL)
+
+
+def validators(conexion, track_id):
+    """(version, updated_at) de la pista sin tocar el audio. None si no existe."""
+    with conexion.cursor() as cur:
+        cur.execute("SELECT version, updated_at FROM tracks WHERE idtrack = %s", [track_id])
+        return cur.fetchone()
+
+
+def save_info(conexion, track_id, info):
+    """Guarda los metadatos del audio de la pista (dict de TrackSpool.audio_info)"""
+    with conexion.cursor() as cur:
+        cur.execute(SAVE_INFO_SQL, dict(info, idtrack=track_id))
+
+
+def save_info_many(conexion, filas):
+    """save_info de varias pistas: filas es una lista de (track_id, info)"""
+    with conexion.cursor() as cur:
+        cur.executemany(SAVE_INFO_SQL, [dict(info, idtrack=track_id) for track_id, info in filas])
+
+
+def info(conexion, track_id):
+    """Validadores y metadatos de la pista sin tocar el audio, como dict. None si no existe."""
+    with conexion.cursor() as cur:
+        cur.execute(INFO_SQL, [track_id])
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(('version', 'updated_at') + INFO_COLUMNS, row))
+
+
+def list_tracks(conexion, after_id, limit):
+    """Hasta limit pistas con idtrack > after_id, en orden, como dicts de LIST_COLUMNS"""
+    with conexion.cursor() as cur:
+        cur.execute(LIST_SQL, [after_id, limit])
+        return [dict(zip(LIST_COLUMNS, row)) for row in cur]
+
+
+def seek_point(conexion, track_id, ms):
+    """(ms, offset) del último punto del índice de búsqueda en ms o antes. None si no hay índice."""
+    with conexion.cursor() as cur:
+        cur.execute(SEEK_INDEX_SQL, [track_id])
+        row = cur.fetchone()
+    if not row or row[0] is None:
+        return None
+    return seek_lookup(bytes(row[0]), ms)
+
+
+def peaks(conexion, track_id):
+    """(version, updated_at, picos en bytes o None) de la pista. None si no existe."""
+    with conexion.cursor() as cur:
+        cur.execute(PEAKS_SQL, [track_id])
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return row[0], row[1], bytes(row[2]) if row[2] is not None else None
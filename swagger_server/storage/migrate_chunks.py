@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Migra las pistas guardadas en tracks.track (BYTEA) a track_chunks.
+
+Uso:
+    python -m swagger_server.storage.migrate_chunks [--chunk-size N] [--limit N]
+
+Crea el esquema si no existe y convierte cada pista en su propia transacción.
+El BYTEA se lee una sola vez con COPY TO a un fichero temporal y se parte en
+trozos desde ahí: con substring cada trozo descomprimía el valor entero
+(TOAST), así que migrar una pista costaba O(n²) en su tamaño.
+Se puede interrumpir y volver a lanzar: solo procesa las filas sin chunk_size.
+"""
+import argparse
+import struct
+import sys
+import tempfile
+
+from swagger_server.controllers.dbconx.tempName import dbConectar, dbDesconectar
+from swagger_server.storage.postgres import (
+    CHUNKS_SCHEMA, COPY_SIGNATURE, TRACK_CHUNK_SIZE, ChunkedStorage, chunk_digest)
+from swagger_server.storage.spool import UPLOAD_SPOOL_MEMORY
+
+# Cabecera de COPY binary (firma, flags y extensión) y de la primera fila (campos y longitud)
+_COPY_PRIMER_CAMPO = len(COPY_SIGNATURE) + 8 + 2 + 4
+
+
+def _volcar(lectura, track_id):
+    """
+    Copia el BYTEA de la pista a un fichero temporal con un solo COPY TO.
+    Devuelve el fichero, colocado al principio del audio, y su longitud.
+    """
+    fichero = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY)
+    try:
+        with lectura.cursor() as cur:
+            query = cur.mogrify("COPY (SELECT track FROM tracks WHERE idtrack = %s) TO STDOUT (FORMAT binary)",
+                                [track_id])
+            cur.copy_expert(query.decode(), fichero)
+        fichero.seek(0)
+        cabecera = fichero.read(_COPY_PRIMER_CAMPO)
+    except Exception:
+        fichero.close()
+        raise
+    if len(cabecera) < _COPY_PRIMER_CAMPO:
+        # Sin fila: solo la cabecera y el final (-1)
+        return fichero, 0
+    _, longitud = struct.unpack('!hi', cabecera[-6:])
+    # -1 es NULL
+    return fichero, max(longitud, 0)
+
+
+def _leer_trozos(fichero, longitud, track_id, chunk_size):
+    """Genera las filas de track_chunks a partir del BYTEA volcado por _volcar"""
+    seq = 0
+    while longitud > 0:
+        chunk = fichero.read(min(chunk_size, longitud))
+        if not chunk:
+            return
+        longitud -= len(chunk)
+        yield track_id, seq, chunk, chunk_digest(chunk)
+        seq += 1
+
+
+def migrar(chunk_size=TRACK_CHUNK_SIZE, limit=None):
+    escritura = lectura = None
+    try:
+        # COPY ocupa la conexión de escritura: el BYTEA se lee por otra
+        escritura = dbConectar()
+        lectura = dbConectar()
+        if not escritura or not lectura:
+            print("Database connection failed")
+            return 1
+
+        with escritura.cursor() as cur:
+            cur.execute(CHUNKS_SCHEMA)
+        escritura.commit()
+
+        with lectura.cursor() as cur:
+            query = "SELECT idtrack FROM tracks WHERE chunk_size IS NULL AND track IS NOT NULL ORDER BY idtrack"
+            if limit:
+                query += " LIMIT %d" % limit
+            cur.execute(query)
+            pendientes = [row[0] for row in cur]
+        lectura.rollback()
+
+        print(f"Tracks a migrar: {len(pendientes)} (chunk_size={chunk_size})")
+        for i, track_id in enumerate(pendientes, 1):
+            try:
+                with escritura.cursor() as cur:
+                    cur.execute("SELECT 1 FROM tracks WHERE idtrack = %s AND chunk_size IS NULL FOR UPDATE",
+                                [track_id])
+                    if cur.fetchone() is None:
+                        escritura.rollback()
+                        continue
+                    cur.execute("DELETE FROM track_chunks WHERE idtrack = %s", [track_id])
+                    fichero, longitud = _volcar(lectura, track_id)
+                    with fichero:
+                        ChunkedStorage._copy_chunks(cur, track_id,
+                                                    _leer_trozos(fichero, longitud, track_id, chunk_size))
+                    cur.execute("UPDATE tracks SET track = NULL, chunk_size = %s WHERE idtrack = %s",
+                                [chunk_size, track_id])
+                escritura.commit()
+                lectura.rollback()
+                print(f"[{i}/{len(pendientes)}] track {track_id} migrado")
+            except Exception as e:
+                escritura.rollback()
+                lectura.rollback()
+                print(f"[{i}/{len(pendientes)}] Error al migrar track {track_id}: {e}")
+        return 0
+    finally:
+        if lectura is not None:
+            dbDesconectar(lectura)
+        if escritura is not None:
+            dbDesconectar(escritura)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra tracks.track (BYTEA) a track_chunks")
+    parser.add_argument('--chunk-size', type=int, default=TRACK_CHUNK_SIZE)
+    parser.add_argument('--limit', type=int, default=None, help="Máximo de pistas a migrar")
+    args = parser.parse_args(argv)
+    return migrar(args.chunk_size, args.limit)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+# coding: utf-8
+
+import hashlib
+import os
+import struct
+
+from swagger_server.storage.base import StorageBackend
+from swagger_server.storage.spool import TrackSpool
+
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+
+# Tamaño de cada lectura parcial al servir rangos de audio
+AUDIO_CHUNK_SIZE = int(os.getenv('AUDIO_CHUNK_SIZE', 256 * 1024))
+# Tamaño de los trozos de track_chunks para las pistas nuevas
+TRACK_CHUNK_SIZE = int(os.getenv('TRACK_CHUNK_SIZE', 256 * 1024))
+
+# Esquema del almacenamiento por trozos (idempotente)
+CHUNKS_SCHEMA = """
+ALTER TABLE tracks ALTER COLUMN track DROP NOT NULL;
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS chunk_size integer;
+CREATE TABLE IF NOT EXISTS track_chunks (
+    idtrack bigint NOT NULL REFERENCES tracks (idtrack) ON DELETE CASCADE,
+    seq bigint NOT NULL,
+    data bytea NOT NULL,
+    digest bytea NOT NULL,
+    PRIMARY KEY (idtrack, seq)
+);
+ALTER TABLE track_chunks ALTER COLUMN data SET STORAGE EXTERNAL;
+"""
+
+
+class CopyBinaryReader(object):
+    """
+    Fichero de solo lectura que genera filas en formato COPY binary para
+    cur.copy_expert. Los campos pueden ser int (bigint), bytes (bytea),
+    TrackSpool (bytea leído por trozos) o None (NULL).
+    """
+
+    def __init__(self, rows):
+        self._piezas = self._generar(rows)
+        self._buffer = memoryview(b'')
+
+    @staticmethod
+    def _generar(rows):
+        yield COPY_SIGNATURE + struct.pack('!ii', 0, 0)
+        for row in rows:
+            yield struct.pack('!h', len(row))
+            for campo in row:
+                if campo is None:
+                    yield struct.pack('!i', -1)
+                elif isinstance(campo, int):
+                    yield struct.pack('!iq', 8, campo)
+                elif isinstance(campo, TrackSpool):
+                    yield struct.pack('!i', campo.size)
+                    yield from campo.chunks()
+                else:
+                    yield struct.pack('!i', len(campo))
+                    yield bytes(campo)
+        yield struct.pack('!h', -1)
+
+    def read(self, size=-1):
+        while not self._buffer:
+            pieza = next(self._piezas, None)
+            if pieza is None:
+                return b''
+            self._buffer = memoryview(pieza)
+        if size is None or size < 0:
+            size = len(self._buffer)
+        pieza, self._buffer = self._buffer[:size], self._buffer[size:]
+        return pieza.tobytes()
+
+
+def chunk_digest(data):
+    """Huella de un trozo, para reescribir solo los trozos que cambian"""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class ByteaStorage(StorageBackend):
+    """Audio en la columna tracks.track (BYTEA), el esquema original."""
+
+    def insert(self, conexion, spool):
+        """Inserta una pista enviando los bytes por COPY, sin cargarlos en memoria."""
+        with conexion.cursor() as cur:
+            self._copy_upload(cur, spool)
+            cur.execute("INSERT INTO tracks (track) SELECT track FROM track_upload RETURNING idtrack")
+            return cur.fetchone()[0]
+
+    def insert_many(self, conexion, spools):
+        """Inserta un lote de pistas con un solo COPY y un solo INSERT."""
+        with conexion.cursor() as cur:
+            # Los idtrack se reservan antes, uno por spool y en su orden: RETURNING no
+            # dice a qué fila del SELECT corresponde cada id
+            cur.execute("SELECT nextval(pg_get_serial_sequence('tracks', 'idtrack')) "
+                        "FROM generate_series(1, %s)", [len(spools)])
+            track_ids = [row[0] for row in cur]
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS track_bulk_upload (idtrack bigint, track bytea) "
+                        "ON COMMIT DELETE ROWS")
+            cur.copy_expert("COPY track_bulk_upload (idtrack, track) FROM STDIN (FORMAT binary)",
+                            CopyBinaryReader(zip(track_ids, spools)))
+            cur.execute("INSERT INTO tracks (idtrack, track) OVERRIDING SYSTEM VALUE "
+                        "SELECT idtrack, track FROM track_bulk_upload")
+            return track_ids
+
+    def update(self, conexion, track_id, spool):
+        with conexion.cursor() as cur:
+            cur.execute("SELECT 1 FROM tracks WHERE idtrack = %s FOR UPDATE", [track_id])
+            if cur.fetchone() is None:
+                return False
+            self._copy_upload(cur, spool)
+            cur.execute("UPDATE tracks SET track = u.track FROM track_upload u WHERE idtrack = %s",
+                        [track_id])
+            return True
+
+    def delete(self, conexion, track_id):
+        with conexion.cursor() as cur:
+            cur.execute("DELETE FROM tracks WHERE idtrack = %s;", [track_id])
+            return cur.rowcount > 0
+
+    def size(self, conexion, track_id):
+        with conexion.cursor() as cur:
+            cur.execute("SELECT coalesce(octet_length(track), 0) FROM tracks WHERE idtrack = %s",
+                        [track_id])
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def read(self, conexion, track_id, start=0, end=None):
+        if start == 0 and end is None:
+            with conexion.cursor() as cur:
+                cur.execute("SELECT track FROM tracks WHERE idtrack = %s", [track_id])
+                row = cur.fetchone()
+            if row and row[0] is not None:
+                yield bytes(row[0])
+            return
+
+        if end is None:
+            end = (self.size(conexion, track_id) or 0) - 1
+        offset = start
+        while offset <= end:
+            length = min(AUDIO_CHUNK_SIZE, end - offset + 1)
+            with conexion.cursor() as cur:
+                # substring en bytea es 1-based
+                cur.execute("SELECT substring(track from %s for %s) FROM tracks WHERE idtrack = %s",
+                            [offset + 1, length, track_id])
+                row = cur.fetchone()
+            if not row or not row[0]:
+                return
+            yield bytes(row[0])
+            offset += length
+
+    def read_many(self, conexion, track_ids):
+        # Una sola consulta; el cursor de servidor trae las filas de una en una
+        cur = conexion.cursor(name='track_read_many')
+        cur.itersize = 1
+        try:
+            cur.execute("SELECT idtrack, track FROM tracks WHERE idtrack = ANY(%s) ORDER BY idtrack",
+                        [list(track_ids)])
+            for track_id, track in cur:
+                yield track_id, [bytes(track)] if track is not None else []
+        finally:
+            cur.close()
+
+    @staticmethod
+    def _copy_upload(cur, spool):
+        # COPY no admite RETURNING: se pasa por una tabla temporal de la sesión
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS track_upload (track bytea) ON COMMIT DELETE ROWS")
+        cur.copy_expert("COPY track_upload (track) FROM STDIN (FORMAT binary)",
+                        CopyBinaryReader([(spool,)]))
+
+
+class ChunkedStorage(ByteaStorage):
+    """
+    Audio repartido en trozos de tamaño fijo en track_chunks(idtrack, seq, data).
+    tracks.chunk_size indica el tamaño de trozo de cada pista; las filas con
+    chunk_size NULL siguen en la columna BYTEA y se leen como en ByteaStorage.
+    """
+
+    schema = CHUNKS_SCHEMA
+
+    # Las filas pueden estar en track_chunks o en BYTEA: lectura genérica por pista
+    read_many = StorageBackend.read_many
+
+    def __init__(self, chunk_size=TRACK_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def insert(self, conexion, spool):
+        with conexion.cursor() as cur:
+            cur.execute("INSERT INTO tracks (track, chunk_size) VALUES (NULL, %s) RETURNING idtrack",
+                        [self.chunk_size])
+            track_id = cur.fetchone()[0]
+            self._copy_chunks(cur, track_id, self._rows(track_id, spool))
+            return track_id
+
+    def insert_many(self, conexion, spools):
+        """Crea las filas de tracks en un INSERT y todos los trozos en un solo COPY."""
+        with conexion.cursor() as cur:
+            cur.execute("INSERT INTO tracks (track, chunk_size) "
+                        "SELECT NULL, %s FROM generate_series(1, %s) RETURNING idtrack",
+                        [self.chunk_size, len(spools)])
+            track_ids = sorted(row[0] for row in cur)
+            self._copy_chunks(cur, None, (
+                row for track_id, spool in zip(track_ids, spools) for row in self._rows(track_id, spool)))
+            return track_ids
+
+    def update(self, conexion, track_id, spool):
+        """Reescribe solo los trozos cuyo contenido ha cambiado."""
+        with conexion.cursor() as cur:
+            cur.execute("SELECT chunk_size FROM tracks WHERE idtrack = %s FOR UPDATE", [track_id])
+            row = cur.fetchone()
+            if row is None:
+                return False
+
+            if row[0] == self.chunk_size:
+                cur.execute("SELECT seq, digest FROM track_chunks WHERE idtrack = %s", [track_id])
+                existentes = {seq: bytes(digest) for seq, digest in cur}
+            else:
+                # BYTEA u otro tamaño de trozo: se reescribe entera
+                cur.execute("DELETE FROM track_chunks WHERE idtrack = %s", [track_id])
+                cur.execute("UPDATE tracks SET track = NULL, chunk_size = %s WHERE idtrack = %s",
+                            [self.chunk_size, track_id])
+                existentes = {}
+
+            digests = [chunk_digest(chunk) for chunk in spool.chunks(self.chunk_size)]
+            cambiados = [seq for seq, digest in enumerate(digests) if existentes.get(seq) != digest]
+
+            cur.execute("DELETE FROM track_chunks WHERE idtrack = %s AND (seq >= %s OR seq = ANY(%s))",
+                        [track_id, len(digests), cambiados])
+            if cambiados:
+                seleccion = set(cambiados)
+                self._copy_chunks(cur, track_id, (
+                    (track_id, seq, chunk, digests[seq])
+                    for seq, chunk in enumerate(spool.chunks(self.chunk_size)) if seq in seleccion))
+            return True
+
+    def size(self, conexion, track_id):
+        with conexion.cursor() as cur:
+            cur.execute("""
+                SELECT CASE WHEN t.chunk_size IS NULL THEN coalesce(octet_length(t.track), 0)
+                       ELSE (SELECT coalesce(sum(octet_length(c.data)), 0)
+                             FROM track_chunks c WHERE c.idtrack = t.idtrack) END
+                FROM tracks t WHERE t.idtrack = %s""", [track_id])
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def read(self, conexion, track_id, start=0, end=None):
+        with conexion.cursor() as cur:
+            cur.execute("SELECT chunk_size FROM tracks WHERE idtrack = %s", [track_id])
+            row = cur.fetchone()
+        if not row:
+            return
+        chunk_size = row[0]
+        if chunk_size is None:
+            yield from super().read(conexion, track_id, start, end)
+            return
+
+        # Solo se leen los trozos que solapan con [start, end]
+        query = "SELECT seq, data FROM track_chunks WHERE idtrack = %s AND seq >= %s"
+        params = [track_id, start // chunk_size]
+        if end is not None:
+            query += " AND seq <= %s"
+            params.append(end // chunk_size)
+        query += " ORDER BY seq"
+
+        cur = conexion.cursor(name=f"track_read_{track_id}")
+        cur.itersize = max(1, AUDIO_CHUNK_SIZE // chunk_size)
+        try:
+            cur.execute(query, params)
+            for seq, data in cur:
+                inicio = seq * chunk_size
+                desde = max(start - inicio, 0)
+                hasta = len(data) if end is None else min(end - inicio + 1, len(data))
+                yield bytes(data[desde:hasta])
+        finally:
+            cur.close()
+
+    def _rows(self, track_id, spool):
+        for seq, chunk in enumerate(spool.chunks(self.chunk_size)):
+            yield track_id, seq, chunk, chunk_digest(chunk)
+
+    @staticmethod
+    def _copy_chunks(cur, track_id, rows):
+        cur.copy_expert("COPY track_chunks (idtrack, seq, data, digest) FROM STDIN (FORMAT binary)",
+                        CopyBinaryReader(rows))
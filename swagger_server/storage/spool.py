@@ -0,0 +1,127 @@
+# coding: utf-8
+
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+
+from swagger_server import peaks
+from swagger_server.audio_util import AudioSniffer
+
+# Tamaño máximo de una pista subida (bytes decodificados)
+TRACK_MAX_SIZE = int(os.getenv('TRACK_MAX_SIZE', 100 * 1024 * 1024))
+# Tamaño de cada lectura del cuerpo de la petición / del spool
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 64 * 1024))
+# A partir de este tamaño el spool pasa de memoria a disco
+UPLOAD_SPOOL_MEMORY = int(os.getenv('UPLOAD_SPOOL_MEMORY', 1024 * 1024))
+
+_NO_BASE64 = re.compile(r'[^A-Za-z0-9+/=]')
+
+
+class TrackTooLargeError(Exception):
+    """La pista supera TRACK_MAX_SIZE."""
+
+
+class TrackSpool(object):
+    """
+    Copia temporal de una pista subida.
+    Se rellena por trozos y pasa a disco al superar UPLOAD_SPOOL_MEMORY,
+    de modo que la memoria usada no depende del tamaño de la pista.
+    El SHA-256, los metadatos del audio y los picos se calculan mientras se escribe.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = TRACK_MAX_SIZE if max_size is None else max_size
+        self.size = 0
+        self._file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY)
+        self._sha256 = hashlib.sha256()
+        self._sniffer = AudioSniffer()
+        self._peaks = peaks.PeaksIndexer()
+
+    @classmethod
+    def from_stream(cls, stream, max_size=None):
+        """Copia un stream binario (request.stream, fichero multipart...) al spool"""
+        spool = cls(max_size)
+        try:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                spool.write(chunk)
+        except Exception:
+            spool.close()
+            raise
+        return spool
+
+    @classmethod
+    def from_base64(cls, data, max_size=None):
+        """
+        Decodifica un str en base64 al spool por trozos alineados a 4 caracteres.
+        Como base64.b64decode, ignora los caracteres fuera del alfabeto.
+        Lanza binascii.Error si la codificación no es válida.
+        """
+        piezas = (data[i:i + UPLOAD_CHUNK_SIZE] for i in range(0, len(data), UPLOAD_CHUNK_SIZE))
+        return cls._from_base64_pieces(piezas, max_size)
+
+    @classmethod
+    def from_base64_stream(cls, stream, max_size=None):
+        """Como from_base64, leyendo el texto en base64 de un stream binario por trozos"""
+        # latin-1 no falla con ningún byte: lo que no es base64 se ignora igual que en from_base64
+        piezas = iter(lambda: stream.read(UPLOAD_CHUNK_SIZE).decode('latin-1'), '')
+        return cls._from_base64_pieces(piezas, max_size)
+
+    @classmethod
+    def _from_base64_pieces(cls, piezas, max_size):
+        spool = cls(max_size)
+        try:
+            resto = ''
+            for pieza in piezas:
+                pieza = resto + pieza
+                if _NO_BASE64.search(pieza):
+                    pieza = _NO_BASE64.sub('', pieza)
+                corte = len(pieza) - len(pieza) % 4
+                spool.write(binascii.a2b_base64(pieza[:corte]))
+                resto = pieza[corte:]
+            if resto:
+                spool.write(binascii.a2b_base64(resto))
+        except Exception:
+            spool.close()
+            raise
+        return spool
+
+    def write(self, data):
+        if self.size + len(data) > self.max_size:
+            raise TrackTooLargeError(f"Track larger than {self.max_size} bytes")
+        self._file.write(data)
+        self._sha256.update(data)
+        self._sniffer.feed(data)
+        self._peaks.feed(data)
+        self.size += len(data)
+
+    @property
+    def sha256(self):
+        """SHA-256 (hex) de lo escrito hasta ahora"""
+        return self._sha256.hexdigest()
+
+    def audio_info(self):
+        """Metadatos del audio (size_bytes, mime, duration_ms, bitrate, sample_rate), seek_index y peaks"""
+        return dict(self._sniffer.info(), seek_index=self._sniffer.seek_index(), peaks=self._peaks.result())
+
+    def chunks(self, chunk_size=UPLOAD_CHUNK_SIZE):
+        """Recorre el contenido desde el principio en trozos de chunk_size"""
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,16 +1,37 @@
 import logging
+from unittest import mock
 
-import connexion
 from flask_testing import TestCase
 
-from swagger_server.encoder import JSONEncoder
+from swagger_server.app import create_app
 
 
 class BaseTestCase(TestCase):
 
     def create_app(self):
         logging.getLogger('connexion.operation').setLevel('ERROR')
-        app = connexion.App(__name__, specification_dir='../swagger/')
-        app.app.json_encoder = JSONEncoder
-        app.add_api('swagger.yaml')
-        return app.app
+        return create_app().app
+
+
+class MockedTestCase(BaseTestCase):
+    """BaseTestCase without external services: SYU accepts any token,
+    dbConectar returns a mock connection (self.conexion) and
+    storage.get_storage a mock backend (self.store)."""
+
+    def setUp(self):
+        self.conexion = mock.MagicMock()
+        # El cursor de `with conexion.cursor() as cur`
+        self.cursor = self.conexion.cursor.return_value.__enter__.return_value
+        for destino in ('swagger_server.controllers.authorization_controller.is_valid_token',
+                        'swagger_server.controllers.track_controller.is_valid_token'):
+            self.patch(destino, return_value={'id': 1, 'scopes': ['read:tracks', 'write:tracks']})
+        self.patch('swagger_server.controllers.track_controller.dbConectar', return_value=self.conexion)
+        self.patch('swagger_server.controllers.track_controller.dbDesconectar')
+        self.store = self.patch('swagger_server.storage.get_storage').return_value
+        self.client.set_cookie('localhost', 'oversound_auth', 'token')
+
+    def patch(self, destino, **kwargs):
+        """mock.patch(destino, **kwargs) until the end of the test"""
+        parche = mock.patch(destino, **kwargs)
+        self.addCleanup(parche.stop)
+        return parche.start()
@@ -0,0 +1,57 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import unittest
+from unittest import mock
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from swagger_server.controllers.aio import track_controller
+
+
+class TestEnviar(unittest.IsolatedAsyncioTestCase):
+    """aio track_controller._enviar unit tests"""
+
+    def setUp(self):
+        parche = mock.patch.object(track_controller, 'dbDesconectarAsync')
+        self.addCleanup(parche.stop)
+        self.desconectar = parche.start()
+        self.cerradas = []
+
+    async def _piezas(self):
+        try:
+            yield b'abc'
+            yield b'de'
+        finally:
+            self.cerradas.append(True)
+
+    async def test_streams_and_releases(self):
+        request = make_mocked_request('GET', '/track/789/audio')
+        response = await track_controller._enviar(request, 'conexion', self._piezas(), 206,
+                                                  {'Content-Length': '5'})
+        self.assertEqual(response.status, 206)
+        self.assertEqual(b''.join(llamada[0][0] for llamada in request.writer.write.call_args_list), b'abcde')
+        self.desconectar.assert_awaited_once_with('conexion')
+        self.assertEqual(self.cerradas, [True])
+
+    async def test_releases_when_prepare_fails(self):
+        """The connection goes back to the pool even if the body is never iterated"""
+        request = make_mocked_request('GET', '/track/789/audio')
+        with mock.patch.object(web.StreamResponse, 'prepare', side_effect=ConnectionResetError):
+            with self.assertRaises(ConnectionResetError):
+                await track_controller._enviar(request, 'conexion', self._piezas())
+        self.desconectar.assert_awaited_once_with('conexion')
+
+    async def test_releases_when_client_disconnects(self):
+        request = make_mocked_request('GET', '/track/789/audio')
+        with mock.patch.object(web.StreamResponse, 'write', side_effect=ConnectionResetError):
+            with self.assertRaises(ConnectionResetError):
+                await track_controller._enviar(request, 'conexion', self._piezas())
+        self.desconectar.assert_awaited_once_with('conexion')
+        self.assertEqual(self.cerradas, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import io
+import struct
+import unittest
+import wave
+
+from swagger_server import audio_util
+
+# MPEG-1 Layer III, 128 kbps, 44100 Hz, joint stereo: tramas de 417 bytes
+MP3_FRAME = b'\xff\xfb\x90\x44' + b'\x00' * 413
+
+
+def _sniff(data, chunk=1000):
+    sniffer = audio_util.AudioSniffer()
+    for i in range(0, len(data), chunk):
+        sniffer.feed(data[i:i + chunk])
+    return sniffer.info()
+
+
+def _seek_points(data, chunk=1000):
+    indexer = audio_util.SeekIndexer()
+    for i in range(0, len(data), chunk):
+        indexer.feed(data[i:i + chunk])
+    return indexer.points()
+
+
+def _ogg_page(granule, packet):
+    return b'OggS\x00\x02' + struct.pack('<qIII', granule, 1, 0, 0) + bytes([1, len(packet)]) + packet
+
+
+class TestAudioUtil(unittest.TestCase):
+    """audio_util unit tests"""
+
+    def test_parse_range(self):
+        self.assertIsNone(audio_util.parse_range(None, 100))
+        self.assertIsNone(audio_util.parse_range('bytes=0-1,5-6', 100))
+        self.assertEqual(audio_util.parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(audio_util.parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(audio_util.parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(audio_util.parse_range('bytes=50-500', 100), (50, 99))
+        self.assertIsNone(audio_util.parse_range('bytes=10-5', 100))
+
+    def test_parse_range_unsatisfiable(self):
+        with self.assertRaises(ValueError):
+            audio_util.parse_range('bytes=100-', 100)
+        with self.assertRaises(ValueError):
+            audio_util.parse_range('bytes=-0', 100)
+
+    def test_detect_mime(self):
+        self.assertEqual(audio_util.detect_mime(b'ID3\x04\x00'), 'audio/mpeg')
+        self.assertEqual(audio_util.detect_mime(b'\xff\xfb\x90\x00'), 'audio/mpeg')
+        self.assertEqual(audio_util.detect_mime(b'RIFF\x00\x00\x00\x00WAVE'), 'audio/wav')
+        self.assertEqual(audio_util.detect_mime(b'fLaC'), 'audio/flac')
+        self.assertEqual(audio_util.detect_mime(b'OggS'), 'audio/ogg')
+        self.assertEqual(audio_util.detect_mime(b'hello'), 'application/octet-stream')
+
+    def test_sniff_wav(self):
+        fichero = io.BytesIO()
+        with wave.open(fichero, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(b'\x00\x00' * 12000)
+        info = _sniff(fichero.getvalue())
+        self.assertEqual(info, {'size_bytes': len(fichero.getvalue()), 'mime': 'audio/wav',
+                                'duration_ms': 1500, 'bitrate': 128000, 'sample_rate': 8000})
+
+    def test_sniff_mp3_cbr(self):
+        # Etiqueta ID3v2 más grande que SNIFF_HEAD delante de las tramas
+        id3 = b'ID3\x04\x00\x00' + bytes([0, 0x08, 0, 0]) + b'\x00' * 0x20000
+        info = _sniff(id3 + MP3_FRAME * 100 + b'TAG' + b'\x00' * 125)
+        self.assertEqual(info['mime'], 'audio/mpeg')
+        self.assertEqual(info['bitrate'], 128000)
+        self.assertEqual(info['sample_rate'], 44100)
+        self.assertEqual(info['duration_ms'], 2606)
+
+    def test_sniff_mp3_xing(self):
+        xing = bytearray(MP3_FRAME)
+        xing[36:48] = b'Xing' + struct.pack('>II', 1, 1000)
+        info = _sniff(bytes(xing) + MP3_FRAME * 10)
+        self.assertEqual(info['duration_ms'], 26122)
+        self.assertEqual(info['sample_rate'], 44100)
+
+    def test_sniff_flac(self):
+        campos = (44100 << 44) | (1 << 41) | (15 << 36) | 441000
+        streaminfo = b'\x00' * 10 + campos.to_bytes(8, 'big') + b'\x00' * 16
+        info = _sniff(b'fLaC\x80\x00\x00\x22' + streaminfo + b'\x00' * 1000)
+        self.assertEqual((info['mime'], info['duration_ms'], info['sample_rate']), ('audio/flac', 10000, 44100))
+
+    def test_sniff_ogg_vorbis(self):
+        cabecera = b'\x01vorbis' + struct.pack('<IBI', 0, 2, 44100) + b'\x00' * 14
+        data = _ogg_page(0, cabecera) + b'\x00' * 200000 + _ogg_page(88200, b'\x00' * 10)
+        info = _sniff(data, chunk=4096)
+        self.assertEqual((info['mime'], info['duration_ms'], info['sample_rate']), ('audio/ogg', 2000, 44100))
+
+    def test_seek_index_mp3(self):
+        id3 = b'ID3\x04\x00\x00' + bytes([0, 0, 0x01, 0]) + b'\x00' * 0x80
+        xing = bytearray(MP3_FRAME)
+        xing[36:40] = b'Info'
+        data = id3 + bytes(xing) + MP3_FRAME * 300 + b'TAG' + b'\x00' * 125
+        points = _seek_points(data)
+        # La trama Info no lleva audio: el primer punto es la trama siguiente
+        self.assertEqual(points[0], (0, len(id3) + 417))
+        self.assertEqual(points[1], (1018, len(id3) + 417 * 40))
+        self.assertEqual(len(points), 8)
+
+    def test_seek_index_wav(self):
+        fichero = io.BytesIO()
+        with wave.open(fichero, 'wb') as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(b'\x00' * 4 * 20000)
+        self.assertEqual(_seek_points(fichero.getvalue(), chunk=7), [(0, 44), (1000, 32044), (2000, 64044)])
+
+    def test_seek_index_flac(self):
+        campos = (44100 << 44) | (1 << 41) | (15 << 36) | 441000
+        streaminfo = b'\x00' * 10 + campos.to_bytes(8, 'big') + b'\x00' * 16
+        seektable = struct.pack('>QQH', 0, 0, 4096) + struct.pack('>QQH', 44100 * 5, 50000, 4096) + \
+            struct.pack('>QQH', 2 ** 64 - 1, 0, 0)
+        data = b'fLaC\x00\x00\x00\x22' + streaminfo + b'\x83\x00\x00\x36' + seektable + b'\x00' * 100000
+        self.assertEqual(_seek_points(data, chunk=5), [(0, 100), (5000, 50100)])
+
+    def test_seek_lookup(self):
+        index = audio_util.pack_seek_index([(0, 10), (1000, 1010), (2000, 2010)])
+        self.assertEqual(audio_util.seek_lookup(index, 1500), (1000, 1010))
+        self.assertEqual(audio_util.seek_lookup(index, 2000), (2000, 2010))
+        self.assertEqual(audio_util.seek_lookup(index, 10 ** 9), (2000, 2010))
+        self.assertEqual(audio_util.seek_lookup(index, 0), (0, 10))
+        self.assertIsNone(audio_util.pack_seek_index([]))
+        self.assertEqual(_seek_points(b'hello world' * 100), [])
+
+    def test_sniff_unknown(self):
+        self.assertEqual(_sniff(b'hello world'), {'size_bytes': 11, 'mime': 'application/octet-stream',
+                                                  'duration_ms': None, 'bitrate': None, 'sample_rate': None})
+        self.assertIsNone(_sniff(b'\xff\xfb' + b'\x00' * 100)['duration_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
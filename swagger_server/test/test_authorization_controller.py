@@ -0,0 +1,87 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from swagger_server.controllers.authorization_controller import TokenCache
+
+
+class TestTokenCache(unittest.TestCase):
+    """TokenCache unit tests"""
+
+    def test_single_flight(self):
+        """Concurrent lookups of the same token make one call"""
+        cache = TokenCache(10, 60, 5)
+        llamadas = []
+
+        def cargar(token):
+            llamadas.append(token)
+            time.sleep(0.05)
+            return {'user': token}
+
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener('t', cargar)))
+                 for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(llamadas, ['t'])
+        self.assertEqual(resultados, [{'user': 't'}] * 8)
+
+    def test_negative_ttl(self):
+        """Rejected tokens are cached for the shorter TTL"""
+        cache = TokenCache(10, 60, 5)
+        llamadas = []
+
+        def cargar(token):
+            llamadas.append(token)
+            return {'user': token} if token == 'bueno' else None
+
+        with mock.patch('time.monotonic', return_value=1000.0) as reloj:
+            self.assertIsNone(cache.obtener('malo', cargar))
+            self.assertEqual(cache.obtener('bueno', cargar), {'user': 'bueno'})
+            self.assertIsNone(cache.obtener('malo', cargar))
+            self.assertEqual(llamadas, ['malo', 'bueno'])
+
+            # Pasado el TTL negativo pero no el positivo
+            reloj.return_value = 1010.0
+            self.assertIsNone(cache.obtener('malo', cargar))
+            self.assertEqual(cache.obtener('bueno', cargar), {'user': 'bueno'})
+            self.assertEqual(llamadas, ['malo', 'bueno', 'malo'])
+
+    def test_errors_not_cached(self):
+        """Failures reaching the origin are not cached"""
+        cache = TokenCache(10, 60, 60)
+
+        def falla(token):
+            raise IOError('down')
+
+        with self.assertRaises(IOError):
+            cache.obtener('t', falla)
+        self.assertEqual(cache.obtener('t', lambda token: {'ok': True}), {'ok': True})
+
+    def test_bounded(self):
+        """Least recently used tokens are evicted"""
+        cache = TokenCache(2, 60, 60)
+        for token in ('a', 'b', 'c'):
+            cache.obtener(token, lambda token: {'user': token})
+        self.assertEqual(cache.obtener('a', lambda token: {'user': 'nuevo'}), {'user': 'nuevo'})
+
+    def test_lookup_and_store(self):
+        """buscar/guardar share entries with obtener, including rejected tokens"""
+        cache = TokenCache(10, 60, 60)
+        self.assertEqual(cache.buscar('t'), (False, None))
+        cache.guardar('t', None)
+        self.assertEqual(cache.buscar('t'), (True, None))
+        cache.obtener('u', lambda token: {'user': token})
+        self.assertEqual(cache.buscar('u'), (True, {'user': 'u'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
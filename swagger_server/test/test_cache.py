@@ -0,0 +1,44 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import unittest
+
+from swagger_server.cache import ByteLRUCache
+
+
+class TestByteLRUCache(unittest.TestCase):
+    """ByteLRUCache unit tests"""
+
+    def test_versions(self):
+        cache = ByteLRUCache(100, 50)
+        cache.put(1, 1, b'abc')
+        self.assertEqual(cache.get(1, 1), b'abc')
+        self.assertIsNone(cache.get(1, 2))
+        self.assertIsNone(cache.get(1, 1))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_bounded_by_bytes(self):
+        cache = ByteLRUCache(100, 50)
+        self.assertFalse(cache.put(1, 1, b'x' * 51))
+        cache.put(1, 1, b'x' * 40)
+        cache.put(2, 1, b'x' * 40)
+        cache.get(1, 1)
+        cache.put(3, 1, b'x' * 40)
+        self.assertIsNone(cache.get(2, 1))
+        self.assertEqual(cache.get(1, 1), b'x' * 40)
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['bytes'], 80)
+
+    def test_invalidate(self):
+        cache = ByteLRUCache(100, 50)
+        cache.put(1, 1, b'abc')
+        cache.invalidate(1)
+        self.assertIsNone(cache.get(1, 1))
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import unittest
+from unittest import mock
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from swagger_server.controllers.dbconx import tempName
+from swagger_server.controllers.dbconx.tempName import PoolAgotadoError, PoolConexiones
+
+
+class _Conexion(object):
+    """Conexión de psycopg2 falsa: solo lo que usa PoolConexiones"""
+
+    def __init__(self):
+        self.closed = 0
+        self.pings = 0
+        self.ping_falla = False
+        self.cursor = mock.MagicMock()
+        self.cursor.return_value.__enter__.return_value.execute.side_effect = self._execute
+
+    def _execute(self, query, vars=None):
+        self.pings += 1
+        if self.ping_falla:
+            raise tempName.DB.OperationalError("server closed the connection unexpectedly")
+
+    def get_transaction_status(self):
+        return TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class TestPoolConexiones(unittest.TestCase):
+    """PoolConexiones unit tests with a stubbed psycopg2.connect"""
+
+    def setUp(self):
+        self.conexiones = []
+        parche = mock.patch.object(tempName.DB, 'connect', side_effect=self._connect)
+        self.addCleanup(parche.stop)
+        parche.start()
+        self.ahora = 1000.0
+        parche = mock.patch.object(tempName, 'time', mock.Mock(monotonic=lambda: self.ahora))
+        self.addCleanup(parche.stop)
+        parche.start()
+
+    def _connect(self, **kwargs):
+        conexion = _Conexion()
+        self.conexiones.append(conexion)
+        return conexion
+
+    def _pool(self, maximo=2, timeout=1, vida_maxima=1800, ping_inactiva=30):
+        return PoolConexiones(maximo, timeout, vida_maxima, ping_inactiva)
+
+    def test_reuse(self):
+        pool = self._pool()
+        conexion = pool.obtener()
+        pool.devolver(conexion)
+        self.assertIs(pool.obtener(), conexion)
+        stats = pool.estadisticas()
+        self.assertEqual((stats['creadas'], stats['prestamos'], stats['en_uso']), (1, 2, 1))
+        # Devuelta hace menos de ping_inactiva: no se comprueba
+        self.assertEqual(conexion.pings, 0)
+
+    def test_idle_ping(self):
+        """Connections idle for longer than ping_inactiva are pinged, and dropped if the ping fails"""
+        pool = self._pool()
+        conexion = pool.obtener()
+        pool.devolver(conexion)
+        self.ahora += 31
+        self.assertIs(pool.obtener(), conexion)
+        self.assertEqual(conexion.pings, 1)
+
+        pool.devolver(conexion)
+        self.ahora += 31
+        conexion.ping_falla = True
+        nueva = pool.obtener()
+        self.assertIsNot(nueva, conexion)
+        self.assertTrue(conexion.closed)
+        stats = pool.estadisticas()
+        self.assertEqual((stats['descartadas'], stats['recicladas'], stats['abiertas']), (1, 0, 1))
+
+    def test_max_lifetime(self):
+        """Expired connections are closed and counted once, as recycled"""
+        pool = self._pool(vida_maxima=60)
+        conexion = pool.obtener()
+        pool.devolver(conexion)
+        self.ahora += 61
+        nueva = pool.obtener()
+        self.assertIsNot(nueva, conexion)
+        self.assertTrue(conexion.closed)
+        # Sin ping: se descarta por la edad antes de comprobarla
+        self.assertEqual(conexion.pings, 0)
+
+        # También al devolverla
+        self.ahora += 61
+        pool.devolver(nueva)
+        self.assertTrue(nueva.closed)
+        stats = pool.estadisticas()
+        self.assertEqual((stats['recicladas'], stats['descartadas'], stats['abiertas']), (2, 0, 0))
+
+    def test_exhausted(self):
+        pool = self._pool(maximo=1, timeout=0.01)
+        conexion = pool.obtener()
+        with mock.patch.object(tempName.time, 'monotonic', side_effect=[self.ahora, self.ahora, self.ahora + 1]):
+            with self.assertRaises(PoolAgotadoError):
+                pool.obtener()
+        stats = pool.estadisticas()
+        self.assertEqual((stats['esperas'], stats['timeouts'], stats['creadas']), (1, 1, 1))
+
+        # Al devolverla vuelve a haber sitio
+        pool.devolver(conexion)
+        self.assertIs(pool.obtener(), conexion)
+
+    def test_fork(self):
+        """After a fork the parent's connections are forgotten without closing them"""
+        pool = self._pool()
+        heredada = pool.obtener()
+        with mock.patch.object(tempName.os, 'getpid', return_value=-1):
+            nueva = pool.obtener()
+            self.assertIsNot(nueva, heredada)
+            # La del padre no es del pool del hijo: ni se cierra ni se reutiliza
+            pool.devolver(heredada)
+            self.assertFalse(heredada.closed)
+            stats = pool.estadisticas()
+            self.assertEqual((stats['creadas'], stats['en_uso'], stats['libres']), (1, 1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
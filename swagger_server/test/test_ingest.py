@@ -0,0 +1,120 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import base64
+import fcntl
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from swagger_server import ingest
+from swagger_server.storage import TrackTooLargeError
+
+
+class TestIngestQueue(unittest.TestCase):
+    """ingest unit tests"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.guardados = []
+        parche = mock.patch.object(ingest, '_guardar', self._guardar)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def _guardar(self, spool):
+        self.guardados.append(b''.join(spool.chunks()))
+        return 40 + len(self.guardados), None
+
+    def _cola(self, **kwargs):
+        return ingest.IngestQueue(self.directorio.name, workers=1, **kwargs)
+
+    def _subir(self, cola, formato, datos):
+        with cola.upload(formato) as subida:
+            subida.write(datos)
+            return subida.submit()
+
+    def _esperar(self, cola):
+        if cola._pool:
+            cola._pool.shutdown(wait=True)
+
+    def test_raw(self):
+        cola = self._cola()
+        estado = self._subir(cola, 'raw', b'audio' * 1000)
+        self.assertEqual(estado['status'], 'queued')
+        self.assertEqual(estado['size_bytes'], 5000)
+        self._esperar(cola)
+        estado = cola.status(estado['job_id'])
+        self.assertEqual((estado['status'], estado['idtrack'], estado['processed_bytes']), ('done', 41, 5000))
+        self.assertEqual(self.guardados, [b'audio' * 1000])
+        # Solo queda el estado
+        self.assertEqual(os.listdir(self.directorio.name), [estado['job_id'] + '.json'])
+
+    def test_base64(self):
+        cola = self._cola()
+        bueno = self._subir(cola, 'b64', base64.encodebytes(b'audio' * 1000))
+        malo = self._subir(cola, 'b64', b'abcde')
+        self._esperar(cola)
+        self.assertEqual(cola.status(bueno['job_id'])['status'], 'done')
+        self.assertEqual(self.guardados, [b'audio' * 1000])
+        estado = cola.status(malo['job_id'])
+        self.assertEqual(estado['status'], 'failed')
+        self.assertEqual(estado['error'], {'code': "400", 'message': "Invalid base64 encoding"})
+
+    def test_discard(self):
+        cola = self._cola()
+        with self.assertRaises(TrackTooLargeError):
+            with cola.upload('raw', max_size=3) as subida:
+                subida.write(b'audio')
+        with cola.upload('raw'):
+            pass
+        self.assertEqual(os.listdir(self.directorio.name), [])
+        self.assertIsNone(cola.status('0' * 32))
+        self.assertIsNone(cola.status('../x'))
+
+    def test_queue_full(self):
+        with self.assertRaises(ingest.IngestQueueFull):
+            self._cola(max_pendientes=0).upload('raw')
+
+    def test_rescan(self):
+        # El proceso se para antes de procesar el trabajo
+        cola = self._cola()
+        with mock.patch.object(cola, '_encolar'):
+            estado = self._subir(cola, 'raw', b'audio')
+        nueva = self._cola()
+        self.assertEqual(nueva.rescan(), 1)
+        self._esperar(nueva)
+        self.assertEqual(nueva.status(estado['job_id'])['idtrack'], 41)
+        self.assertEqual(nueva.rescan(), 0)
+
+    def test_locked_by_other_process(self):
+        cola = self._cola()
+        with mock.patch.object(cola, '_encolar'):
+            estado = self._subir(cola, 'raw', b'audio')
+        with open(cola._ruta(estado['job_id'], 'raw'), 'rb') as cuerpo:
+            fcntl.flock(cuerpo.fileno(), fcntl.LOCK_EX)
+            cola._procesar(estado['job_id'])
+        self.assertEqual(cola.status(estado['job_id'])['status'], 'queued')
+        cola._procesar(estado['job_id'])
+        self.assertEqual(cola.status(estado['job_id'])['status'], 'done')
+
+    def test_purge(self):
+        cola = self._cola()
+        with mock.patch.object(cola, '_encolar'):
+            pendiente = self._subir(cola, 'raw', b'audio')
+        terminado = self._subir(cola, 'raw', b'audio')
+        self._esperar(cola)
+        for nombre in os.listdir(self.directorio.name):
+            os.utime(os.path.join(self.directorio.name, nombre), (0, 0))
+        cola._purgar()
+        self.assertEqual(sorted(os.listdir(self.directorio.name)),
+                         sorted([pendiente['job_id'] + '.json', pendiente['job_id'] + '.raw']))
+        self.assertIsNone(cola.status(terminado['job_id']))
+
+
+if __name__ == '__main__':
+    unittest.main()
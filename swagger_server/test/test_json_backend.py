@@ -0,0 +1,56 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import datetime
+import json
+import unittest
+
+from swagger_server import json_backend
+from swagger_server.encoder import JSONEncoder
+from swagger_server.models import Error, Track
+
+MUESTRAS = [
+    Track(idtrack=1, track='UklGRiQAAABXQVZF' * 100),
+    [Track(idtrack=2), {'error': Error(code='404', message='Track not found')}],
+    {'z': [1, -2 ** 63, 2 ** 64 - 1, True, None, {}], 'a': [], 'm': ''.join(chr(i) for i in range(128))},
+    {'unicode': 'Pérez'},
+    {'utc': datetime.datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc),
+     'naive': datetime.datetime(2024, 1, 2)},
+    {'float': 1e16, 'big': 2 ** 70},
+    {1: 'no str key'},
+    ('tuple', 1),
+]
+
+
+@unittest.skipUnless(json_backend.orjson, "orjson is not installed")
+class TestJsonBackend(unittest.TestCase):
+    """json_backend unit tests"""
+
+    def test_dumps_identical(self):
+        """The output is byte-identical to json.dumps with JSONEncoder"""
+        for muestra in MUESTRAS:
+            for opciones in ({'indent': 2}, {'separators': (',', ':')}, {}):
+                self.assertEqual(json_backend.dumps(muestra, **opciones),
+                                 json.dumps(muestra, cls=JSONEncoder, sort_keys=True, **opciones))
+
+    def test_fast_path(self):
+        """orjson is only used when it would write the same bytes"""
+        self.assertIsNotNone(json_backend._rapido(MUESTRAS[0], indent=2))
+        self.assertIsNone(json_backend._rapido(MUESTRAS[0]))
+        self.assertIsNotNone(json_backend._rapido(MUESTRAS[4], indent=2))
+        for muestra in MUESTRAS[2:4] + MUESTRAS[5:7]:
+            self.assertIsNone(json_backend._rapido(muestra, indent=2))
+
+    def test_loads(self):
+        """loads returns the same values as json.loads"""
+        for texto in ['{"idtrack": 1, "track": "AAAA"}', '{"n": 123456789012345678901234567890}',
+                      '[NaN, 1.5]', 'null', b'{"a": "\\u00e9"}']:
+            self.assertEqual(json_backend.loads(texto), json.loads(texto))
+        self.assertIsInstance(json_backend.loads('{"n": 123456789012345678901234567890}')['n'], int)
+        with self.assertRaises(ValueError):
+            json_backend.loads('{"track": ')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from swagger_server import metrics
+
+
+def _muestra(nombre, **labels):
+    return metrics.REGISTRY.get_sample_value(nombre, labels) or 0
+
+
+class TestMetrics(unittest.TestCase):
+    """metrics unit tests"""
+
+    def test_operacion(self):
+        """operationId from Flask endpoints and aiohttp route names"""
+        self.assertEqual(metrics.operacion('swagger_server_controllers_track_controller_get_track'),
+                         'get_track')
+        self.assertEqual(metrics.operacion('/.swagger_server_controllers_aio_track_controller_add_tracks_bulk'),
+                         'add_tracks_bulk')
+
+    def test_fase_outside_request(self):
+        """Phases outside a request are not recorded"""
+        with metrics.fase('db_query'):
+            pass
+        self.assertIsNone(metrics.actual())
+
+    def test_middleware(self):
+        """The WSGI middleware records latency, phases, sizes and status on close"""
+        def app(environ, start_response):
+            metrics.actual().operacion = 'test_op'
+            environ['wsgi.input'].read()
+            with metrics.fase('db_query'):
+                pass
+            start_response('404 NOT FOUND', [('Content-Type', 'text/plain')])
+            return [b'abc', b'de']
+
+        antes = _muestra('pt_responses_total', operation='test_op', status='404')
+        environ = {'wsgi.input': io.BytesIO(b'12345')}
+        respuesta = metrics.MetricsMiddleware(app)(environ, lambda status, headers, exc_info=None: None)
+        self.assertEqual(_muestra('pt_requests_in_flight'), 1)
+        self.assertEqual(b''.join(respuesta), b'abcde')
+        respuesta.close()
+
+        self.assertEqual(_muestra('pt_requests_in_flight'), 0)
+        self.assertEqual(_muestra('pt_responses_total', operation='test_op', status='404'), antes + 1)
+        self.assertEqual(_muestra('pt_request_size_bytes_sum', operation='test_op'), 5)
+        self.assertEqual(_muestra('pt_response_size_bytes_sum', operation='test_op'), 5)
+        self.assertEqual(_muestra('pt_phase_duration_seconds_count', operation='test_op', phase='db_query'), 1)
+        self.assertIsNone(metrics.actual())
+
+    def test_server_timing(self):
+        """Sampled requests get a Server-Timing header with their phases"""
+        def app(environ, start_response):
+            with metrics.fase('auth'):
+                pass
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        cabeceras = {}
+
+        def start_response(status, headers, exc_info=None):
+            cabeceras.update(headers)
+
+        rate = metrics.muestreo.rate
+        try:
+            metrics.muestreo.configurar(rate=1)
+            metrics.MetricsMiddleware(app)({'wsgi.input': io.BytesIO()}, start_response).close()
+            self.assertRegex(cabeceras['Server-Timing'], r'^auth;dur=[0-9.]+, total;dur=[0-9.]+$')
+
+            cabeceras.clear()
+            metrics.muestreo.configurar(rate=0)
+            metrics.MetricsMiddleware(app)({'wsgi.input': io.BytesIO()}, start_response).close()
+            self.assertNotIn('Server-Timing', cabeceras)
+        finally:
+            metrics.muestreo.configurar(rate=rate)
+
+    def test_muestreo_fichero(self):
+        """The sampling settings are reloaded from the control file"""
+        with tempfile.TemporaryDirectory() as directorio:
+            fichero = os.path.join(directorio, 'timing.json')
+            with open(fichero, 'w') as f:
+                json.dump({'rate': 1, 'log': True}, f)
+            muestreo = metrics._Muestreo(0, False, fichero)
+            self.assertTrue(muestreo.elegir())
+            self.assertTrue(muestreo.log)
+
+            with open(fichero, 'w') as f:
+                json.dump({'rate': 0}, f)
+            os.utime(fichero, (0, 0))
+            muestreo._revisado = 0.0
+            self.assertFalse(muestreo.elegir())
+
+
+if __name__ == '__main__':
+    unittest.main()
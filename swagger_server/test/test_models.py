@@ -0,0 +1,42 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import json
+import unittest
+
+from swagger_server.encoder import JSONEncoder
+from swagger_server.models import Error, Track, TrackBatch
+
+
+class TestModels(unittest.TestCase):
+    """Compiled model serialization unit tests"""
+
+    def test_from_dict(self):
+        """from_dict converts primitives and lists like util._deserialize"""
+        track = Track.from_dict({'idtrack': '7', 'track': 'AAAA', 'extra': 1})
+        self.assertEqual(track.idtrack, 7)
+        self.assertEqual(track.track, 'AAAA')
+        self.assertEqual(TrackBatch.from_dict({'ids': ['1', 2]}).ids, [1, 2])
+        self.assertIsNone(Track.from_dict({}).track)
+        with self.assertRaises(ValueError):
+            Track.from_dict({'track': None})
+
+    def test_to_dict(self):
+        """to_dict keeps None values; the encoder drops them"""
+        track = Track(idtrack=3)
+        self.assertEqual(track.to_dict(), {'idtrack': 3, 'track': None})
+        self.assertEqual(json.dumps(track, cls=JSONEncoder), '{"idtrack": 3}')
+        self.assertEqual(json.loads(json.dumps(Error(code="404", message="Track not found"), cls=JSONEncoder)),
+                         {'code': '404', 'message': 'Track not found'})
+
+    def test_slots(self):
+        """Instances have no __dict__ and compare by value"""
+        self.assertFalse(hasattr(Track(), '__dict__'))
+        self.assertEqual(Track(1, 'AA'), Track(1, 'AA'))
+        self.assertNotEqual(Track(1, 'AA'), Track(2, 'AA'))
+        self.assertNotEqual(Track(1, 'AA'), Error('1', 'AA'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import io
+import struct
+import unittest
+import wave
+
+from swagger_server import peaks
+
+
+def _wav(frames, canales=1, ancho=2):
+    fichero = io.BytesIO()
+    with wave.open(fichero, 'wb') as w:
+        w.setnchannels(canales)
+        w.setsampwidth(ancho)
+        w.setframerate(8000)
+        w.writeframes(frames)
+    return fichero.getvalue()
+
+
+def _compute(data, tramos=None, trozo=1000):
+    # Trozos que no coinciden con los frames ni con la cabecera, como los de una subida
+    indexer = peaks.PeaksIndexer(tramos)
+    for i in range(0, len(data), trozo):
+        indexer.feed(data[i:i + trozo])
+    return indexer.result()
+
+
+@unittest.skipUnless(peaks.numpy, "numpy is not installed")
+class TestPeaks(unittest.TestCase):
+    """peaks unit tests"""
+
+    def test_compute_16_bits(self):
+        # Rampa de -32768 a 32764: cada cuarto ocupa un tramo
+        data = _wav(struct.pack('<16384h', *range(-32768, 32768, 4)))
+        niveles = peaks.unpack(_compute(data, 4))
+        self.assertEqual(len(niveles), 1)
+        self.assertEqual(list(memoryview(niveles[0]).cast('b')), [-127, -64, -64, 0, 0, 63, 64, 127])
+
+    def test_compute_levels(self):
+        data = _wav(b'\x00\x00' * 100000)
+        niveles = peaks.unpack(_compute(data))
+        self.assertEqual([len(nivel) // 2 for nivel in niveles], [4096, 1024, 256, 64])
+        self.assertEqual(set(niveles[-1]), {0})
+
+    def test_compute_8_and_24_bits(self):
+        ocho = _wav(bytes([0, 128, 255, 128]) * 100, ancho=1)
+        self.assertEqual(peaks.select(_compute(ocho, 64), 1), (1, [-127, 126]))
+        # 24 bits: -2^23 y 2^23 - 1
+        veinticuatro = _wav((b'\x00\x00\x80' + b'\xff\xff\x7f') * 100, ancho=3)
+        self.assertEqual(peaks.select(_compute(veinticuatro, 64), 1), (1, [-127, 127]))
+
+    def test_compute_stereo(self):
+        # Un canal en silencio y el otro a media escala: cuentan los dos
+        data = _wav(struct.pack('<2h', 0, 16384) * 1000, canales=2)
+        self.assertEqual(peaks.select(_compute(data, 64), 1), (1, [0, 64]))
+
+    def test_compute_float(self):
+        fmt = struct.pack('<HHIIHH', 3, 1, 8000, 32000, 4, 32)
+        datos = struct.pack('<4f', -0.5, 0.25, 2.0, 0.0)
+        data = b'RIFF' + struct.pack('<I', 36 + len(datos)) + b'WAVE' + \
+            b'fmt ' + struct.pack('<I', 16) + fmt + b'data' + struct.pack('<I', len(datos)) + datos
+        self.assertEqual(peaks.select(_compute(data), 1), (1, [-64, 127]))
+
+    def test_compute_chunks(self):
+        data = _wav(struct.pack('<30000h', *(((i * 37) % 65536) - 32768 for i in range(30000))), canales=2)
+        self.assertEqual(_compute(data, 256, trozo=7), _compute(data, 256, trozo=len(data)))
+
+    def test_compute_streaming(self):
+        # Sin tamaño de datos (WAV escrito en streaming): se reduce por gránulos
+        data = bytearray(_wav(struct.pack('<16384h', *range(-32768, 32768, 4))))
+        data[40:44] = struct.pack('<I', 0xFFFFFFFF)
+        niveles = peaks.unpack(_compute(bytes(data), 4))
+        self.assertEqual(list(memoryview(niveles[0]).cast('b')), [-127, -64, -64, 0, 0, 63, 64, 127])
+
+    def test_compute_truncated(self):
+        # La cabecera declara el doble de datos: solo quedan los tramos leídos
+        data = _wav(struct.pack('<16384h', *range(-32768, 32768, 4)))
+        niveles = peaks.unpack(_compute(data[:44 + 16384], 4))
+        self.assertEqual(list(memoryview(niveles[0]).cast('b')), [-127, -64, -64, 0])
+
+    def test_compute_unsupported(self):
+        self.assertIsNone(_compute(b'ID3\x04\x00' + b'\x00' * 1000))
+        self.assertIsNone(_compute(b'fLaC' + b'\x00' * 1000))
+        self.assertIsNone(_compute(_wav(b'')))
+
+    def test_select(self):
+        niveles = [bytes(struct.pack('<8b', -1, 1, -2, 2, -3, 3, -4, 4)), struct.pack('<2b', -4, 4)]
+        picos = peaks.pack(niveles)
+        self.assertEqual(peaks.unpack(picos), niveles)
+        self.assertEqual(peaks.select(picos, 1), (1, [-4, 4]))
+        self.assertEqual(peaks.select(picos, 2), (2, [-2, 2, -4, 4]))
+        self.assertEqual(peaks.select(picos, 100), (4, [-1, 1, -2, 2, -3, 3, -4, 4]))
+
+    def test_downsample(self):
+        self.assertEqual(peaks.downsample([-1, 1, -5, 2, 0, 9], 2), [-1, 1, -5, 9])
+        self.assertEqual(peaks.downsample(struct.pack('<2b', -3, 3), 10), [-3, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import io
+import os
+import tempfile
+import time
+import unittest
+
+from swagger_server.profiling import ProfilerMiddleware
+
+
+def _app(environ, start_response):
+    time.sleep(0.05)
+    start_response('201 CREATED', [('Content-Type', 'text/plain')])
+    return [environ.get('QUERY_STRING', '').encode()]
+
+
+def _llamar(middleware, headers=None, query=''):
+    environ = {'wsgi.input': io.BytesIO(), 'REQUEST_METHOD': 'GET', 'PATH_INFO': '/track/1',
+               'QUERY_STRING': query}
+    environ.update(headers or {})
+    respuesta = {}
+
+    def start_response(status, headers, exc_info=None):
+        respuesta['status'] = status
+        respuesta['headers'] = dict(headers)
+
+    resultado = middleware(environ, start_response)
+    cuerpo = b''.join(resultado)
+    if hasattr(resultado, 'close'):
+        resultado.close()
+    return respuesta['status'], respuesta['headers'], cuerpo
+
+
+class TestProfiling(unittest.TestCase):
+    """profiling unit tests"""
+
+    def test_without_token(self):
+        """Requests without a valid token are served untouched"""
+        middleware = ProfilerMiddleware(_app, token='s3cret')
+        self.assertEqual(_llamar(middleware, query='a=1')[2], b'a=1')
+        status, headers, cuerpo = _llamar(middleware, {'HTTP_X_PROFILE': 'bad'})
+        self.assertEqual(status, '201 CREATED')
+        self.assertNotIn('X-Profile-File', headers)
+
+    def test_inline(self):
+        """Inline profiles replace the body and strip the query flags"""
+        middleware = ProfilerMiddleware(_app, token='s3cret')
+        status, headers, cuerpo = _llamar(middleware, {'HTTP_X_PROFILE': 's3cret'})
+        self.assertEqual(headers['X-Profile-Status'], '201')
+        self.assertIn(b'function calls', cuerpo)
+
+        status, headers, cuerpo = _llamar(middleware, query='a=1&profile=s3cret&profile_mode=sampling')
+        self.assertEqual(headers['X-Profile-Status'], '201')
+        self.assertIn(b'_app (', cuerpo)
+
+    def test_directory(self):
+        """With a directory the response is kept and the profile is written on close"""
+        with tempfile.TemporaryDirectory() as directorio:
+            middleware = ProfilerMiddleware(_app, token='s3cret', directorio=directorio)
+            status, headers, cuerpo = _llamar(middleware, {'HTTP_X_PROFILE': 's3cret'}, query='a=1&profile=x')
+            self.assertEqual(cuerpo, b'a=1')
+            self.assertTrue(headers['X-Profile-File'].endswith('-GET-track_1.prof'))
+            self.assertTrue(os.path.exists(os.path.join(directorio, headers['X-Profile-File'])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,29 @@ class TestRootController(BaseTestCase):
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
 
+    def test_get_stats(self):
+        """Test case for get_stats
+
+        Returns internal counters of the service
+        """
+        response = self.client.open(
+            '/stats',
+            method='GET')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
+    def test_get_metrics(self):
+        """Test case for get_metrics
+
+        Returns Prometheus metrics
+        """
+        response = self.client.open(
+            '/metrics',
+            method='GET')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertIn(b'pt_request_duration_seconds', response.data)
+
 
 if __name__ == '__main__':
     import unittest
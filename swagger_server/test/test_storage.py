@@ -0,0 +1,133 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import base64
+import binascii
+import hashlib
+import io
+import struct
+import unittest
+from unittest import mock
+
+from swagger_server.storage import CopyBinaryReader, TrackSpool, TrackTooLargeError
+from swagger_server.storage import migrate_chunks
+
+
+class TestTrackSpool(unittest.TestCase):
+    """TrackSpool unit tests"""
+
+    def setUp(self):
+        self.data = bytes(range(256)) * 1000
+
+    def test_from_stream(self):
+        with TrackSpool.from_stream(io.BytesIO(self.data)) as spool:
+            self.assertEqual(spool.size, len(self.data))
+            self.assertEqual(b''.join(spool.chunks(1000)), self.data)
+            self.assertEqual(spool.sha256, hashlib.sha256(self.data).hexdigest())
+            self.assertEqual(spool.audio_info()['size_bytes'], len(self.data))
+            self.assertEqual(spool.audio_info()['mime'], 'application/octet-stream')
+            self.assertIsNone(spool.audio_info()['seek_index'])
+            self.assertIsNone(spool.audio_info()['peaks'])
+
+    def test_from_base64(self):
+        encoded = base64.b64encode(self.data).decode('ascii')
+        with TrackSpool.from_base64(encoded) as spool:
+            self.assertEqual(b''.join(spool.chunks()), self.data)
+
+        # Igual que b64decode: se ignoran los saltos de línea
+        encoded = base64.encodebytes(self.data).decode('ascii')
+        with TrackSpool.from_base64(encoded) as spool:
+            self.assertEqual(b''.join(spool.chunks()), self.data)
+
+    def test_from_base64_invalid(self):
+        with self.assertRaises(binascii.Error):
+            TrackSpool.from_base64('abcde')
+
+    def test_from_base64_stream(self):
+        encoded = base64.encodebytes(self.data)
+        with TrackSpool.from_base64_stream(io.BytesIO(encoded)) as spool:
+            self.assertEqual(b''.join(spool.chunks()), self.data)
+        with self.assertRaises(binascii.Error):
+            TrackSpool.from_base64_stream(io.BytesIO(b'abcde'))
+
+    def test_max_size(self):
+        with self.assertRaises(TrackTooLargeError):
+            TrackSpool.from_stream(io.BytesIO(self.data), max_size=len(self.data) - 1)
+
+
+class TestCopyBinaryReader(unittest.TestCase):
+    """CopyBinaryReader unit tests"""
+
+    def test_format(self):
+        with TrackSpool.from_stream(io.BytesIO(b'audio')) as spool:
+            reader = CopyBinaryReader([(7, spool)])
+            out = b''
+            while True:
+                chunk = reader.read(3)
+                if not chunk:
+                    break
+                out += chunk
+
+        expected = (b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0) +
+                    struct.pack('!h', 2) + struct.pack('!iq', 8, 7) +
+                    struct.pack('!i', 5) + b'audio' + struct.pack('!h', -1))
+        self.assertEqual(out, expected)
+
+
+
+class _CursorCopia(object):
+    """Cursor que responde a COPY TO con las filas dadas en formato binary"""
+
+    def __init__(self, filas):
+        self.filas = filas
+
+    def mogrify(self, query, params):
+        return (query % tuple(params)).encode()
+
+    def copy_expert(self, sql, fichero):
+        reader = CopyBinaryReader(self.filas)
+        fichero.write(reader.read())
+        while True:
+            chunk = reader.read()
+            if not chunk:
+                break
+            fichero.write(chunk)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class TestMigrateChunks(unittest.TestCase):
+    """migrate_chunks unit tests"""
+
+    def _trozos(self, filas, chunk_size):
+        conexion = mock.Mock()
+        conexion.cursor.return_value = _CursorCopia(filas)
+        fichero, longitud = migrate_chunks._volcar(conexion, 7)
+        with fichero:
+            return [chunk for _, _, chunk, _ in migrate_chunks._leer_trozos(fichero, longitud, 7, chunk_size)]
+
+    def test_chunks(self):
+        data = bytes(range(256)) * 10
+        self.assertEqual(self._trozos([(data,)], 1000), [data[:1000], data[1000:2000], data[2000:]])
+        self.assertEqual(self._trozos([(data,)], 2560), [data])
+
+    def test_missing_or_null(self):
+        self.assertEqual(self._trozos([], 1000), [])
+        self.assertEqual(self._trozos([(None,)], 1000), [])
+
+    def test_releases_connection_on_failure(self):
+        """If the second connection fails the first one goes back to the pool"""
+        escritura = mock.Mock()
+        with mock.patch.object(migrate_chunks, 'dbConectar', side_effect=[escritura, None]), \
+                mock.patch.object(migrate_chunks, 'dbDesconectar') as desconectar:
+            self.assertEqual(migrate_chunks.migrar(), 1)
+        desconectar.assert_called_once_with(escritura)
+
+
+if __name__ == '__main__':
+    unittest.main()
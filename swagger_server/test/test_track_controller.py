@@ -2,12 +2,23 @@
 
 from __future__ import absolute_import
 
+import base64
+import datetime
+import struct
+
 from flask import json
 from six import BytesIO
 
 from swagger_server.models.error import Error  # noqa: E501
 from swagger_server.models.track import Track  # noqa: E501
-from swagger_server.test import BaseTestCase
+from swagger_server.models.track_batch import TrackBatch  # noqa: E501
+from swagger_server import peaks
+from swagger_server.cache import track_cache
+from swagger_server.storage import metadata
+from swagger_server.test import BaseTestCase, MockedTestCase
+
+# Cabecera ID3v2 vacía seguida de bytes que no son tramas
+_AUDIO = b'ID3\x04\x00\x00\x00\x00\x00\x00' + bytes(range(256)) * 20
 
 
 class TestTrackController(BaseTestCase):
@@ -64,6 +75,331 @@ class TestTrackController(BaseTestCase):
                        'Response body is : ' + response.data.decode('utf-8'))
 
 
+_INFO = {'version': 2, 'updated_at': datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+         'size_bytes': len(_AUDIO), 'mime': 'audio/mpeg', 'duration_ms': 1000, 'bitrate': 40000,
+         'sample_rate': 44100}
+_JOB = {'job_id': '6f1c3b0e9a7d4e2f8b5a1c0d3e4f5a6b', 'status': 'done', 'size_bytes': len(_AUDIO),
+        'processed_bytes': len(_AUDIO), 'idtrack': 42,
+        'created_at': '2024-01-01T00:00:00+00:00', 'updated_at': '2024-01-01T00:00:01+00:00'}
+
+
+def _leer(conexion, track_id, start=0, end=None):
+    return iter([_AUDIO[start:len(_AUDIO) if end is None else end + 1]])
+
+
+class TestTrackControllerMocked(MockedTestCase):
+    """TrackController tests against a mocked SYU, database and storage"""
+
+    def setUp(self):
+        super().setUp()
+        self.store.size.return_value = len(_AUDIO)
+        self.store.read.side_effect = _leer
+        self.patch('swagger_server.storage.metadata.validators', return_value=(2, _INFO['updated_at']))
+        self.patch('swagger_server.storage.metadata.info', return_value=_INFO)
+
+    def test_get_track_audio(self):
+        """Test case for get_track_audio
+
+        Gets the raw audio of a track
+        """
+        headers = [('Range', 'bytes=0-1023')]
+        response = self.client.open(
+            '/track/{trackId}/audio'.format(trackId=789),
+            method='GET',
+            headers=headers)
+        self.assertStatus(response, 206,
+                          'Response body is : ' + response.data.decode('latin-1'))
+        self.assertEqual(response.headers['Content-Range'], 'bytes 0-1023/%d' % len(_AUDIO))
+        self.assertEqual(response.headers['Content-Length'], '1024')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(response.headers['ETag'], '"789-2-audio"')
+        self.assertEqual(response.mimetype, 'audio/mpeg')
+        self.assertEqual(response.data, _AUDIO[:1024])
+        # Metadatos y audio de la misma instantánea
+        self.assertEqual(self.cursor.execute.call_args_list[0][0][0], metadata.SNAPSHOT_SQL)
+
+    def test_get_track_json(self):
+        """Test case for get_track against the mocked storage
+
+        Gets a track file directly (returns audio in base64)
+        """
+        track_cache.invalidate(789)
+        self.addCleanup(track_cache.invalidate, 789)
+        response = self.client.open(
+            '/track/{trackId}'.format(trackId=789),
+            method='GET')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.headers['ETag'], '"789-2-json"')
+        self.assertEqual(response.json, {'idtrack': 789, 'track': base64.b64encode(_AUDIO).decode()})
+        self.assertEqual(self.cursor.execute.call_args_list[0][0][0], metadata.SNAPSHOT_SQL)
+
+    def test_get_track_audio_invalid_range(self):
+        """Test case for get_track_audio with invalid and unsatisfiable ranges"""
+        response = self.client.open(
+            '/track/{trackId}/audio'.format(trackId=789),
+            method='GET',
+            headers=[('Range', 'bytes=10-5')])
+        self.assert200(response)
+        self.assertNotIn('Content-Range', response.headers)
+        self.assertEqual(response.data, _AUDIO)
+
+        response = self.client.open(
+            '/track/{trackId}/audio'.format(trackId=789),
+            method='GET',
+            headers=[('Range', 'bytes=%d-' % len(_AUDIO))])
+        self.assertStatus(response, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */%d' % len(_AUDIO))
+
+    def test_add_track_binary(self):
+        """Test case for add_track with an application/octet-stream body
+
+        Add a new track to the database
+        """
+        subido = []
+        self.store.insert.side_effect = lambda conexion, spool: subido.append(b''.join(spool.chunks())) or 42
+        save_info = self.patch('swagger_server.storage.metadata.save_info')
+        response = self.client.open(
+            '/track/upload',
+            method='POST',
+            data=_AUDIO,
+            content_type='application/octet-stream')
+        self.assertStatus(response, 201,
+                          'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json, {'idtrack': 42})
+        self.assertEqual(subido, [_AUDIO])
+        self.assertEqual(save_info.call_args[0][1], 42)
+        self.assertEqual(save_info.call_args[0][2]['size_bytes'], len(_AUDIO))
+        self.store.commit.assert_called_once_with(self.conexion)
+
+    def test_get_track_audio_not_modified(self):
+        """Test case for get_track_audio with If-None-Match"""
+        response = self.client.open(
+            '/track/{trackId}/audio'.format(trackId=789),
+            method='GET',
+            headers=[('If-None-Match', '"789-2-audio"')])
+        self.assertStatus(response, 304)
+        self.assertEqual(response.headers['ETag'], '"789-2-audio"')
+        self.store.read.assert_not_called()
+
+    def test_get_tracks_batch(self):
+        """Test case for get_tracks_batch
+
+        Gets several tracks at once
+        """
+        self.store.read_many.return_value = iter([(789, [_AUDIO[:1000], _AUDIO[1000:]])])
+        body = TrackBatch(ids=[789, 790, 789])
+        response = self.client.open(
+            '/tracks/batch',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(self.store.read_many.call_args[0][1], [789, 790])
+        lineas = [json.loads(linea) for linea in response.data.splitlines()]
+        self.assertEqual(lineas, [
+            {'idtrack': 789, 'track': base64.b64encode(_AUDIO).decode('ascii')},
+            {'idtrack': 790, 'error': {'code': '404', 'message': 'Track not found'}}])
+
+    def test_add_tracks_bulk(self):
+        """Test case for add_tracks_bulk
+
+        Adds many tracks in batches
+        """
+        subidos = []
+        self.store.insert_many.side_effect = lambda conexion, spools: \
+            subidos.extend(b''.join(spool.chunks()) for spool in spools) or [7, 8]
+        save_info_many = self.patch('swagger_server.storage.metadata.save_info_many')
+        body = b'\n'.join(json.dumps(Track(track=track)).encode('utf-8')
+                          for track in ('SUQz', 'not base64!', base64.b64encode(_AUDIO).decode('ascii')))
+        response = self.client.open(
+            '/tracks/bulk',
+            method='POST',
+            data=body,
+            content_type='application/x-ndjson')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json, [
+            {'idtrack': 7},
+            {'error': {'code': '400', 'message': 'Invalid base64 encoding'}},
+            {'idtrack': 8}])
+        self.assertEqual(subidos, [b'ID3', _AUDIO])
+        self.assertEqual([fila[0] for fila in save_info_many.call_args[0][1]], [7, 8])
+        self.store.commit.assert_called_once_with(self.conexion)
+
+    def test_get_track_info(self):
+        """Test case for get_track_info
+
+        Gets the audio metadata of a track
+        """
+        response = self.client.open(
+            '/track/{trackId}/info'.format(trackId=789),
+            method='GET')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.headers['ETag'], '"789-2-info"')
+        self.assertEqual(response.json, {'idtrack': 789, 'size_bytes': len(_AUDIO), 'mime': 'audio/mpeg',
+                                         'duration_ms': 1000, 'bitrate': 40000, 'sample_rate': 44100})
+
+        response = self.client.open(
+            '/track/{trackId}/info'.format(trackId=789),
+            method='GET',
+            headers=[('If-None-Match', '"789-2-info"')])
+        self.assertStatus(response, 304)
+        self.store.read.assert_not_called()
+
+    def test_head_track(self):
+        """Test case for head_track
+
+        Gets the headers of a track without its body
+        """
+        response = self.client.open(
+            '/track/{trackId}'.format(trackId=789),
+            method='HEAD')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], '"789-2-json"')
+        # Lo que ocuparía el cuerpo de GET /track/789
+        self.assertEqual(response.headers['Content-Length'],
+                         str(len(b'{"idtrack": 789, "track": "' + base64.b64encode(_AUDIO) + b'"}')))
+        self.assertEqual(response.headers['X-Track-Mime'], 'audio/mpeg')
+        self.assertEqual(response.headers['X-Track-Duration-Ms'], '1000')
+        self.store.read.assert_not_called()
+
+    def test_list_tracks(self):
+        """Test case for list_tracks
+
+        Lists the tracks, metadata only
+        """
+        filas = [{'idtrack': track_id, 'size_bytes': len(_AUDIO), 'version': 1,
+                  'created_at': _INFO['updated_at'], 'updated_at': _INFO['updated_at']}
+                 for track_id in (790, 795, 801)]
+        list_tracks = self.patch('swagger_server.storage.metadata.list_tracks',
+                                 side_effect=lambda conexion, after_id, limit: filas[:limit])
+        query_string = [('after_id', 789), ('limit', 2)]
+        response = self.client.open(
+            '/tracks',
+            method='GET',
+            query_string=query_string)
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        # Se pide una fila más para saber si hay otra página
+        list_tracks.assert_called_once_with(self.conexion, 789, 3)
+        self.assertEqual([track['idtrack'] for track in response.json['tracks']], [790, 795])
+        self.assertEqual(response.json['tracks'][0]['size_bytes'], len(_AUDIO))
+        self.assertEqual(response.json['next_after_id'], 795)
+        self.store.read.assert_not_called()
+
+        response = self.client.open(
+            '/tracks',
+            method='GET',
+            query_string=[('after_id', 789), ('limit', 5)])
+        self.assert200(response)
+        self.assertEqual(len(response.json['tracks']), 3)
+        self.assertNotIn('next_after_id', response.json)
+
+    def test_get_track_audio_seek(self):
+        """Test case for get_track_audio with t
+
+        Gets the raw audio of a track from a time in seconds
+        """
+        seek_point = self.patch('swagger_server.storage.metadata.seek_point', return_value=(90000, 3000))
+        query_string = [('t', 90.5)]
+        response = self.client.open(
+            '/track/{trackId}/audio'.format(trackId=789),
+            method='GET',
+            query_string=query_string)
+        self.assertStatus(response, 206,
+                          'Response body is : ' + response.data.decode('latin-1'))
+        seek_point.assert_called_once_with(self.conexion, 789, 90500)
+        self.assertEqual(response.headers['X-Seek-Time-Ms'], '90000')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 3000-%d/%d' % (len(_AUDIO) - 1, len(_AUDIO)))
+        self.assertEqual(response.data, _AUDIO[3000:])
+
+        # Sin índice se envía la pista entera desde el principio
+        seek_point.return_value = None
+        response = self.client.open(
+            '/track/{trackId}/audio'.format(trackId=789),
+            method='GET',
+            query_string=query_string)
+        self.assert200(response)
+        self.assertEqual(response.headers['X-Seek-Time-Ms'], '0')
+        self.assertEqual(response.data, _AUDIO)
+
+    def test_get_track_peaks(self):
+        """Test case for get_track_peaks
+
+        Gets the waveform peaks of a track
+        """
+        picos = peaks.pack([struct.pack('<16b', -1, 1, -2, 2, -3, 3, -4, 4, -5, 5, -6, 6, -7, 7, -8, 8)])
+        metadata_peaks = self.patch('swagger_server.storage.metadata.peaks',
+                                    return_value=(2, _INFO['updated_at'], picos))
+        query_string = [('buckets', 4)]
+        response = self.client.open(
+            '/track/{trackId}/peaks'.format(trackId=789),
+            method='GET',
+            query_string=query_string)
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.headers['ETag'], '"789-2-peaks"')
+        self.assertEqual(response.json, {'idtrack': 789, 'buckets': 4, 'bits': 8,
+                                         'data': [-2, 2, -4, 4, -6, 6, -8, 8]})
+
+        metadata_peaks.return_value = (2, _INFO['updated_at'], None)
+        response = self.client.open(
+            '/track/{trackId}/peaks'.format(trackId=789),
+            method='GET')
+        self.assert404(response)
+        self.assertEqual(response.json['message'], 'Waveform not available for this track')
+
+    def test_get_upload_job(self):
+        """Test case for get_upload_job
+
+        Gets the state of an asynchronous upload
+        """
+        cola = self.patch('swagger_server.controllers.track_controller.ingest.ingest_queue')
+        cola.status.side_effect = lambda job_id: _JOB if job_id == _JOB['job_id'] else None
+        response = self.client.open(
+            '/track/upload/{jobId}'.format(jobId=_JOB['job_id']),
+            method='GET')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json['status'], 'done')
+        self.assertEqual(response.json['idtrack'], 42)
+        self.assertEqual(response.json['processed_bytes'], len(_AUDIO))
+
+        response = self.client.open(
+            '/track/upload/{jobId}'.format(jobId='0' * 32),
+            method='GET')
+        self.assert404(response)
+
+    def test_add_track_async(self):
+        """Test case for add_track with TRACK_INGEST=async
+
+        Queues the upload and answers 202 with the job
+        """
+        self.patch('swagger_server.controllers.track_controller.ingest.enabled', return_value=True)
+        cola = self.patch('swagger_server.controllers.track_controller.ingest.ingest_queue')
+        subida = cola.upload.return_value.__enter__.return_value
+        subida.submit.return_value = dict(_JOB, status='queued', processed_bytes=0, idtrack=None)
+        response = self.client.open(
+            '/track/upload',
+            method='POST',
+            data=_AUDIO,
+            content_type='application/octet-stream')
+        self.assertStatus(response, 202,
+                          'Response body is : ' + response.data.decode('utf-8'))
+        self.assertTrue(response.headers['Location'].endswith('/track/upload/' + _JOB['job_id']))
+        self.assertEqual(response.json['job_id'], _JOB['job_id'])
+        self.assertEqual(response.json['status'], 'queued')
+        self.assertEqual(cola.upload.call_args[0][0], 'raw')
+        self.assertEqual(b''.join(llamada[0][0] for llamada in subida.write.call_args_list), _AUDIO)
+        self.store.insert.assert_not_called()
+
+
 if __name__ == '__main__':
     import unittest
     unittest.main()
@@ -99,6 +99,10 @@ def deserialize_model(data, klass):
     :param klass: class literal.
     :return: model object.
     """
+    compiled = getattr(klass, '_compiled', None)
+    if compiled is not None:
+        return compiled().from_dict(data)
+
     instance = klass()
 
     if not instance.swagger_types: